@@ -1,15 +1,32 @@
 # backend/app.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes import auth, restaurants, orders, reports, deliveries
-from database.connection import test_connection, get_db_connection
+import health
+from lazy import STARTUP_MODE, LazyRouters, startup_import
+from compression import CompressionMiddleware, cache_stats as compression_cache_stats
+from database.connection import replica_stats
+from database.singleflight import flights
+from lifecycle import lifespan, state as lifecycle_state
 import uvicorn
+import sys
+import os
+
+# Services behind database.queries: deferred to first use with STARTUP_MODE=lazy
+dispatch = startup_import("dispatch")
+eta = startup_import("eta")
+events = startup_import("events")
+intake = startup_import("intake")
+locations = startup_import("locations")
+outbox = startup_import("outbox")
+payments = startup_import("payments")
+tracking = startup_import("tracking")
 
 app = FastAPI(
     title="Restaurant Ordering API - Team 5095",
     description="Backend API for Restaurant Ordering & Delivery System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend
@@ -19,8 +36,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# gzip / brotli for JSON responses over COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+
 @app.get("/")
 def home():
     return {
@@ -32,39 +53,106 @@ def home():
     }
 
 @app.get("/api/health")
-def health():
-    db_connected = test_connection()
+def health_check():
+    """Liveness probe: answered from the cached prober status, never touches MySQL"""
+    snapshot = health.snapshot()
+    return {
+        "status": snapshot["status"],
+        "database": "connected ✅" if snapshot["database"] == "connected" else "disconnected ❌",
+        "db_latency_ms": snapshot["db_latency_ms"],
+        "pool": snapshot["pool"],
+        "replicas": snapshot["replicas"],
+        "reasons": snapshot["reasons"],
+        "checked_at": snapshot["checked_at"]
+    }
+
+@app.get("/api/ready")
+def ready(response: Response):
+    """Readiness probe: 200 only after warmup, while the DB is reachable, and until draining starts"""
+    snapshot = health.snapshot()
+    is_ready = (
+        lifecycle_state["ready"]
+        and not lifecycle_state["draining"]
+        and health.is_db_ready()
+    )
+    if not is_ready:
+        response.status_code = 503
+    return {
+        "ready": is_ready,
+        "status": snapshot["status"],
+        "draining": lifecycle_state["draining"],
+        "warmup_ms": lifecycle_state["warmup_ms"],
+        "warmup_error": lifecycle_state["warmup_error"],
+        "pid": os.getpid()
+    }
+
+@app.get("/api/metrics")
+def metrics():
+    """In-process counters for this worker (caches, coalescing)"""
     return {
-        "status": "healthy" if db_connected else "unhealthy",
-        "database": "connected ✅" if db_connected else "disconnected ❌"
+        "pid": os.getpid(),
+        "singleflight": flights.stats(),
+        "precompressed_cache": compression_cache_stats(),
+        "order_intake": intake.stats(),
+        "delivery_tracking": tracking.stats(),
+        "dispatch": dispatch.stats(),
+        "driver_locations": locations.stats(),
+        "eta": eta.stats(),
+        "delivery_events": events.stats(),
+        "payments": payments.stats(),
+        "outbox": outbox.stats(),
+        "replicas": replica_stats()
     }
 
 @app.get("/api/test-db")
 def test_db():
     """Test endpoint to verify database access"""
-    conn = get_db_connection()
-    if not conn:
+    tables = health.table_names()
+    if tables is None:
         return {"error": "Cannot connect to database"}, 500
     
-    cursor = conn.cursor()
-    cursor.execute("SHOW TABLES;")
-    tables = [table[0] for table in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    
     return {
         "message": "Database connected successfully!",
-        "tables": tables
+        "tables": tables,
+        "health": health.snapshot()
     }
 
 # Register all routers
-app.include_router(auth.router)
-app.include_router(restaurants.router)
-app.include_router(orders.router)
-app.include_router(reports.router)
-app.include_router(deliveries.router)  # ← ADD THIS LINE!
+ROUTERS = {
+    "/api/auth": "routes.auth",
+    "/api/restaurants": "routes.restaurants",
+    "/api/orders": "routes.orders",
+    "/api/reports": "routes.reports",
+    "/api/deliveries": "routes.deliveries",
+    "/api/batch": "routes.batch",
+}
+
+if STARTUP_MODE == "lazy":
+    # STARTUP_MODE=lazy: each router is imported by the first request under its prefix
+    app.add_middleware(LazyRouters, fastapi_app=app, routers=ROUTERS)
+else:
+    from routes import auth, restaurants, orders, reports, deliveries, batch
+    app.include_router(auth.router)
+    app.include_router(restaurants.router)
+    app.include_router(orders.router)
+    app.include_router(reports.router)
+    app.include_router(deliveries.router)  # ← ADD THIS LINE!
+    app.include_router(batch.router)
+
+def run_production():
+    """Multi-worker server (gunicorn + uvicorn workers, settings in gunicorn.conf.py)"""
+    from gunicorn.app.wsgiapp import run
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.argv = ["gunicorn", "--chdir", backend_dir, "-c", os.path.join(backend_dir, "gunicorn.conf.py"), "app:app"]
+    print("🚀 Starting production server (multi-worker)...")
+    print("✅ Readiness check: http://localhost:8000/api/ready")
+    run()
 
 if __name__ == '__main__':
+    if "--prod" in sys.argv:
+        run_production()
+        sys.exit(0)
+
     print("🚀 Starting FastAPI Backend Server...")
     print("📍 Server running at: http://localhost:8000")
     print("📚 API Docs: http://localhost:8000/docs")
@@ -0,0 +1,186 @@
+# backend/benchmarks/bulk_orders.py
+"""
+Order ingestion throughput: one POST /api/orders per order vs POST /api/orders/bulk
+By default MySQL is replaced by a fake connection that sleeps --rtt-ms per
+round trip, so the numbers show what the round-trip count costs. With --live
+the real database from DB_* is used (this WRITES orders: use a scratch copy).
+
+    python benchmarks/bulk_orders.py --orders 500 --rtt-ms 1
+    python benchmarks/bulk_orders.py --orders 200 --live
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatch  # noqa: E402
+from database import catalog, queries  # noqa: E402
+from routes import orders as order_routes  # noqa: E402
+from routes.orders import BulkOrderCreate, OrderCreate  # noqa: E402
+
+RESTAURANT_ID = 1
+MENU_ITEM_IDS = (1, 2, 3)
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def _round_trip(self):
+        self.db.round_trips += 1
+        time.sleep(self.db.rtt)
+
+    def execute(self, query, params=()):
+        self._round_trip()
+        if "FROM MENU" in query:
+            self.rows = [
+                {"MENU_ITEM_ID": i, "RESTAURANT_ID": RESTAURANT_ID, "PRICE": "9.99"}
+                for i in params
+            ]
+        elif "@@auto_increment_increment" in query:
+            self.rows = [(1,)]
+        elif query.lstrip().startswith("SELECT"):
+            self.rows = [{"ORDER_ID": params[0]}]
+        else:
+            self.rowcount = 1
+            self.lastrowid = next(self.db.ids)
+
+    def executemany(self, query, seq):
+        # mysql.connector sends INSERT ... VALUES batches as one multi-row statement
+        seq = list(seq)
+        self._round_trip()
+        self.rowcount = len(seq)
+        self.lastrowid = next(self.db.ids)
+        for _ in range(len(seq) - 1):
+            next(self.db.ids)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.round_trips += 1
+        time.sleep(self.db.rtt)
+
+    def rollback(self):
+        self.commit()
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self, rtt_ms):
+        self.rtt = rtt_ms / 1000
+        self.round_trips = 0
+        self.ids = itertools.count(1)
+
+    def connect(self, read_only=False):
+        return FakeConnection(self)
+
+
+def live_sample():
+    """A restaurant with at least one menu item and a customer, from the real database"""
+    conn = queries.get_db_connection()
+    if not conn:
+        sys.exit("❌ Cannot connect to the database (check DB_* settings)")
+    cursor = conn.cursor()
+    cursor.execute("SELECT RESTAURANT_ID, MENU_ITEM_ID FROM MENU ORDER BY RESTAURANT_ID LIMIT 3")
+    rows = cursor.fetchall()
+    cursor.execute("SELECT USER_ID FROM USERS ORDER BY USER_ID LIMIT 1")
+    user = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    if not rows or not user:
+        sys.exit("❌ Need at least one menu item and one user")
+    restaurant_id = rows[0][0]
+    return user[0], restaurant_id, [m for r, m in rows if r == restaurant_id]
+
+
+def make_orders(n, user_id, restaurant_id, menu_item_ids):
+    return [
+        OrderCreate(
+            user_id=user_id,
+            RESTAURANT_ID=restaurant_id,
+            PAYMENT_METHOD="CASH",
+            delivery_address=f"{i} Benchmark St",
+            items=[{"MENU_ITEM_ID": m, "QUANTITY": 1 + i % 3} for m in menu_item_ids],
+        )
+        for i in range(n)
+    ]
+
+
+def run(label, fn, db):
+    before = db.round_trips if db else 0
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    trips = f"{(db.round_trips - before):>10,}" if db else f"{'-':>10}"
+    return label, elapsed, trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="One-by-one vs bulk order ingestion")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="simulated round trip (ignored with --live)")
+    parser.add_argument("--live", action="store_true", help="write to the real database from DB_*")
+    args = parser.parse_args()
+
+    db = None
+    if args.live:
+        user_id, restaurant_id, menu_item_ids = live_sample()
+        dispatch.load()
+    else:
+        db = FakeDatabase(args.rtt_ms)
+        queries.get_db_connection = db.connect
+        # One driver, no restaurant coordinates: dispatch stays in memory
+        catalog.get_restaurant = lambda restaurant_id: None
+        dispatch.get_drivers = lambda: [{"USER_ID": 1}]
+        dispatch.get_driver_loads = lambda: {}
+        dispatch.get_driver_locations = lambda since: {}
+        dispatch.load()
+        user_id, restaurant_id, menu_item_ids = 1, RESTAURANT_ID, MENU_ITEM_IDS
+
+    orders = make_orders(args.orders, user_id, restaurant_id, menu_item_ids)
+
+    def one_by_one():
+        for order in orders:
+            order_routes._place_order(order)
+
+    def bulk():
+        for start in range(0, len(orders), order_routes.MAX_BULK_ORDERS):
+            result = order_routes.place_orders_bulk(
+                BulkOrderCreate(orders=orders[start:start + order_routes.MAX_BULK_ORDERS])
+            )
+            if result["failed"]:
+                sys.exit(f"❌ {result['failed']} bulk orders failed: {result['results'][0]}")
+
+    target = "live database" if args.live else f"simulated MySQL, {args.rtt_ms:g} ms round trip"
+    print(f"📊 {args.orders:,} orders × {len(menu_item_ids)} items ({target})")
+    print(f"   {'':16}{'seconds':>10}{'orders/s':>12}{'round trips':>12}")
+    for label, elapsed, trips in (run("one by one", one_by_one, db), run("bulk", bulk, db)):
+        print(f"   {label:16}{elapsed:10.2f}{args.orders / elapsed:12,.0f}  {trips}")
+
+
+if __name__ == "__main__":
+    main()
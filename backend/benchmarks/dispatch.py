@@ -0,0 +1,114 @@
+# backend/benchmarks/dispatch.py
+"""
+Driver dispatch simulation (no database needed)
+Scatters drivers and restaurants over a city, then places orders while
+earlier deliveries complete, so thousands are in flight at once. Compares
+the grid index in dispatch.py with a full scan of every driver.
+
+    python benchmarks/dispatch.py --drivers 5000 --orders 50000
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatch  # noqa: E402
+
+CENTER = (40.7128, -74.0060)
+CITY_KM = 30
+
+
+def random_point(rng):
+    lat = CENTER[0] + (rng.random() - 0.5) * CITY_KM / dispatch.KM_PER_DEGREE_LAT
+    lng = CENTER[1] + (rng.random() - 0.5) * CITY_KM / (dispatch.KM_PER_DEGREE_LAT * math.cos(math.radians(CENTER[0])))
+    return lat, lng
+
+
+def build_index(n_drivers, rng):
+    dispatch.get_drivers = lambda: [{"USER_ID": i} for i in range(1, n_drivers + 1)]
+    dispatch.get_driver_loads = lambda: {}
+    dispatch.get_driver_locations = lambda since: {}
+    dispatch.load()
+    for driver_id in range(1, n_drivers + 1):
+        dispatch.update_location(driver_id, *random_point(rng))
+
+
+def full_scan(location):
+    """Reference: cost of every driver under capacity, pick the cheapest"""
+    best, best_cost = None, math.inf
+    for d in dispatch._drivers.values():
+        if d.load >= dispatch.MAX_ACTIVE_DELIVERIES:
+            continue
+        cost = dispatch.distance_km(location[0], location[1], d.lat, d.lng) + dispatch.KM_PER_QUEUED_DELIVERY * d.load
+        if cost < best_cost:
+            best, best_cost = d, cost
+    if best is not None:
+        dispatch._set_load(best, best.load + 1)
+        return best.driver_id
+    return None
+
+
+def simulate(label, assign, args, restaurants, rng):
+    build_index(args.drivers, random.Random(args.seed))
+    in_flight = deque()
+    distances, timings = [], []
+    peak = 0
+
+    for _ in range(args.orders):
+        location = rng.choice(restaurants)
+        started = time.perf_counter()
+        driver_id = assign(location)
+        timings.append(time.perf_counter() - started)
+
+        driver = dispatch._drivers[driver_id]
+        distances.append(dispatch.distance_km(location[0], location[1], driver.lat, driver.lng))
+        in_flight.append(driver_id)
+        peak = max(peak, len(in_flight))
+
+        # Deliveries finish roughly in order once enough are on the road
+        while len(in_flight) > args.in_flight:
+            dispatch.release(in_flight.popleft())
+
+    timings.sort()
+    return {
+        "label": label,
+        "per_sec": len(timings) / sum(timings),
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+        "avg_km": statistics.fmean(distances),
+        "peak": peak,
+        "max_load": max(d.load for d in dispatch._drivers.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid dispatch vs full scan")
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--restaurants", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--in-flight", type=int, default=6000, help="deliveries on the road at once")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    restaurants = [random_point(rng) for _ in range(args.restaurants)]
+
+    grid = simulate("grid index", lambda loc: dispatch.assign(None, location=loc), args, restaurants, random.Random(args.seed))
+    scan = simulate("full scan", full_scan, args, restaurants, random.Random(args.seed))
+
+    print(f"📊 {args.orders:,} orders, {args.drivers:,} drivers, up to {args.in_flight:,} deliveries in flight")
+    print(f"   {'':12}{'assign/s':>12}{'p50 µs':>10}{'p99 µs':>10}{'avg km':>9}{'max load':>10}")
+    for r in (grid, scan):
+        print(f"   {r['label']:12}{r['per_sec']:12,.0f}{r['p50_us']:10.1f}{r['p99_us']:10.1f}{r['avg_km']:9.2f}{r['max_load']:10}")
+    print(f"   speedup: {grid['per_sec'] / scan['per_sec']:.0f}x, pickup distance {grid['avg_km'] / scan['avg_km']:.2f}x of optimal")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# backend/benchmarks/eta_eval.py
+"""
+Offline evaluation of the ETA model (eta.py) against the fixed 30 minutes
+Deliveries are split by completion time: the model is trained on the older
+ones and scored on the newest --holdout fraction, the way it would have been
+used. By default the deliveries are synthetic (restaurant and hour-of-week
+effects plus noise); with --live they are read from DELIVERIES / ORDERS.
+
+    python benchmarks/eta_eval.py --deliveries 200000
+    python benchmarks/eta_eval.py --live --quantiles 0.5,0.8
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import eta  # noqa: E402
+from database.queries import get_delivery_durations  # noqa: E402
+
+
+def synthetic(n, restaurants, seed):
+    """(restaurant_id, hour_of_week, minutes) in completion order over 90 days"""
+    rng = random.Random(seed)
+    prep = {r: rng.uniform(12, 30) for r in range(1, restaurants + 1)}
+    start = datetime.now() - timedelta(days=90)
+    rows = []
+    for i in range(n):
+        placed = start + timedelta(days=90 * i / n)
+        how = eta.hour_of_week(placed)
+        hour = how % 24
+        rush = 10 if hour in (12, 13, 18, 19, 20) else 0
+        weekend = 5 if how >= 120 else 0
+        restaurant_id = rng.randint(1, restaurants)
+        minutes = prep[restaurant_id] + rush + weekend + rng.lognormvariate(2.0, 0.5)
+        rows.append((restaurant_id, how, minutes))
+    return rows
+
+
+def live():
+    rows = []
+    after = None
+    while True:
+        page = get_delivery_durations(after=after, limit=eta.FETCH_BATCH)
+        if page is None:
+            sys.exit("❌ Cannot read deliveries (check DB_* settings)")
+        rows += [
+            (restaurant_id, int(how), float(minutes))
+            for _, restaurant_id, how, minutes, _ in page
+            if float(minutes) >= eta.ETA_MIN_MINUTES
+        ]
+        if len(page) < eta.FETCH_BATCH:
+            return rows
+        after = (page[-1][4], page[-1][0])
+
+
+def score(label, predict, test):
+    errors, late = [], 0
+    started = time.perf_counter()
+    predictions = [predict(restaurant_id, how) for restaurant_id, how, _ in test]
+    per_call = (time.perf_counter() - started) / len(test)
+    for predicted, (_, _, actual) in zip(predictions, test):
+        errors.append(abs(actual - predicted))
+        late += actual > predicted
+    errors.sort()
+    return {
+        "label": label,
+        "mae": statistics.fmean(errors),
+        "p50": errors[len(errors) // 2],
+        "p90": errors[int(len(errors) * 0.9)],
+        "late": 100 * late / len(test),
+        "us": per_call * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETA model vs fixed 30 minutes on held-out deliveries")
+    parser.add_argument("--deliveries", type=int, default=200000, help="synthetic deliveries (ignored with --live)")
+    parser.add_argument("--restaurants", type=int, default=200)
+    parser.add_argument("--holdout", type=float, default=0.2, help="newest fraction used for scoring")
+    parser.add_argument("--quantiles", default="0.5,0.8")
+    parser.add_argument("--min-samples", type=int, default=eta.ETA_MIN_SAMPLES)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--live", action="store_true", help="read deliveries from the database in DB_*")
+    args = parser.parse_args()
+
+    rows = live() if args.live else synthetic(args.deliveries, args.restaurants, args.seed)
+    split = int(len(rows) * (1 - args.holdout))
+    train, test = rows[:split], rows[split:]
+    if not train or not test:
+        sys.exit(f"❌ Need more deliveries to evaluate (have {len(rows)})")
+
+    results = [score("fixed 30 min", lambda r, h: eta.DEFAULT_MINUTES, test)]
+    for q in (float(q) for q in args.quantiles.split(",")):
+        model = eta.EtaModel(quantile=q, min_samples=args.min_samples)
+        started = time.perf_counter()
+        for restaurant_id, how, minutes in train:
+            model.add(restaurant_id, how, minutes)
+        model.build()
+        build_s = time.perf_counter() - started
+        results.append(score(f"model q={q:g}", model.minutes, test))
+        print(f"   built q={q:g} from {len(train):,} deliveries in {build_s:.2f}s ({len(model.table):,} table entries)")
+
+    source = "live database" if args.live else "synthetic"
+    print(f"📊 {len(test):,} held-out deliveries ({source}), absolute error in minutes")
+    print(f"   {'':14}{'MAE':>8}{'p50':>8}{'p90':>8}{'late %':>9}{'µs/ETA':>9}")
+    for r in results:
+        print(f"   {r['label']:14}{r['mae']:8.1f}{r['p50']:8.1f}{r['p90']:8.1f}{r['late']:9.1f}{r['us']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# backend/benchmarks/payments.py
+"""
+Payment authorization on the request path vs the async pipeline (payments.py)
+Uses the SimulatedProcessor; the database writes are replaced by in-memory
+stubs, so the numbers are about where authorization latency is paid.
+    inline: every request waits for the processor (the sync shape)
+    async:  requests only queue the payment; PAYMENT_WORKERS threads
+            authorize with retries and settle in the background
+
+    python benchmarks/payments.py --orders 400 --clients 16 --latency-ms 100
+    python benchmarks/payments.py --workers 8,32,64 --error-rate 0.1
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatch  # noqa: E402
+import payments  # noqa: E402
+
+
+def stub_database():
+    """Settle / dispatch in memory; returns {PAYMENT_ID: payment status}"""
+    settled = {}
+    lock = threading.Lock()
+
+    def settle_payment(payment_id, order_id, payment_status, order_status, processor_ref=None, failure_reason=None,
+                       delivery=None):
+        with lock:
+            if payment_id in settled:
+                return False
+            settled[payment_id] = payment_status
+            return True
+
+    payments.settle_payment = settle_payment
+    payments.eta.estimate = lambda restaurant_id, when=None: None
+    dispatch.get_drivers = lambda: [{"USER_ID": 1}]
+    dispatch.get_driver_loads = lambda: {}
+    dispatch.catalog.get_restaurant = lambda restaurant_id: None
+    dispatch.load()
+    return settled
+
+
+def run_clients(n_orders, clients, place):
+    """n_orders requests from `clients` threads; returns (seconds, request latencies)"""
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(1, n_orders + 1))
+
+    def client():
+        mine = []
+        while True:
+            with lock:
+                payment_id = next(counter, None)
+            if payment_id is None:
+                break
+            started = time.perf_counter()
+            place(payment_id)
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def inline(args):
+    processor = payments.SimulatedProcessor(args.latency_ms, args.error_rate, args.decline_rate, seed=args.seed)
+
+    def place(payment_id):
+        # What a synchronous place_order would do: retry in the request
+        for attempt in range(1, payments.PAYMENT_MAX_ATTEMPTS + 1):
+            try:
+                processor.authorize(10, "CREDIT_CARD", f"payment-{payment_id}")
+                return
+            except payments.PaymentDeclined:
+                return
+            except payments.ProcessorUnavailable:
+                time.sleep(payments._backoff(attempt))
+
+    elapsed, latencies = run_clients(args.orders, args.clients, place)
+    return {"label": "inline", "requests_s": elapsed, "settled_s": elapsed, "latencies": latencies}
+
+
+def pipeline(args, workers, settled):
+    settled.clear()
+    processor = payments.SimulatedProcessor(args.latency_ms, args.error_rate, args.decline_rate, seed=args.seed)
+    retries_before = payments.stats()["retries"]
+    payments.start(processor, workers)
+
+    started = time.perf_counter()
+    elapsed, latencies = run_clients(
+        args.orders, args.clients,
+        lambda payment_id: payments.submit(payment_id, payment_id, 1, 10, "CREDIT_CARD")
+    )
+    while len(settled) < args.orders:
+        time.sleep(0.005)
+    settled_s = time.perf_counter() - started
+    stats = payments.stats()
+    payments.stop()
+    return {
+        "label": f"async ×{workers}",
+        "requests_s": elapsed,
+        "settled_s": settled_s,
+        "latencies": latencies,
+        "retries": stats["retries"] - retries_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline vs async payment authorization")
+    parser.add_argument("--orders", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent requests")
+    parser.add_argument("--workers", default="8,32", help="pipeline worker counts to try")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="transient processor errors (retried)")
+    parser.add_argument("--decline-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    settled = stub_database()
+    results = [inline(args)]
+    for workers in (int(w) for w in args.workers.split(",")):
+        results.append(pipeline(args, workers, settled))
+
+    print(f"📊 {args.orders:,} orders from {args.clients} clients, processor {args.latency_ms:g} ms "
+          f"({args.error_rate:.0%} errors, {args.decline_rate:.0%} declines)")
+    print(f"   {'':12}{'req p50 ms':>12}{'req p99 ms':>12}{'requests/s':>12}{'settled/s':>11}")
+    for r in results:
+        lat = r["latencies"]
+        print(f"   {r['label']:12}{statistics.median(lat) * 1000:12.2f}{lat[int(len(lat) * 0.99)] * 1000:12.2f}"
+              f"{args.orders / r['requests_s']:12,.0f}{args.orders / r['settled_s']:11,.0f}")
+    counts = {status: list(settled.values()).count(status) for status in ("COMPLETED", "FAILED")}
+    print(f"   last run: {counts['COMPLETED']} completed, {counts['FAILED']} failed, {results[-1]['retries']} retries")
+
+
+if __name__ == "__main__":
+    main()
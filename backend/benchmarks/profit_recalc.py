@@ -0,0 +1,141 @@
+# backend/benchmarks/profit_recalc.py
+"""
+Profit recomputation: one CALCULATE_ORDER_PROFIT / CALCULATE_DELIVERY_PROFIT
+call per row vs RECALCULATE_PROFIT over ORDER_ID windows (recalculate_profit.py)
+By default MySQL is replaced by a fake connection that sleeps --rtt-ms per
+round trip, so the numbers show what the call count costs. With --live the
+first --orders orders of the real database from DB_* are recomputed both
+ways (this WRITES the profit columns: use a scratch copy, and run
+db/recalculateProfitSP.sql first). Times are scaled to a million orders.
+
+    python benchmarks/profit_recalc.py --orders 20000 --rtt-ms 0.5
+    python benchmarks/profit_recalc.py --orders 100000 --chunk-size 10000 --live
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recalculate_profit  # noqa: E402
+from database.connection import get_db_connection  # noqa: E402
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def _round_trip(self):
+        self.db.round_trips += 1
+        time.sleep(self.db.rtt)
+
+    def execute(self, query, params=()):
+        self._round_trip()
+        # ... WHERE ORDER_ID BETWEEN low AND high: one row per ID
+        low, high = params[0], min(params[1], self.db.orders)
+        self.rows = [(i,) for i in range(low, high + 1)]
+
+    def callproc(self, name, args):
+        self._round_trip()
+        self.result = None
+        if name == "RECALCULATE_PROFIT":
+            n = max(0, min(args[1], self.db.orders) - args[0] + 1)
+            self.result = (n, n)
+
+    def stored_results(self):
+        return [FakeResult(self.result)] if self.result else []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, orders, rtt_ms):
+        self.orders = orders
+        self.rtt = rtt_ms / 1000
+        self.round_trips = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.round_trips += 1
+        time.sleep(self.rtt)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run(conn, first, last, chunk_size, window):
+    started = time.perf_counter()
+    for low in range(first, last + 1, chunk_size):
+        window(conn, low, min(low + chunk_size - 1, last))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row vs set-based profit recomputation")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=recalculate_profit.CHUNK_SIZE)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="fake round-trip time")
+    parser.add_argument("--live", action="store_true", help="use the real database (writes!)")
+    args = parser.parse_args()
+
+    if args.live:
+        conn = get_db_connection()
+        if not conn:
+            sys.exit("❌ Cannot connect to the database")
+        first, last = recalculate_profit.id_range(conn)
+        if first is None:
+            sys.exit("❌ No orders to recompute")
+        # The first --orders orders (IDs may have gaps)
+        cursor = conn.cursor()
+        cursor.execute("SELECT ORDER_ID FROM ORDERS ORDER BY ORDER_ID LIMIT 1 OFFSET %s", (args.orders - 1,))
+        row = cursor.fetchone()
+        cursor.close()
+        last = row[0] if row else last
+        label = "live"
+    else:
+        conn = FakeConnection(args.orders, args.rtt_ms)
+        first, last = 1, args.orders
+        label = f"fake, {args.rtt_ms:g} ms RTT"
+
+    results = []
+    for name, window in (("per-row", recalculate_profit.per_row_window),
+                         ("set-based", recalculate_profit.recalculate_window)):
+        trips_before = getattr(conn, "round_trips", 0)
+        seconds = run(conn, first, last, args.chunk_size, window)
+        trips = getattr(conn, "round_trips", trips_before) - trips_before
+        results.append((name, seconds, trips))
+    conn.close()
+
+    print(f"📊 Profit recomputation of {args.orders:,} orders ({label}, {args.chunk_size:,} IDs per window)")
+    print(f"   {'':12}{'seconds':>10}{'s / 1M orders':>16}{'round trips':>14}")
+    for name, seconds, trips in results:
+        trips_text = f"{trips:,}" if not args.live else "-"
+        print(f"   {name:12}{seconds:10.2f}{seconds * 1_000_000 / args.orders:16,.0f}{trips_text:>14}")
+    print(f"   speedup: {results[0][1] / results[1][1]:.1f}×")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# backend/benchmarks/records.py
+"""
+Memory and serialization time: dictionary-cursor rows vs typed records
+Builds N synthetic revenue-detail rows both ways (no database needed) and
+serializes them the way each endpoint does.
+
+    python benchmarks/records.py --rows 200000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from database import records  # noqa: E402
+from database.records import RevenueDetailRow, columns  # noqa: E402
+
+
+def make_tuples(n):
+    start = datetime(2025, 1, 1)
+    return [
+        (
+            i,
+            f"Restaurant {i % 50}",
+            start + timedelta(minutes=i),
+            Decimal("4.35"),
+            Decimal("2.99"),
+            Decimal("0.60"),
+            Decimal("7.94"),
+        )
+        for i in range(n)
+    ]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, current, elapsed
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dict rows vs __slots__ records")
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    tuples = make_tuples(args.rows)
+    names = columns(RevenueDetailRow)
+
+    dict_rows, dict_mem, dict_build = measure(lambda: [dict(zip(names, t)) for t in tuples])
+    rec_rows, rec_mem, rec_build = measure(lambda: [RevenueDetailRow(*t) for t in tuples])
+
+    payload = lambda rows: {"success": True, "data": rows}  # noqa: E731
+    dict_body, dict_ser = timed(lambda: JSONResponse(content=jsonable_encoder(payload(dict_rows))).body)
+    rec_body, rec_ser = timed(lambda: records.dumps(payload(rec_rows)))
+
+    orjson_state = "orjson" if records.orjson is not None else "json fallback"
+    print(f"📊 {args.rows:,} revenue detail rows ({orjson_state})")
+    print(f"   {'':24}{'dict rows':>14}{'records':>14}{'ratio':>8}")
+    print(f"   {'rows in memory (MB)':24}{dict_mem / 1e6:14.1f}{rec_mem / 1e6:14.1f}{dict_mem / rec_mem:7.1f}x")
+    print(f"   {'build rows (ms)':24}{dict_build * 1000:14.0f}{rec_build * 1000:14.0f}{dict_build / rec_build:7.1f}x")
+    print(f"   {'serialize (ms)':24}{dict_ser * 1000:14.0f}{rec_ser * 1000:14.0f}{dict_ser / rec_ser:7.1f}x")
+    print(f"   {'body size (KB)':24}{len(dict_body) / 1e3:14.0f}{len(rec_body) / 1e3:14.0f}")
+    print(f"   identical JSON: {'✅' if dict_body == rec_body else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# backend/benchmarks/startup.py
+"""
+Cold-start benchmark: import time of `app` and time to the first response
+Each run uses a fresh interpreter. Exits with status 1 when the median goes
+over budget, so it can gate CI / deploys.
+
+    python benchmarks/startup.py                      # eager (default) mode
+    python benchmarks/startup.py --mode lazy --runs 10
+
+In lazy mode it also fails if `import app` plus the first request loaded
+database.queries; in both modes, if they loaded openpyxl.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Median budgets (ms), about twice what a laptop measures, so a regression
+# such as an eager import of database.queries fails them
+IMPORT_BUDGET_MS = {"eager": 750, "lazy": 500}
+FIRST_REQUEST_BUDGET_MS = 100
+
+# Runs inside the child interpreter; prints one JSON line
+CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+
+async def first_request(path):
+    # Minimal ASGI call (no lifespan: we only time import + routing + handler)
+    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "headers": [], "http_version": "1.1",
+             "scheme": "http", "server": ("bench", 80), "client": ("bench", 1), "root_path": ""}
+    status = {}
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+    await app.app(scope, receive, send)
+    return status.get("code")
+
+code = asyncio.run(first_request(sys.argv[1]))
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_request_ms": (t2 - t1) * 1000,
+    "status": code,
+    "modules": len(sys.modules),
+    "openpyxl_loaded": "openpyxl" in sys.modules,
+    "queries_loaded": "database.queries" in sys.modules,
+}))
+"""
+
+
+def run_once(mode, path):
+    env = dict(os.environ, STARTUP_MODE=mode, PYTHONDONTWRITEBYTECODE="0")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, path],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        sys.exit(f"❌ Child process failed:\n{out.stderr[-2000:]}")
+    # App startup prints banners; the result is the last line
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first-request time")
+    parser.add_argument("--mode", choices=["eager", "lazy"], default=os.getenv("STARTUP_MODE", "eager"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="route for the first request (no DB access)")
+    parser.add_argument("--import-budget-ms", type=float, help="default: 750 eager, 500 lazy")
+    parser.add_argument("--first-request-budget-ms", type=float, default=FIRST_REQUEST_BUDGET_MS)
+    args = parser.parse_args()
+    if args.import_budget_ms is None:
+        args.import_budget_ms = IMPORT_BUDGET_MS[args.mode]
+
+    # Warm the bytecode cache so every measured run is comparable
+    run_once(args.mode, args.path)
+    results = [run_once(args.mode, args.path) for _ in range(args.runs)]
+
+    import_ms = statistics.median(r["import_ms"] for r in results)
+    first_ms = statistics.median(r["first_request_ms"] for r in results)
+
+    print(f"⏱️  Startup benchmark ({args.mode} mode, {args.runs} runs, median)")
+    print(f"   import app:     {import_ms:8.1f} ms  (budget {args.import_budget_ms:.0f} ms)")
+    print(f"   first request:  {first_ms:8.1f} ms  (budget {args.first_request_budget_ms:.0f} ms) -> {results[-1]['status']}")
+    print(f"   modules loaded: {results[-1]['modules']}, openpyxl loaded: {results[-1]['openpyxl_loaded']}, "
+          f"database.queries loaded: {results[-1]['queries_loaded']}")
+
+    failed = []
+    if import_ms > args.import_budget_ms:
+        failed.append("import")
+    if first_ms > args.first_request_budget_ms:
+        failed.append("first request")
+    if args.mode == "lazy" and any(r["queries_loaded"] for r in results):
+        # The point of lazy mode: nothing behind the database layer before it is needed
+        failed.append("database.queries imported")
+    if any(r["openpyxl_loaded"] for r in results):
+        failed.append("openpyxl imported")
+    if failed:
+        print(f"❌ Over budget: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
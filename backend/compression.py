@@ -0,0 +1,207 @@
+# backend/compression.py
+"""
+Response compression (brotli when installed, otherwise gzip)
+- CompressionMiddleware compresses any buffered text/JSON response over
+  COMPRESSION_MIN_SIZE bytes (in a thread from COMPRESSION_THREAD_SIZE up),
+  weakening its ETag and adding Accept-Encoding to its Vary.
+- precompressed_json() keeps compressed bytes for hot catalog responses,
+  keyed by catalog version, so they are compressed once per change. The
+  cache is an LRU of at most PRECOMPRESS_CACHE_SIZE responses.
+"""
+
+import asyncio
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+from conditional import CACHE_POLICIES, etag_matches, make_etag, not_modified, render_json
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+# Bodies at least this big are compressed in a worker thread, off the event loop
+COMPRESSION_THREAD_SIZE = int(os.getenv("COMPRESSION_THREAD_SIZE", str(64 * 1024)))
+BROTLI_QUALITY = 5
+# Precompressed bodies are built once per version, so they can afford max effort
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+# Keys come from request paths (restaurant IDs, field selections), so bound them
+PRECOMPRESS_CACHE_SIZE = int(os.getenv("PRECOMPRESS_CACHE_SIZE", "2048"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def choose_encoding(accept_encoding):
+    """Pick "br", "gzip" or None from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    # "*" only stands for codings the header does not name: "gzip;q=0, *" refuses gzip
+    wildcard = offered.get("*", 0.0)
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    # Highest q wins; br on a tie
+    q, _, encoding = max((offered.get(name, wildcard), name == "br", name) for name in available)
+    return encoding if q > 0 else None
+
+
+def compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=PRECOMPRESS_BROTLI_QUALITY if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=PRECOMPRESS_GZIP_LEVEL if best else GZIP_LEVEL, mtime=0)
+
+
+def _vary(headers):
+    """The response's Vary with Accept-Encoding added (once)"""
+    values = [v.decode("latin-1") for k, v in headers if k == b"vary"]
+    names = [name.strip() for value in values for name in value.split(",") if name.strip()]
+    if "*" in names or "accept-encoding" in (name.lower() for name in names):
+        return ", ".join(names)
+    return ", ".join(names + ["Accept-Encoding"])
+
+
+def _weak(etag):
+    """
+    W/ form of a strong ETag: the compressed bytes differ from the ones it
+    hashes, and If-None-Match compares weakly, so 304s keep working
+    """
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+class CompressionMiddleware:
+    """ASGI middleware: compress single-chunk text/JSON responses above the size threshold"""
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if_none_match = headers.get(b"if-none-match", b"")
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers = dict(start_message["headers"])
+            content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+            skip = (
+                message.get("more_body", False)  # streaming (e.g. Excel downloads)
+                or b"content-encoding" in response_headers  # already precompressed
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if skip:
+                passthrough = True
+                etag = response_headers.get(b"etag")
+                if start_message["status"] == 304 and etag and _weak(etag) in if_none_match:
+                    # The client holds the compressed copy: answer with its (weak) ETag
+                    start_message = {**start_message, "headers": [
+                        (k, _weak(v) if k == b"etag" else v) for k, v in start_message["headers"]
+                    ]}
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= COMPRESSION_THREAD_SIZE:
+                compressed = await asyncio.to_thread(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            new_headers = [
+                (k, _weak(v) if k == b"etag" else v) for k, v in start_message["headers"]
+                if k not in (b"content-length", b"vary")
+            ]
+            new_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", _vary(start_message["headers"]).encode("latin-1")),
+            ]
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# ==================== PRECOMPRESSED CACHE ====================
+
+_cache = OrderedDict()  # (key, encoding) -> entry, least recently used first
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def precompressed_json(request, key, version, build_payload, policy="catalog"):
+    """
+    Response for a hot JSON endpoint whose body only changes with `version`
+    build_payload() is called (and its output serialized/compressed/hashed)
+    at most once per (key, version, encoding). A matching If-None-Match gets
+    a 304 straight from this cache.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    cache_key = (key, encoding)
+
+    with _cache_lock:
+        entry = _cache.get(cache_key)
+        hit = entry is not None and entry[0] == version
+        if hit:
+            _cache.move_to_end(cache_key)
+            _stats["hits"] += 1
+    if not hit:
+        _stats["misses"] += 1
+        raw = render_json(build_payload())
+        if encoding and len(raw) >= COMPRESSION_MIN_SIZE:
+            entry = (version, compress(raw, encoding, best=True), encoding, make_etag(raw, encoding))
+        else:
+            entry = (version, raw, None, make_etag(raw))
+        with _cache_lock:
+            _cache[cache_key] = entry
+            _cache.move_to_end(cache_key)
+            while len(_cache) > PRECOMPRESS_CACHE_SIZE:
+                _cache.popitem(last=False)
+                _stats["evictions"] += 1
+
+    _, body, applied, etag = entry
+    headers = {"Vary": "Accept-Encoding"}
+    if etag_matches(request, etag):
+        return not_modified(etag, policy, headers)
+
+    headers["ETag"] = etag
+    headers["Cache-Control"] = CACHE_POLICIES[policy]
+    if applied:
+        headers["Content-Encoding"] = applied
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_stats():
+    return {"entries": len(_cache), **_stats}
@@ -0,0 +1,135 @@
+# backend/conditional.py
+"""
+ETags, If-None-Match and Cache-Control for cacheable GET endpoints
+ETags are strong: a hash of the exact response body, computed once per
+catalog version (restaurants / menus), so a matching If-None-Match can be
+answered with 304 from memory. Order and driver queue ETags are remembered
+with a cheap database fingerprint of what they cover, and only reused while
+that fingerprint is unchanged (any worker's writes change it).
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+# Cache-Control per kind of resource
+CACHE_POLICIES = {
+    # Catalog changes rarely; browsers may reuse it briefly, then revalidate
+    "catalog": "public, max-age=60, stale-while-revalidate=300",
+    # Orders change as the delivery moves; always revalidate (304 is cheap)
+    "order": "private, no-cache",
+}
+
+# Orders / driver queues whose ETags a worker remembers (least recently
+# served go first). Every reuse is checked against the database fingerprint,
+# so entries never go stale; this only bounds the memory.
+ETAG_MEMO_SIZE = int(os.getenv("ETAG_MEMO_SIZE", "50000"))
+
+
+def make_etag(body, suffix=None):
+    digest = hashlib.sha1(body).hexdigest()[:20]
+    return f'"{digest}-{suffix}"' if suffix else f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match covers `etag`"""
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag, policy, extra_headers=None):
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+    if extra_headers:
+        headers.update(extra_headers)
+    return Response(status_code=304, headers=headers)
+
+
+def render_json(payload):
+    """Serialize exactly like FastAPI's default JSON response"""
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def json_with_etag(request, payload, policy):
+    """(response, etag): JSON with ETag / Cache-Control, or 304 if the client already has it"""
+    body = render_json(payload)
+    etag = make_etag(body)
+    if etag_matches(request, etag):
+        return not_modified(etag, policy), etag
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+    return Response(content=body, media_type="application/json", headers=headers), etag
+
+
+# ==================== ORDER / DRIVER VERSIONS ====================
+
+_order_etags = OrderedDict()  # order_id -> {variant: (etag, version)}
+_driver_etags = OrderedDict()  # driver_id -> {page: (etag, version)}
+_order_lock = threading.Lock()
+
+
+def _cached(table, key, variant):
+    with _order_lock:
+        variants = table.get(key)
+        if variants is None:
+            return None
+        table.move_to_end(key)
+        return variants.get(variant)
+
+
+def _remember(table, key, etag, variant):
+    with _order_lock:
+        table.setdefault(key, {})[variant] = etag
+        table.move_to_end(key)
+        while len(table) > ETAG_MEMO_SIZE:
+            table.popitem(last=False)
+
+
+def cached_order_etag(order_id, variant=None):
+    """
+    Remembered (ETag, order version) for an order (variant: e.g. the
+    requested fields), or None. Only valid while get_order_version() still
+    returns that version.
+    """
+    return _cached(_order_etags, order_id, variant)
+
+
+def remember_order_etag(order_id, etag, version, variant=None):
+    _remember(_order_etags, order_id, (etag, version), variant)
+
+
+def bump_order_version(order_id):
+    """Call after any write touching an order (its ORDERS/ORDER_ITEMS/PAYMENTS/DELIVERIES rows)"""
+    with _order_lock:
+        _order_etags.pop(order_id, None)
+
+
+def cached_driver_etag(driver_id, variant=None):
+    """
+    Remembered (ETag, queue version) for a driver's work queue (variant: the
+    requested page), or None. Only valid while get_driver_queue_version()
+    still returns that version.
+    """
+    return _cached(_driver_etags, driver_id, variant)
+
+
+def remember_driver_etag(driver_id, etag, version, variant=None):
+    _remember(_driver_etags, driver_id, (etag, version), variant)
+
+
+def bump_driver_version(driver_id):
+    """Call after a delivery is assigned to, or changes status for, this driver"""
+    with _order_lock:
+        _driver_etags.pop(driver_id, None)
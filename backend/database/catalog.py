@@ -0,0 +1,103 @@
+# backend/database/catalog.py
+"""
+In-memory cache of the restaurant catalog (RESTAURANT + MENU)
+The catalog changes rarely, so each worker keeps a copy and reloads it
+when the TTL runs out or when invalidate() is called after a write.
+Reads may come from a replica, except right after invalidate(), when the
+replicas may not have the change yet.
+"""
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from database.connection import REPLICA_MAX_LAG_SECONDS, primary
+from database.queries import get_all_restaurants, get_restaurant_menu
+
+CATALOG_TTL_SECONDS = int(os.getenv("CATALOG_TTL_SECONDS", "300"))
+
+_lock = threading.Lock()
+_restaurants = None
+_restaurants_by_id = {}
+_menus = {}
+_loaded_at = 0.0
+_invalidated_at = None
+_version = 0
+
+
+def _expired():
+    return _restaurants is None or time.monotonic() - _loaded_at > CATALOG_TTL_SECONDS
+
+
+def _source():
+    if _invalidated_at is not None and time.monotonic() - _invalidated_at < REPLICA_MAX_LAG_SECONDS:
+        return primary()
+    return nullcontext()
+
+
+def load(include_menus=True):
+    """Reload the catalog from the database (used by warmup and on expiry)"""
+    global _restaurants, _restaurants_by_id, _menus, _loaded_at, _version
+
+    with _source():
+        restaurants = get_all_restaurants()
+        if not restaurants:
+            # Database unreachable (or empty) - don't pin an empty catalog for a whole TTL
+            return 0
+
+        menus = {}
+        if include_menus:
+            for r in restaurants:
+                menus[r["RESTAURANT_ID"]] = get_restaurant_menu(r["RESTAURANT_ID"])
+
+    with _lock:
+        _restaurants = restaurants
+        _restaurants_by_id = {r["RESTAURANT_ID"]: r for r in restaurants}
+        _menus = menus
+        _loaded_at = time.monotonic()
+        _version += 1
+    return len(restaurants)
+
+
+def invalidate():
+    """Drop the cached catalog so the next read goes to the database"""
+    global _restaurants, _menus, _invalidated_at
+    with _lock:
+        _restaurants = None
+        _menus = {}
+        _invalidated_at = time.monotonic()
+
+
+def get_restaurants():
+    """All restaurants (cached)"""
+    if _expired():
+        load(include_menus=False)
+    return _restaurants or []
+
+
+def get_restaurant(restaurant_id):
+    """One restaurant by ID (cached)"""
+    if _expired():
+        load(include_menus=False)
+    return _restaurants_by_id.get(restaurant_id)
+
+
+def get_menu(restaurant_id):
+    """Menu items for a restaurant (cached per restaurant)"""
+    if _expired():
+        load(include_menus=False)
+    menu = _menus.get(restaurant_id)
+    if menu is None:
+        with _source():
+            menu = get_restaurant_menu(restaurant_id)
+        if not menu:
+            return []
+        with _lock:
+            _menus[restaurant_id] = menu
+    return menu
+
+
+def version():
+    """Counter bumped every time the catalog is reloaded"""
+    return _version
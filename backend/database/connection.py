@@ -1,24 +1,371 @@
 # backend/database/connection.py
+"""
+MySQL connections: a pool per worker for the primary, plus optional read
+replicas (DB_REPLICA_HOSTS) for callers that ask for read_only=True.
+A replica only gets reads while its last check found it replicating less
+than DB_REPLICA_MAX_LAG_SECONDS behind; otherwise, inside primary(), and
+when its pool fails, reads go to the primary.
+"""
+import asyncio
+import contextvars
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+
+# Connection settings (override with environment variables in production)
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "restaurant-ordering-db.cloa0iio2j0o.us-east-2.rds.amazonaws.com"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER", "admin"),
+    "password": os.getenv("DB_PASSWORD", "dbProject5095!"),
+    "database": os.getenv("DB_NAME", "restaurant_ordering"),
+}
+
+# Connections kept open per worker process
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+# Seconds a caller waits for a shared (batch) connection before taking its own
+SHARED_WAIT_SECONDS = 2.0
+
+# Read replicas: "host[:port],host[:port]", same user / password / database as the primary
+DB_REPLICA_HOSTS = os.getenv("DB_REPLICA_HOSTS", "")
+REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(POOL_SIZE)))
+# Replicas further behind than this (or not replicating at all) get no reads
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+# health.py re-checks replicas every probe; other processes re-check when a check is this old
+REPLICA_STALE_SECONDS = 30
+REPLICA_CONNECT_TIMEOUT = 3
+
+_pool = None
+_pool_lock = threading.Lock()
+_shared = contextvars.ContextVar("shared_connection", default=None)
+_pinned = contextvars.ContextVar("primary_pinned", default=False)
+
+
+def init_pool(size=None):
+    """Create this process's connection pool (called once per worker)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        try:
+            _pool = pooling.MySQLConnectionPool(
+                pool_name=f"toh_pool_{os.getpid()}",
+                pool_size=size or POOL_SIZE,
+                pool_reset_session=True,
+                **DB_CONFIG,
+            )
+            print(f"✅ Connection pool ready ({_pool.pool_size} connections, pid {os.getpid()})")
+        except Error as e:
+            print(f"❌ Error creating connection pool: {e}")
+            _pool = None
+        return _pool
+
+
+def reset_pool():
+    """Forget the inherited pools after a fork so the worker opens its own sockets"""
+    global _pool
+    with _pool_lock:
+        _pool = None
+    for replica in _replicas:
+        replica.pool = None
+
+
+def pool_stats():
+    """Size / idle / in-use counts for this worker's pool (None before it exists)"""
+    pool = _pool
+    if pool is None:
+        return None
+    idle = pool._cnx_queue.qsize()
+    return {
+        "size": pool.pool_size,
+        "idle": idle,
+        "in_use": pool.pool_size - idle,
+    }
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
 
-def get_db_connection():
-    """Create and return database connection"""
+class _SharedConnection:
+    """One pooled connection handed to several callers in turn (see shared_connection)"""
+
+    def __init__(self):
+        self.conn = None
+        self.lock = threading.Lock()
+        self.leases = 0
+
+    def lease(self):
+        # On the event loop thread a wait would stall every other request:
+        # take the connection only if it is free
+        if _on_event_loop():
+            acquired = self.lock.acquire(blocking=False)
+        else:
+            acquired = self.lock.acquire(timeout=SHARED_WAIT_SECONDS)
+        if not acquired:
+            return None
+        if self.conn is None:
+            # Checked out on first use, so batches served from caches never take one
+            self.conn = _checkout()
+            if self.conn is None:
+                self.lock.release()
+                return None
+        self.leases += 1
+        return _Lease(self)
+
+
+class _Lease:
+    """Looks like a connection; close() hands it to the next caller instead of closing it"""
+
+    def __init__(self, shared):
+        self._shared = shared
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._shared.conn, name)
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        try:
+            # Drop rows a fetchone() left unread so the next caller can query
+            self._shared.conn.consume_results()
+        except Exception:
+            pass
+        self._shared.lock.release()
+
+    __del__ = close
+
+
+@contextmanager
+def shared_connection():
+    """
+    Serve every get_db_connection() in this context (including threads started
+    from it, e.g. FastAPI's threadpool) from a single pooled connection.
+    Callers take turns; one that waits too long falls back to its own connection.
+    """
+    shared = _SharedConnection()
+    token = _shared.set(shared)
     try:
-        conn = mysql.connector.connect(
-            host="restaurant-ordering-db.cloa0iio2j0o.us-east-2.rds.amazonaws.com",
-            port=3306,
-            user="admin",
-            password="dbProject5095!",
-            database="restaurant_ordering"
-        )
+        yield shared
+    finally:
+        _shared.reset(token)
+        if shared.conn is not None:
+            shared.conn.close()
+
+
+# ==================== READ REPLICAS ====================
+
+class _Replica:
+    def __init__(self, index, host, port):
+        self.name = f"{host}:{port}"
+        self.index = index
+        self.config = {**DB_CONFIG, "host": host, "port": port, "connection_timeout": REPLICA_CONNECT_TIMEOUT}
+        self.pool = None
+        self.healthy = False  # until the first check
+        self.lag = None
+        self.error = None
+        self.reads = 0
+        self.fallbacks = 0
+
+    def checkout(self):
+        if self.pool is None:
+            with _pool_lock:
+                if self.pool is None:
+                    self.pool = pooling.MySQLConnectionPool(
+                        pool_name=f"toh_replica{self.index}_{os.getpid()}",
+                        pool_size=REPLICA_POOL_SIZE,
+                        pool_reset_session=True,
+                        **self.config,
+                    )
+        return self.pool.get_connection()
+
+    def check(self):
+        """Read this replica's lag; healthy if it replicates within REPLICA_MAX_LAG_SECONDS"""
+        try:
+            conn = self.checkout()
+        except Error as e:
+            self.healthy, self.lag, self.error = False, None, str(e)
+            return
+        cursor = conn.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Error:
+                # MySQL before 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+            cursor.fetchall()
+        except Error as e:
+            self.healthy, self.lag, self.error = False, None, str(e)
+            return
+        finally:
+            cursor.close()
+            conn.close()
+
+        lag = None
+        if row:
+            lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        if lag is None:
+            self.healthy, self.lag, self.error = False, None, "not replicating"
+        else:
+            self.lag = float(lag)
+            self.healthy = self.lag <= REPLICA_MAX_LAG_SECONDS
+            self.error = None if self.healthy else f"{self.lag:.0f}s behind"
+
+
+def _parse_replicas(spec):
+    replicas = []
+    for index, entry in enumerate(e.strip() for e in spec.split(",") if e.strip()):
+        host, _, port = entry.partition(":")
+        replicas.append(_Replica(index, host, int(port or DB_CONFIG["port"])))
+    return replicas
+
+
+_replicas = _parse_replicas(DB_REPLICA_HOSTS)
+_round_robin = itertools.count()
+_check_lock = threading.Lock()
+_checked_at = None
+
+
+def _check_all():
+    global _checked_at
+    for replica in _replicas:
+        was_healthy = replica.healthy
+        replica.check()
+        if was_healthy and not replica.healthy:
+            print(f"⚠️ Replica {replica.name} out of rotation: {replica.error}")
+        elif replica.healthy and not was_healthy:
+            print(f"✅ Replica {replica.name} in rotation (lag {replica.lag:.0f}s)")
+    _checked_at = time.monotonic()
+
+
+def check_replicas():
+    """Re-check every replica's health and lag (health.py calls this each probe)"""
+    if not _replicas:
+        return
+    with _check_lock:
+        _check_all()
+
+
+def _healthy_replicas():
+    if _checked_at is None or time.monotonic() - _checked_at > REPLICA_STALE_SECONDS:
+        # No prober in this process (scripts), or it stopped: whoever gets here
+        # first checks, everyone else goes on with the last known state
+        if _check_lock.acquire(blocking=False):
+            try:
+                _check_all()
+            finally:
+                _check_lock.release()
+    return [r for r in _replicas if r.healthy]
+
+
+def _replica_checkout():
+    healthy = _healthy_replicas()
+    if not healthy:
+        return None
+    replica = healthy[next(_round_robin) % len(healthy)]
+    try:
+        conn = replica.checkout()
+    except Error as e:
+        replica.fallbacks += 1
+        if not isinstance(e, pooling.PoolError):
+            # Unreachable: out of rotation until the next check finds it well
+            replica.healthy, replica.error = False, str(e)
+        return None
+    replica.reads += 1
+    return conn
+
+
+@contextmanager
+def primary():
+    """Send read_only reads in this context to the primary (read-your-writes)"""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def pinned():
+    """True inside primary()"""
+    return _pinned.get()
+
+
+def replica_stats():
+    """Per-replica health, lag and read counts (empty without DB_REPLICA_HOSTS)"""
+    return [
+        {
+            "replica": r.name,
+            "healthy": r.healthy,
+            "lag_seconds": r.lag,
+            "error": r.error,
+            "reads": r.reads,
+            "fallbacks": r.fallbacks,
+        }
+        for r in _replicas
+    ]
+
+
+def _checkout():
+    pool = _pool or init_pool()
+    if pool is not None:
+        try:
+            # close() on a pooled connection hands it back to the pool
+            return pool.get_connection()
+        except Error as e:
+            print(f"⚠️ Pool exhausted or unavailable, opening direct connection: {e}")
+
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
         if conn.is_connected():
-            print("✅ Successfully connected to database")
             return conn
     except Error as e:
         print(f"❌ Error connecting to database: {e}")
         return None
 
+
+def pooled_connection():
+    """
+    A connection from this worker's pool, never a direct one (health probes:
+    a direct connection would hide an exhausted pool). None if the pool
+    can't be created; raises pooling.PoolError when it is exhausted and
+    Error when MySQL is unreachable.
+    """
+    pool = _pool or init_pool()
+    if pool is None:
+        return None
+    return pool.get_connection()
+
+
+def get_db_connection(read_only=False):
+    """
+    Pooled database connection: the primary, or for read_only callers a
+    healthy replica when there is one (outside primary())
+    """
+    if read_only and _replicas and not _pinned.get():
+        conn = _replica_checkout()
+        if conn is not None:
+            return conn
+    shared = _shared.get()
+    if shared is not None:
+        lease = shared.lease()
+        if lease is not None:
+            return lease
+    return _checkout()
+
+
 def test_connection():
     """Test database connection and show tables"""
     conn = get_db_connection()
@@ -36,4 +383,4 @@ def test_connection():
 
 if __name__ == "__main__":
     print("🔍 Testing database connection...\n")
-    test_connection()
\ No newline at end of file
+    test_connection()
@@ -5,7 +5,81 @@ All queries use raw SQL (no ORM per project requirements)
 """
 
 from database.connection import get_db_connection
+from database.singleflight import coalesce
+from conditional import bump_order_version, bump_driver_version
+import events
+import pricing
+import tracking
+from schemas import DELIVERY_TRANSITIONS, FINAL_ORDER_STATUSES, ORDER_STATUS_FOR_DELIVERY
 from datetime import datetime, timedelta
+import json
+from mysql.connector import errors as mysql_errors
+import outbox
+
+# ==================== FIELD SELECTION ====================
+# Public field name -> SQL column, used to build explicit projections
+# when an endpoint is called with ?fields=...
+
+ORDER_COLUMNS = {
+    "ORDER_ID": "o.ORDER_ID",
+    "USER_ID": "o.USER_ID",
+    "RESTAURANT_ID": "o.RESTAURANT_ID",
+    "ORDER_DATE": "o.ORDER_DATE",
+    "STATUS": "o.STATUS",
+    "TOTAL_AMOUNT": "o.TOTAL_AMOUNT",
+    "PLATFORM_COMMISSION": "o.PLATFORM_COMMISSION",
+    "SERVICE_FEE": "o.SERVICE_FEE",
+    "PLATFORM_PROFIT_ORDER": "o.PLATFORM_PROFIT_ORDER",
+    "USER_NAME": "u.USER_NAME",
+    "RESTAURANT_NAME": "r.RESTAURANT_NAME",
+}
+# Nested parts of an order, each costing one extra query
+ORDER_SUBRESOURCES = ("items", "delivery")
+
+RESTAURANT_COLUMNS = {
+    "RESTAURANT_ID": "r.RESTAURANT_ID",
+    "OWNER_ID": "r.OWNER_ID",
+    "RESTAURANT_NAME": "r.RESTAURANT_NAME",
+    "BUILDING_NUMBER": "r.BUILDING_NUMBER",
+    "STREET": "r.STREET",
+    "CITY": "r.CITY",
+    "STATE": "r.STATE",
+    "ZIPCODE": "r.ZIPCODE",
+    "PHONE": "r.PHONE",
+    "LATITUDE": "r.LATITUDE",
+    "LONGITUDE": "r.LONGITUDE",
+    "OWNER_NAME": "u.USER_NAME",
+}
+
+MENU_COLUMNS = {
+    "MENU_ITEM_ID": "MENU_ITEM_ID",
+    "ITEM_NAME": "ITEM_NAME",
+    "ITEM_DESCRIP": "ITEM_DESCRIP",
+    "PRICE": "PRICE",
+    "RESTAURANT_ID": "RESTAURANT_ID",
+}
+
+def parse_fields(fields, allowed, extra=()):
+    """
+    "ORDER_ID,TOTAL_AMOUNT" -> ("ORDER_ID", "TOTAL_AMOUNT"); empty/None means all fields
+    Raises ValueError on unknown names.
+    """
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [n for n in names if n not in allowed and n not in extra]
+    if unknown:
+        valid = ", ".join(list(allowed) + list(extra))
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Valid fields: {valid}")
+    return names or None
+
+def _projection(fields, columns, required=()):
+    """SELECT list for the requested fields (always including `required`)"""
+    names = list(required) + [f for f in fields if f in columns and f not in required]
+    return ", ".join(
+        columns[n] if columns[n].endswith("." + n) or columns[n] == n else f"{columns[n]} AS {n}"
+        for n in names
+    )
 
 # ==================== USER QUERIES ====================
 
@@ -45,6 +119,7 @@ def get_user_by_email(email):
     conn.close()
     return user
 
+@coalesce
 def get_user_by_id(user_id):
     """Get user by ID"""
     conn = get_db_connection()
@@ -61,37 +136,56 @@ def get_user_by_id(user_id):
 
 # ==================== RESTAURANT QUERIES ====================
 
-def get_all_restaurants():
-    """Get all restaurants"""
-    conn = get_db_connection()
+@coalesce(read_only=True)
+def get_all_restaurants(fields=None):
+    """Get all restaurants (fields: optional tuple of RESTAURANT_COLUMNS names)"""
+    conn = get_db_connection(read_only=True)
     if not conn:
         return []
     
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT r.*, u.USER_NAME as OWNER_NAME
-        FROM RESTAURANT r
-        JOIN USERS u ON r.OWNER_ID = u.USER_ID
-    """
+    if fields:
+        join = "JOIN USERS u ON r.OWNER_ID = u.USER_ID" if "OWNER_NAME" in fields else ""
+        query = f"""
+            SELECT {_projection(fields, RESTAURANT_COLUMNS)}
+            FROM RESTAURANT r
+            {join}
+        """
+    else:
+        query = """
+            SELECT r.*, u.USER_NAME as OWNER_NAME
+            FROM RESTAURANT r
+            JOIN USERS u ON r.OWNER_ID = u.USER_ID
+        """
     cursor.execute(query)
     restaurants = cursor.fetchall()
     cursor.close()
     conn.close()
     return restaurants
 
-def get_restaurant_by_id(restaurant_id):
+@coalesce(read_only=True)
+def get_restaurant_by_id(restaurant_id, fields=None):
     """Get restaurant details by ID"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     if not conn:
         return None
     
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT r.*, u.USER_NAME as OWNER_NAME
-        FROM RESTAURANT r
-        JOIN USERS u ON r.OWNER_ID = u.USER_ID
-        WHERE r.RESTAURANT_ID = %s
-    """
+    if fields:
+        join = "JOIN USERS u ON r.OWNER_ID = u.USER_ID" if "OWNER_NAME" in fields else ""
+        query = f"""
+            SELECT {_projection(fields, RESTAURANT_COLUMNS)}
+            FROM RESTAURANT r
+            {join}
+            WHERE r.RESTAURANT_ID = %s
+        """
+    else:
+        query = """
+            SELECT r.*, u.USER_NAME as OWNER_NAME
+            FROM RESTAURANT r
+            JOIN USERS u ON r.OWNER_ID = u.USER_ID
+            WHERE r.RESTAURANT_ID = %s
+        """
     cursor.execute(query, (restaurant_id,))
     restaurant = cursor.fetchone()
     cursor.close()
@@ -100,15 +194,16 @@ def get_restaurant_by_id(restaurant_id):
 
 # ==================== MENU QUERIES ====================
 
-def get_restaurant_menu(restaurant_id):
-    """Get all menu items for a restaurant"""
-    conn = get_db_connection()
+@coalesce(read_only=True)
+def get_restaurant_menu(restaurant_id, fields=None):
+    """Get all menu items for a restaurant (fields: optional tuple of MENU_COLUMNS names)"""
+    conn = get_db_connection(read_only=True)
     if not conn:
         return []
     
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT * FROM MENU
+    query = f"""
+        SELECT {_projection(fields, MENU_COLUMNS) if fields else "*"} FROM MENU
         WHERE RESTAURANT_ID = %s
         ORDER BY ITEM_NAME
     """
@@ -118,9 +213,10 @@ def get_restaurant_menu(restaurant_id):
     conn.close()
     return menu_items
 
+@coalesce(read_only=True)
 def get_menu_item_by_id(menu_item_id):
     """Get menu item by ID"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     if not conn:
         return None
     
@@ -134,17 +230,21 @@ def get_menu_item_by_id(menu_item_id):
 
 # ==================== ORDER QUERIES ====================
 
-def create_order(user_id, restaurant_id, subtotal, total_amount):
-    """Create a new order with profit tracking"""
+def create_order(user_id, restaurant_id, subtotal, total_amount, status="CONFIRMED", idempotency_key=None):
+    """
+    Create a new order with profit tracking (CONFIRMED: paid, waiting for its
+    delivery). With idempotency_key, the ORDER_ID is recorded on that
+    IN_PROGRESS key in the same transaction.
+    """
     conn = get_db_connection()
     if not conn:
         return None
     
     try:
         # Calculate commission and fees
-        platform_commission = subtotal * 0.15
-        service_fee = 2.99
-        platform_profit = platform_commission + service_fee
+        platform_commission = pricing.platform_commission(subtotal)
+        service_fee = pricing.SERVICE_FEE
+        platform_profit = pricing.order_platform_profit(subtotal)
         
         cursor = conn.cursor()
         query = """
@@ -153,19 +253,27 @@ def create_order(user_id, restaurant_id, subtotal, total_amount):
                 PLATFORM_COMMISSION, SERVICE_FEE, PLATFORM_PROFIT_ORDER,
                 STATUS
             )
-            VALUES (%s, %s, %s, %s, %s, %s, 'DELIVERED')
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         cursor.execute(query, (
             user_id, restaurant_id, total_amount,
-            platform_commission, service_fee, platform_profit
+            platform_commission, service_fee, platform_profit, status
         ))
-        conn.commit()
         order_id = cursor.lastrowid
+        if idempotency_key is not None:
+            cursor.execute("""
+                UPDATE IDEMPOTENCY_KEYS SET ORDER_ID = %s
+                WHERE IDEMPOTENCY_KEY = %s AND STATUS = 'IN_PROGRESS'
+            """, (order_id, idempotency_key))
+        _outbox(cursor, [_order_created(order_id, user_id, restaurant_id, total_amount, subtotal, status)])
+        conn.commit()
         cursor.close()
         conn.close()
         return order_id
     except Exception as e:
         print(f"Error creating order: {e}")
+        conn.rollback()
+        conn.close()
         return None
 
 def add_order_item(order_id, menu_item_id, quantity, price):
@@ -181,17 +289,36 @@ def add_order_item(order_id, menu_item_id, quantity, price):
             VALUES (%s, %s, %s, %s)
         """
         cursor.execute(query, (order_id, menu_item_id, quantity, price))
-        conn.commit()
         order_item_id = cursor.lastrowid
+        _outbox(cursor, [("ORDER", order_id, "item_added", {
+            "ORDER_ID": order_id, "MENU_ITEM_ID": menu_item_id, "QUANTITY": quantity, "PRICE": price,
+        })])
+        conn.commit()
+        bump_order_version(order_id)
         cursor.close()
         conn.close()
         return order_item_id
     except Exception as e:
         print(f"Error adding order item: {e}")
+        conn.rollback()
+        conn.close()
         return None
 
-def get_order_details(order_id):
-    """Get complete order details with items and delivery info"""
+def _order_joins(fields):
+    joins = []
+    if fields is None or "USER_NAME" in fields:
+        joins.append("JOIN USERS u ON o.USER_ID = u.USER_ID")
+    if fields is None or "RESTAURANT_NAME" in fields:
+        joins.append("JOIN RESTAURANT r ON o.RESTAURANT_ID = r.RESTAURANT_ID")
+    return "\n        ".join(joins)
+
+@coalesce
+def get_order_details(order_id, fields=None):
+    """
+    Get complete order details with items and delivery info
+    fields: optional tuple of ORDER_COLUMNS names plus "items" / "delivery";
+    the items and delivery queries only run when requested.
+    """
     conn = get_db_connection()
     if not conn:
         return None
@@ -199,17 +326,17 @@ def get_order_details(order_id):
     cursor = conn.cursor(dictionary=True)
     
     # Get order info
-    query = """
-        SELECT o.*, u.USER_NAME, r.RESTAURANT_NAME
+    select = "o.*, u.USER_NAME, r.RESTAURANT_NAME" if fields is None else _projection(fields, ORDER_COLUMNS, required=("ORDER_ID",))
+    query = f"""
+        SELECT {select}
         FROM ORDERS o
-        JOIN USERS u ON o.USER_ID = u.USER_ID
-        JOIN RESTAURANT r ON o.RESTAURANT_ID = r.RESTAURANT_ID
+        {_order_joins(fields)}
         WHERE o.ORDER_ID = %s
     """
     cursor.execute(query, (order_id,))
     order = cursor.fetchone()
     
-    if order:
+    if order and (fields is None or "items" in fields):
         # Get order items
         query = """
             SELECT oi.*, m.ITEM_NAME, m.ITEM_DESCRIP
@@ -220,6 +347,7 @@ def get_order_details(order_id):
         cursor.execute(query, (order_id,))
         order['items'] = cursor.fetchall()
         
+    if order and (fields is None or "delivery" in fields):
         # Get delivery info (NEW)
         query = """
             SELECT 
@@ -237,6 +365,60 @@ def get_order_details(order_id):
     conn.close()
     return order
 
+def get_order_version(order_id):
+    """
+    Fingerprint of what GET /api/orders/{id} shows that changes after an
+    order is placed: its status and amounts, its items and its delivery.
+    One query by key, always on the primary; None if the order doesn't exist
+    or the database is unavailable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    query = """
+        SELECT CONCAT_WS('|',
+            o.STATUS, o.TOTAL_AMOUNT, IFNULL(o.PLATFORM_COMMISSION, ''),
+            IFNULL(o.SERVICE_FEE, ''), IFNULL(o.PLATFORM_PROFIT_ORDER, ''),
+            (SELECT CONCAT(COUNT(*), '/', IFNULL(MAX(oi.ORDER_ITEM_ID), 0), '/', IFNULL(SUM(oi.PRICE * oi.QUANTITY), 0))
+             FROM ORDER_ITEMS oi WHERE oi.ORDER_ID = o.ORDER_ID),
+            IFNULL((SELECT CONCAT_WS('/', d.DELIVERY_ID, d.DELIVERY_STATUS, d.DRIVER_ID,
+                                     IFNULL(d.ESTIMATED_TIME, ''), IFNULL(d.ACTUAL_TIME, ''))
+                    FROM DELIVERIES d WHERE d.ORDER_ID = o.ORDER_ID
+                    ORDER BY d.DELIVERY_ID LIMIT 1), '')
+        )
+        FROM ORDERS o
+        WHERE o.ORDER_ID = %s
+    """
+    cursor.execute(query, (order_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row[0] if row else None
+
+@coalesce
+def get_user_order_rows(user_id, fields):
+    """A user's orders (newest first) as flat rows, projected to `fields` in one query"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    
+    cursor = conn.cursor(dictionary=True)
+    query = f"""
+        SELECT {_projection(fields, ORDER_COLUMNS, required=("ORDER_ID",))}
+        FROM ORDERS o
+        {_order_joins(fields)}
+        WHERE o.USER_ID = %s
+        ORDER BY o.ORDER_ID DESC
+    """
+    cursor.execute(query, (user_id,))
+    orders = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return orders
+
+@coalesce
 def get_user_orders(user_id):
     """Get all orders for a user"""
     conn = get_db_connection()
@@ -257,6 +439,7 @@ def get_user_orders(user_id):
     conn.close()
     return orders
 
+@coalesce
 def get_orders_for_user(user_id: int):
     """Get order IDs for a specific user"""
     conn = get_db_connection()
@@ -281,8 +464,8 @@ def get_orders_for_user(user_id: int):
 
 # ==================== PAYMENT QUERIES ====================
 
-def create_payment(order_id, amount, method):
-    """Create a payment record"""
+def create_payment(order_id, amount, method, status="COMPLETED"):
+    """Create a payment record (status PENDING leaves it to payments.py)"""
     conn = get_db_connection()
     if not conn:
         return None
@@ -291,58 +474,381 @@ def create_payment(order_id, amount, method):
         cursor = conn.cursor()
         query = """
             INSERT INTO PAYMENTS (ORDER_ID, AMOUNT, METHOD, STATUS)
-            VALUES (%s, %s, %s, 'COMPLETED')
+            VALUES (%s, %s, %s, %s)
         """
-        cursor.execute(query, (order_id, amount, method))
-        conn.commit()
+        cursor.execute(query, (order_id, amount, method, status))
         payment_id = cursor.lastrowid
+        _outbox(cursor, [("ORDER", order_id, "payment_created", {
+            "ORDER_ID": order_id, "PAYMENT_ID": payment_id, "AMOUNT": amount, "STATUS": status,
+        })])
+        conn.commit()
+        bump_order_version(order_id)
         cursor.close()
         conn.close()
         return payment_id
     except Exception as e:
         print(f"Error creating payment: {e}")
+        conn.rollback()
+        conn.close()
+        return None
+
+def settle_payment(payment_id, order_id, payment_status, order_status, processor_ref=None, failure_reason=None,
+                   delivery=None):
+    """
+    Move a PENDING payment to COMPLETED / FAILED and its PENDING order to
+    order_status, in one transaction. delivery=(driver_id, estimated_time)
+    also creates the order's ASSIGNED delivery in that transaction, so a paid
+    order is never left without one. Returns True if this call settled it,
+    False if it was already settled (another worker got there first), None
+    on error.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    delivery_id = None
+    try:
+        cursor.execute("""
+            UPDATE PAYMENTS
+            SET STATUS = %s, PROCESSOR_REF = %s, FAILURE_REASON = %s
+            WHERE PAYMENT_ID = %s AND STATUS = 'PENDING'
+        """, (payment_status, processor_ref, failure_reason and failure_reason[:255], payment_id))
+        settled = cursor.rowcount == 1
+        if settled:
+            changes = [("ORDER", order_id, "payment_settled", {
+                "ORDER_ID": order_id, "PAYMENT_ID": payment_id, "STATUS": payment_status,
+            })]
+            cursor.execute("""
+                UPDATE ORDERS SET STATUS = %s
+                WHERE ORDER_ID = %s AND STATUS = 'PENDING'
+            """, (order_status, order_id))
+            if cursor.rowcount == 1:
+                cursor.execute("""
+                    SELECT RESTAURANT_ID, TOTAL_AMOUNT, PLATFORM_COMMISSION, SERVICE_FEE
+                    FROM ORDERS WHERE ORDER_ID = %s
+                """, (order_id,))
+                row = cursor.fetchone()
+                restaurant_id = row[0]
+                changes.append(("ORDER", order_id, "status_changed", {
+                    "ORDER_ID": order_id, "RESTAURANT_ID": restaurant_id, "FROM": "PENDING", "TO": order_status,
+                    "TOTAL_AMOUNT": row[1], "PLATFORM_COMMISSION": row[2], "SERVICE_FEE": row[3],
+                }))
+                if delivery is not None:
+                    delivery_id = _insert_delivery(cursor, order_id, *delivery)
+                    changes.append(_delivery_created(delivery_id, order_id, delivery[0], restaurant_id))
+            _outbox(cursor, changes)
+        conn.commit()
+    except Exception as e:
+        print(f"Error settling payment: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+    if settled:
+        bump_order_version(order_id)
+    if delivery_id is not None:
+        bump_driver_version(delivery[0])
+        events.record(delivery_id, order_id, restaurant_id, delivery[0], None, "ASSIGNED")
+    return settled
+
+def claim_pending_payments(claimed_by, older_than_seconds, lease_seconds, limit=500):
+    """
+    Claim PENDING payments created more than older_than_seconds ago that no
+    sweep holds (or whose claim lease ran out) for lease_seconds, and return
+    them with the order's restaurant. Concurrent sweeps claim disjoint rows.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            UPDATE PAYMENTS
+            SET CLAIMED_BY = %s, CLAIMED_UNTIL = NOW() + INTERVAL %s SECOND
+            WHERE STATUS = 'PENDING'
+              AND PAYMENT_DATE < NOW() - INTERVAL %s SECOND
+              AND (CLAIMED_UNTIL IS NULL OR CLAIMED_UNTIL < NOW())
+            ORDER BY PAYMENT_DATE
+            LIMIT %s
+        """, (claimed_by, lease_seconds, older_than_seconds, limit))
+        conn.commit()
+        if cursor.rowcount == 0:
+            return []
+        cursor.execute("""
+            SELECT p.PAYMENT_ID, p.ORDER_ID, p.AMOUNT, p.METHOD, o.RESTAURANT_ID
+            FROM PAYMENTS p
+            JOIN ORDERS o ON p.ORDER_ID = o.ORDER_ID
+            WHERE p.CLAIMED_BY = %s AND p.STATUS = 'PENDING'
+            ORDER BY p.PAYMENT_DATE
+        """, (claimed_by,))
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"Error claiming pending payments: {e}")
+        conn.rollback()
         return None
+    finally:
+        cursor.close()
+        conn.close()
 
 # ==================== DELIVERY QUERIES ====================
-def create_delivery(order_id, driver_id, delivery_address, estimated_time):
-    """Create a new delivery record"""
+def _insert_delivery(cursor, order_id, driver_id, estimated_time):
+    """INSERT an ASSIGNED delivery in the caller's transaction; returns its DELIVERY_ID"""
+    # Calculate delivery fees
+    delivery_fee_total = pricing.DELIVERY_FEE
+    delivery_platform_cut = pricing.DELIVERY_PLATFORM_CUT
+
+    query = """
+        INSERT INTO DELIVERIES 
+        (ORDER_ID, DRIVER_ID, ESTIMATED_TIME, DELIVERY_FEE_TOTAL, 
+         DELIVERY_PLATFORM_CUT, DELIVERY_STATUS)
+        VALUES (%s, %s, %s, %s, %s, 'ASSIGNED')
+    """
+    cursor.execute(query, (
+        order_id, driver_id, estimated_time,
+        delivery_fee_total, delivery_platform_cut
+    ))
+    return cursor.lastrowid
+
+def create_delivery(order_id, driver_id, delivery_address, estimated_time, restaurant_id=None):
+    """Create a new ASSIGNED delivery (restaurant_id is only used for the event log)"""
     conn = get_db_connection()
     if not conn:
         return None
     
     try:
-        # Calculate delivery fees
-        delivery_fee_total = 3.99
-        delivery_platform_cut = 0.60
-        
         cursor = conn.cursor()
-        query = """
-            INSERT INTO DELIVERIES 
-            (ORDER_ID, DRIVER_ID, ESTIMATED_TIME, DELIVERY_FEE_TOTAL, 
-             DELIVERY_PLATFORM_CUT, DELIVERY_STATUS, ACTUAL_TIME)
-            VALUES (%s, %s, %s, %s, %s, 'DELIVERED', NOW())
-        """
-        cursor.execute(query, (
-            order_id, driver_id, estimated_time,
-            delivery_fee_total, delivery_platform_cut
-        ))
+        delivery_id = _insert_delivery(cursor, order_id, driver_id, estimated_time)
+        if restaurant_id is None and outbox.OUTBOX_ENABLED:
+            cursor.execute("SELECT RESTAURANT_ID FROM ORDERS WHERE ORDER_ID = %s", (order_id,))
+            restaurant_id = cursor.fetchone()[0]
+        _outbox(cursor, [_delivery_created(delivery_id, order_id, driver_id, restaurant_id)])
         conn.commit()
-        delivery_id = cursor.lastrowid
+        bump_order_version(order_id)
+        bump_driver_version(driver_id)
+        events.record(delivery_id, order_id, restaurant_id, driver_id, None, "ASSIGNED")
         cursor.close()
         conn.close()
         return delivery_id
     except Exception as e:
         print(f"Error creating delivery: {e}")
+        conn.rollback()
+        conn.close()
+        return None
+
+# ==================== BULK ORDER QUERIES ====================
+
+def get_menu_items_by_ids(menu_item_ids):
+    """Get many menu items in one query, as {MENU_ITEM_ID: row}"""
+    ids = sorted(set(menu_item_ids))
+    if not ids:
+        return {}
+
+    conn = get_db_connection()
+    if not conn:
         return None
+    
+    cursor = conn.cursor(dictionary=True)
+    placeholders = ", ".join(["%s"] * len(ids))
+    query = f"SELECT * FROM MENU WHERE MENU_ITEM_ID IN ({placeholders})"
+    cursor.execute(query, tuple(ids))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return {row["MENU_ITEM_ID"]: row for row in rows}
+
+def _auto_increment_step(cursor):
+    """
+    @@auto_increment_increment for this session (>1 on multi-primary setups,
+    e.g. Galera's wsrep_auto_increment_control)
+    """
+    cursor.execute("SELECT @@auto_increment_increment")
+    return int(cursor.fetchone()[0])
+
+def _insert_order_chunk(cursor, orders, step=1, paid=True):
+    """
+    Insert one chunk of priced orders with one executemany per table.
+    Returns the new ORDER_IDs, DELIVERY_IDs and PAYMENT_IDs in the same order
+    as `orders`. paid=False (PAYMENT_MODE=async) writes PENDING orders and
+    payments and no deliveries: payments.py creates those once authorized.
+    """
+    status = "CONFIRMED" if paid else "PENDING"
+
+    def inserted_ids(count):
+        # executemany sends a single multi-row INSERT ... VALUES, a "simple
+        # insert": InnoDB reserves all its AUTO_INCREMENT values in one step
+        # in every innodb_autoinc_lock_mode, `step` apart from lastrowid
+        if cursor.rowcount != count:
+            raise Exception(f"Inserted {cursor.rowcount} of {count} rows")
+        return [cursor.lastrowid + i * step for i in range(count)]
+
+    # Same fees as create_order / create_delivery (pricing.py)
+    cursor.executemany("""
+        INSERT INTO ORDERS (
+            USER_ID, RESTAURANT_ID, TOTAL_AMOUNT,
+            PLATFORM_COMMISSION, SERVICE_FEE, PLATFORM_PROFIT_ORDER,
+            STATUS
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, [
+        (
+            o["user_id"], o["restaurant_id"], o["total_amount"],
+            pricing.platform_commission(o["subtotal"]),
+            pricing.SERVICE_FEE,
+            pricing.order_platform_profit(o["subtotal"]),
+            status
+        )
+        for o in orders
+    ])
+    order_ids = inserted_ids(len(orders))
+
+    cursor.executemany("""
+        INSERT INTO ORDER_ITEMS (ORDER_ID, MENU_ITEM_ID, QUANTITY, PRICE)
+        VALUES (%s, %s, %s, %s)
+    """, [
+        (order_id, item["menu_item_id"], item["quantity"], item["price"])
+        for order_id, o in zip(order_ids, orders)
+        for item in o["items"]
+    ])
+
+    cursor.executemany("""
+        INSERT INTO PAYMENTS (ORDER_ID, AMOUNT, METHOD, STATUS)
+        VALUES (%s, %s, %s, %s)
+    """, [(order_id, o["total_amount"], o["method"], "COMPLETED" if paid else "PENDING")
+          for order_id, o in zip(order_ids, orders)])
+    payment_ids = inserted_ids(len(orders))
+
+    changes = [
+        _order_created(order_id, o["user_id"], o["restaurant_id"], o["total_amount"], o["subtotal"], status)
+        for order_id, o in zip(order_ids, orders)
+    ]
+    delivery_ids = [None] * len(orders)
+    if paid:
+        cursor.executemany("""
+            INSERT INTO DELIVERIES 
+            (ORDER_ID, DRIVER_ID, ESTIMATED_TIME, DELIVERY_FEE_TOTAL, 
+             DELIVERY_PLATFORM_CUT, DELIVERY_STATUS)
+            VALUES (%s, %s, %s, %s, %s, 'ASSIGNED')
+        """, [
+            (order_id, o["driver_id"], o["estimated_time"], pricing.DELIVERY_FEE, pricing.DELIVERY_PLATFORM_CUT)
+            for order_id, o in zip(order_ids, orders)
+        ])
+        delivery_ids = inserted_ids(len(orders))
+        changes += [
+            _delivery_created(delivery_id, order_id, o["driver_id"], o["restaurant_id"])
+            for order_id, delivery_id, o in zip(order_ids, delivery_ids, orders)
+        ]
+    _outbox(cursor, changes)
+
+    # Queued intake (intake.py): record the provisional ID with the order, atomically
+    keyed = [
+        (o["intake_key"], o["fingerprint"], order_id)
+        for order_id, o in zip(order_ids, orders)
+        if o.get("intake_key")
+    ]
+    if keyed:
+        cursor.executemany("""
+            INSERT INTO IDEMPOTENCY_KEYS
+            (IDEMPOTENCY_KEY, REQUEST_FINGERPRINT, STATUS, ORDER_ID, COMPLETED_AT)
+            VALUES (%s, %s, 'COMPLETED', %s, NOW())
+        """, keyed)
+    return order_ids, delivery_ids, payment_ids
+
+def _record_created(orders, order_ids, delivery_ids, payment_ids, pending_payment):
+    for o, order_id, delivery_id, payment_id in zip(orders, order_ids, delivery_ids, payment_ids):
+        if pending_payment is not None:
+            pending_payment(payment_id, order_id, o)
+            continue
+        bump_driver_version(o["driver_id"])
+        events.record(delivery_id, order_id, o["restaurant_id"], o["driver_id"], None, "ASSIGNED")
+
+def _rollback(conn):
+    """Roll back after a failed chunk; a connection that can't is left for the next statement to report"""
+    try:
+        conn.rollback()
+    except Exception as e:
+        print(f"Error rolling back order chunk: {e}")
+
+DB_UNAVAILABLE = "Database unavailable"
+DB_TRANSIENT = "Temporary database error"
+# Errors that say nothing about the order itself: lost or refused connections,
+# too many connections, lock wait timeouts, deadlocks, read-only during failover
+TRANSIENT_DB_ERRNOS = {1040, 1205, 1213, 1290, 2003, 2006, 2013, 2055}
+
+def _order_error(e):
+    """Per-order error for create_orders_bulk: DB_TRANSIENT if a retry may succeed"""
+    if isinstance(e, (mysql_errors.InterfaceError, mysql_errors.OperationalError)) \
+            or getattr(e, "errno", None) in TRANSIENT_DB_ERRNOS:
+        return DB_TRANSIENT
+    return str(e)
+
+def create_orders_bulk(orders, chunk_size=100, pending_payment=None):
+    """
+    Create many priced orders (items, payment and delivery included).
+    Each chunk is one transaction; if a chunk fails it is rolled back and
+    its orders are retried one per transaction, so a bad order only fails
+    itself. Returns one (order_id, error) pair per order, in input order;
+    DB_UNAVAILABLE / DB_TRANSIENT mean nothing was written and a retry may
+    succeed.
+    pending_payment (PAYMENT_MODE=async): orders and payments are written
+    PENDING without a delivery, and pending_payment(payment_id, order_id,
+    order) is called for each once committed, to queue its authorization.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return [(None, DB_UNAVAILABLE)] * len(orders)
+    
+    paid = pending_payment is None
+    results = []
+    cursor = conn.cursor()
+    try:
+        try:
+            step = _auto_increment_step(cursor)
+        except Exception as e:
+            return [(None, _order_error(e))] * len(orders)
+
+        for start in range(0, len(orders), chunk_size):
+            chunk = orders[start:start + chunk_size]
+            try:
+                ids = _insert_order_chunk(cursor, chunk, step, paid)
+                conn.commit()
+            except Exception as e:
+                _rollback(conn)
+                if len(chunk) == 1:
+                    results.append((None, _order_error(e)))
+                    continue
+            else:
+                _record_created(chunk, *ids, pending_payment)
+                results.extend((order_id, None) for order_id in ids[0])
+                continue
+
+            for order in chunk:
+                try:
+                    ids = _insert_order_chunk(cursor, [order], step, paid)
+                    conn.commit()
+                except Exception as e:
+                    _rollback(conn)
+                    results.append((None, _order_error(e)))
+                else:
+                    _record_created([order], *ids, pending_payment)
+                    results.append((ids[0][0], None))
+    finally:
+        cursor.close()
+        conn.close()
+    return results
 
 # ==================== REVENUE REPORT QUERIES ====================
 
+@coalesce(read_only=True)
 def get_revenue_details():
     """
     Get detailed revenue data (individual orders from INVESTOR_PROFIT_VIEW)
     Returns order-by-order profit breakdown
     """
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     if not conn:
         return None
     
@@ -377,9 +883,10 @@ def get_revenue_details():
         return None
 
 
+@coalesce(read_only=True)
 def get_revenue_report():
     """Get revenue data with actual fees from database"""
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     if not conn:
         return []
     
@@ -408,8 +915,50 @@ def get_revenue_report():
     conn.close()
     return report_data
 
+def add_revenue_daily(cursor, rows):
+    """
+    Add (DAY, RESTAURANT_ID, orders, revenue, commission, service fees,
+    delivery profit) deltas to REVENUE_DAILY with the caller's cursor (the
+    outbox consumer's transaction)
+    """
+    if not rows:
+        return
+    cursor.execute(f"""
+        INSERT INTO REVENUE_DAILY
+        (DAY, RESTAURANT_ID, TOTAL_ORDERS, TOTAL_REVENUE, PLATFORM_COMMISSION, SERVICE_FEES, DELIVERY_PROFIT)
+        VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))}
+        ON DUPLICATE KEY UPDATE
+            TOTAL_ORDERS = TOTAL_ORDERS + VALUES(TOTAL_ORDERS),
+            TOTAL_REVENUE = TOTAL_REVENUE + VALUES(TOTAL_REVENUE),
+            PLATFORM_COMMISSION = PLATFORM_COMMISSION + VALUES(PLATFORM_COMMISSION),
+            SERVICE_FEES = SERVICE_FEES + VALUES(SERVICE_FEES),
+            DELIVERY_PROFIT = DELIVERY_PROFIT + VALUES(DELIVERY_PROFIT)
+    """, tuple(value for row in rows for value in row))
+
+def get_revenue_daily(since):
+    """REVENUE_DAILY rows from `since` (a date) on, with restaurant names"""
+    conn = get_db_connection(read_only=True)
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT rd.DAY, rd.RESTAURANT_ID, r.RESTAURANT_NAME, rd.TOTAL_ORDERS, rd.TOTAL_REVENUE,
+               rd.PLATFORM_COMMISSION, rd.SERVICE_FEES, rd.DELIVERY_PROFIT
+        FROM REVENUE_DAILY rd
+        JOIN RESTAURANT r ON rd.RESTAURANT_ID = r.RESTAURANT_ID
+        WHERE rd.DAY >= %s
+        ORDER BY rd.DAY, rd.RESTAURANT_ID
+    """
+    cursor.execute(query, (since,))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
 # ==================== DELIVERY QUERIES ====================
 
+@coalesce
 def get_delivery_by_order_id(order_id):
     """Get delivery information for an order"""
     conn = get_db_connection()
@@ -432,6 +981,7 @@ def get_delivery_by_order_id(order_id):
     conn.close()
     return delivery
 
+@coalesce
 def get_delivery_by_id(delivery_id):
     """Get delivery by ID"""
     conn = get_db_connection()
@@ -445,6 +995,7 @@ def get_delivery_by_id(delivery_id):
             u.USER_NAME as DRIVER_NAME,
             u.PHONE as DRIVER_PHONE,
             o.ORDER_ID,
+            o.RESTAURANT_ID,
             o.TOTAL_AMOUNT
         FROM DELIVERIES d
         LEFT JOIN USERS u ON d.DRIVER_ID = u.USER_ID
@@ -458,7 +1009,209 @@ def get_delivery_by_id(delivery_id):
     return delivery
 
 def update_delivery_status(delivery_id, status):
-    """Update delivery status"""
+    """Update delivery status (only along DELIVERY_TRANSITIONS)"""
+    outcomes = apply_delivery_transitions([(delivery_id, status)])
+    return outcomes is not None and outcomes[0]["result"] == "applied"
+
+def apply_delivery_transitions(updates):
+    """
+    Apply many (delivery_id, new_status) changes in one transaction.
+    Current statuses are read with SELECT ... FOR UPDATE, each change is
+    checked against schemas.DELIVERY_TRANSITIONS (several changes for one
+    delivery apply in order), and every accepted change is written by one
+    conditional UPDATE that only matches rows still in the status we read.
+    DELIVERED sets ACTUAL_TIME, and orders follow their delivery
+    (schemas.ORDER_STATUS_FOR_DELIVERY) in the same transaction.
+    Returns one outcome dict per update, in order:
+      {"DELIVERY_ID", "ORDER_ID", "DRIVER_ID", "FROM", "TO",
+       "result": "applied" | "rejected" | "not_found", "error"}
+    or None if the database is unavailable.
+    """
+    if not updates:
+        return []
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor(dictionary=True)
+    try:
+        ids = sorted({delivery_id for delivery_id, _ in updates})
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"""
+            SELECT d.DELIVERY_ID, d.ORDER_ID, d.DRIVER_ID, d.DELIVERY_STATUS, d.DELIVERY_PLATFORM_CUT,
+                   o.RESTAURANT_ID, o.STATUS AS ORDER_STATUS, o.TOTAL_AMOUNT, o.PLATFORM_COMMISSION, o.SERVICE_FEE
+            FROM DELIVERIES d
+            JOIN ORDERS o ON d.ORDER_ID = o.ORDER_ID
+            WHERE d.DELIVERY_ID IN ({placeholders})
+            FOR UPDATE
+        """, tuple(ids))
+        rows = {row["DELIVERY_ID"]: row for row in cursor.fetchall()}
+
+        # Walk the state machine in memory
+        current = {delivery_id: row["DELIVERY_STATUS"] for delivery_id, row in rows.items()}
+        outcomes = []
+        for delivery_id, status in updates:
+            row = rows.get(delivery_id)
+            outcome = {
+                "DELIVERY_ID": delivery_id,
+                "ORDER_ID": row["ORDER_ID"] if row else None,
+                "DRIVER_ID": row["DRIVER_ID"] if row else None,
+                "FROM": current.get(delivery_id),
+                "TO": status,
+                "result": "applied",
+                "error": None,
+            }
+            if row is None:
+                outcome.update(result="not_found", error=f"Delivery {delivery_id} not found")
+            elif status not in DELIVERY_TRANSITIONS.get(current[delivery_id], ()):
+                outcome.update(result="rejected", error=f"Cannot change {current[delivery_id]} to {status}")
+            else:
+                current[delivery_id] = status
+            outcomes.append(outcome)
+
+        changed = [
+            (delivery_id, rows[delivery_id]["DELIVERY_STATUS"], status)
+            for delivery_id, status in current.items()
+            if status != rows[delivery_id]["DELIVERY_STATUS"]
+        ]
+        if changed:
+            derived = " UNION ALL ".join(
+                ["SELECT %s AS DELIVERY_ID, %s AS FROM_STATUS, %s AS TO_STATUS"] * len(changed)
+            )
+            cursor.execute(f"""
+                UPDATE DELIVERIES d
+                JOIN ({derived}) u ON d.DELIVERY_ID = u.DELIVERY_ID
+                SET d.DELIVERY_STATUS = u.TO_STATUS,
+                    d.ACTUAL_TIME = CASE WHEN u.TO_STATUS = 'DELIVERED' THEN NOW() ELSE d.ACTUAL_TIME END
+                WHERE d.DELIVERY_STATUS = u.FROM_STATUS
+            """, tuple(value for change in changed for value in change))
+            if cursor.rowcount != len(changed):
+                raise Exception(f"Updated {cursor.rowcount} of {len(changed)} deliveries")
+            changes = [
+                ("DELIVERY", delivery_id, "status_changed", {
+                    "DELIVERY_ID": delivery_id,
+                    "ORDER_ID": rows[delivery_id]["ORDER_ID"],
+                    "RESTAURANT_ID": rows[delivery_id]["RESTAURANT_ID"],
+                    "DRIVER_ID": rows[delivery_id]["DRIVER_ID"],
+                    "FROM": from_status,
+                    "TO": to_status,
+                    "DELIVERY_PLATFORM_CUT": rows[delivery_id]["DELIVERY_PLATFORM_CUT"],
+                })
+                for delivery_id, from_status, to_status in changed
+            ]
+
+            # One status per order (its latest delivery change wins)
+            orders = list({
+                rows[delivery_id]["ORDER_ID"]: (rows[delivery_id], ORDER_STATUS_FOR_DELIVERY[to_status])
+                for delivery_id, _, to_status in changed
+                if to_status in ORDER_STATUS_FOR_DELIVERY
+                and rows[delivery_id]["ORDER_STATUS"] not in FINAL_ORDER_STATUSES
+                and rows[delivery_id]["ORDER_STATUS"] != ORDER_STATUS_FOR_DELIVERY[to_status]
+            }.values())
+            if orders:
+                derived = " UNION ALL ".join(
+                    ["SELECT %s AS ORDER_ID, %s AS FROM_STATUS, %s AS TO_STATUS"] * len(orders)
+                )
+                cursor.execute(f"""
+                    UPDATE ORDERS o
+                    JOIN ({derived}) u ON o.ORDER_ID = u.ORDER_ID
+                    SET o.STATUS = u.TO_STATUS
+                    WHERE o.STATUS = u.FROM_STATUS
+                """, tuple(v for row, status in orders for v in (row["ORDER_ID"], row["ORDER_STATUS"], status)))
+                changes += [
+                    ("ORDER", row["ORDER_ID"], "status_changed", {
+                        "ORDER_ID": row["ORDER_ID"], "RESTAURANT_ID": row["RESTAURANT_ID"],
+                        "FROM": row["ORDER_STATUS"], "TO": status,
+                        "TOTAL_AMOUNT": row["TOTAL_AMOUNT"],
+                        "PLATFORM_COMMISSION": row["PLATFORM_COMMISSION"],
+                        "SERVICE_FEE": row["SERVICE_FEE"],
+                    })
+                    for row, status in orders
+                ]
+            _outbox(cursor, changes)
+        conn.commit()
+    except Exception as e:
+        print(f"Error updating delivery statuses: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+    for outcome in outcomes:
+        if outcome["result"] == "applied":
+            bump_order_version(outcome["ORDER_ID"])
+            bump_driver_version(outcome["DRIVER_ID"])
+            tracking.publish(outcome["ORDER_ID"], outcome["DELIVERY_ID"], outcome["TO"], outcome["FROM"])
+            events.record(
+                outcome["DELIVERY_ID"], outcome["ORDER_ID"], rows[outcome["DELIVERY_ID"]]["RESTAURANT_ID"],
+                outcome["DRIVER_ID"], outcome["FROM"], outcome["TO"]
+            )
+    return outcomes
+
+# ==================== DISPATCH QUERIES ====================
+
+ACTIVE_DELIVERY_STATUSES = ("ASSIGNED", "PICKED_UP", "IN_TRANSIT")
+
+def get_drivers():
+    """All driver accounts (USER_ID, USER_NAME)"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor(dictionary=True)
+    query = "SELECT USER_ID, USER_NAME FROM USERS WHERE ROLES = 'driver'"
+    cursor.execute(query)
+    drivers = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return drivers
+
+def get_driver_loads():
+    """Active (not yet DELIVERED/FAILED) deliveries per driver, as {DRIVER_ID: count}"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor()
+    query = """
+        SELECT DRIVER_ID, COUNT(*)
+        FROM DELIVERIES
+        WHERE DELIVERY_STATUS IN (%s, %s, %s)
+        GROUP BY DRIVER_ID
+    """
+    cursor.execute(query, ACTIVE_DELIVERY_STATUSES)
+    loads = dict(cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return loads
+
+def get_driver_locations(since):
+    """Latest flushed position of every driver recorded at or after `since`, as {DRIVER_ID: row}"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT DRIVER_ID, LATITUDE, LONGITUDE, RECORDED_AT
+        FROM DRIVER_LOCATIONS
+        WHERE RECORDED_AT >= %s
+    """
+    cursor.execute(query, (since,))
+    locations = {row["DRIVER_ID"]: row for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return locations
+
+def reassign_delivery(delivery_id, driver_id):
+    """
+    Give a FAILED delivery to another driver and put it back to ASSIGNED, the
+    one move out of FAILED (see schemas.DELIVERY_TRANSITIONS). Its order goes
+    back to CONFIRMED (it was OUT_FOR_DELIVERY if the failure came after pickup)
+    in the same transaction.
+    """
     conn = get_db_connection()
     if not conn:
         return False
@@ -467,16 +1220,749 @@ def update_delivery_status(delivery_id, status):
         cursor = conn.cursor()
         query = """
             UPDATE DELIVERIES
-            SET DELIVERY_STATUS = %s,
-                ACTUAL_DELIVERY_TIME = CASE WHEN %s = 'DELIVERED' THEN NOW() ELSE ACTUAL_DELIVERY_TIME END
-            WHERE DELIVERY_ID = %s
+            SET DRIVER_ID = %s, DELIVERY_STATUS = 'ASSIGNED'
+            WHERE DELIVERY_ID = %s AND DELIVERY_STATUS = 'FAILED'
         """
-        cursor.execute(query, (status, status, delivery_id))
-        conn.commit()
+        cursor.execute(query, (driver_id, delivery_id))
         success = cursor.rowcount > 0
+        
+        if success:
+            cursor.execute("""
+                SELECT d.ORDER_ID, o.RESTAURANT_ID, o.STATUS,
+                       o.TOTAL_AMOUNT, o.PLATFORM_COMMISSION, o.SERVICE_FEE
+                FROM DELIVERIES d
+                JOIN ORDERS o ON d.ORDER_ID = o.ORDER_ID
+                WHERE d.DELIVERY_ID = %s
+            """, (delivery_id,))
+            row = cursor.fetchone()
+            changes = [("DELIVERY", delivery_id, "reassigned", {
+                "DELIVERY_ID": delivery_id, "ORDER_ID": row[0], "RESTAURANT_ID": row[1],
+                "DRIVER_ID": driver_id, "FROM": "FAILED", "TO": "ASSIGNED",
+            })]
+            order_status = ORDER_STATUS_FOR_DELIVERY["ASSIGNED"]
+            if row[2] not in FINAL_ORDER_STATUSES and row[2] != order_status:
+                cursor.execute("""
+                    UPDATE ORDERS SET STATUS = %s
+                    WHERE ORDER_ID = %s AND STATUS = %s
+                """, (order_status, row[0], row[2]))
+                if cursor.rowcount == 1:
+                    changes.append(("ORDER", row[0], "status_changed", {
+                        "ORDER_ID": row[0], "RESTAURANT_ID": row[1], "FROM": row[2], "TO": order_status,
+                        "TOTAL_AMOUNT": row[3], "PLATFORM_COMMISSION": row[4], "SERVICE_FEE": row[5],
+                    }))
+            _outbox(cursor, changes)
+        conn.commit()
+
+        if success:
+            bump_order_version(row[0])
+            bump_driver_version(driver_id)
+            tracking.publish(row[0], delivery_id, "ASSIGNED", "FAILED")
+            events.record(delivery_id, row[0], row[1], driver_id, "FAILED", "ASSIGNED")
         cursor.close()
         conn.close()
         return success
     except Exception as e:
-        print(f"Error updating delivery status: {e}")
-        return False
\ No newline at end of file
+        print(f"Error reassigning delivery: {e}")
+        conn.rollback()
+        conn.close()
+        return False
+
+def get_driver_active_deliveries(driver_id, after=None, limit=50):
+    """
+    A driver's work queue: active deliveries in DELIVERY_ID order with the
+    order, restaurant address and customer, one page after DELIVERY_ID
+    `after`. Uses the DELIVERIES (DRIVER_ID, DELIVERY_STATUS) index.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT
+            d.DELIVERY_ID, d.DELIVERY_STATUS, d.ESTIMATED_TIME,
+            o.ORDER_ID, o.ORDER_DATE, o.TOTAL_AMOUNT,
+            r.RESTAURANT_ID, r.RESTAURANT_NAME, r.BUILDING_NUMBER, r.STREET,
+            r.CITY, r.STATE, r.ZIPCODE, r.PHONE AS RESTAURANT_PHONE,
+            r.LATITUDE, r.LONGITUDE,
+            c.USER_ID AS CUSTOMER_ID, c.USER_NAME AS CUSTOMER_NAME, c.PHONE AS CUSTOMER_PHONE
+        FROM DELIVERIES d
+        JOIN ORDERS o ON d.ORDER_ID = o.ORDER_ID
+        JOIN RESTAURANT r ON o.RESTAURANT_ID = r.RESTAURANT_ID
+        JOIN USERS c ON o.USER_ID = c.USER_ID
+        WHERE d.DRIVER_ID = %s
+          AND d.DELIVERY_STATUS IN (%s, %s, %s)
+          AND d.DELIVERY_ID > %s
+        ORDER BY d.DELIVERY_ID
+        LIMIT %s
+    """
+    cursor.execute(query, (driver_id, *ACTIVE_DELIVERY_STATUSES, after or 0, limit))
+    deliveries = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return deliveries
+
+def get_driver_queue_version(driver_id):
+    """
+    Fingerprint of a driver's active deliveries (how many, and a checksum of
+    DELIVERY_ID:DELIVERY_STATUS), read from the (DRIVER_ID, DELIVERY_STATUS)
+    index alone. Changes whenever a delivery joins, leaves or moves in the
+    work queue; None if the database is unavailable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    query = """
+        SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT(DELIVERY_ID, ':', DELIVERY_STATUS))), 0)
+        FROM DELIVERIES
+        WHERE DRIVER_ID = %s
+          AND DELIVERY_STATUS IN (%s, %s, %s)
+    """
+    cursor.execute(query, (driver_id, *ACTIVE_DELIVERY_STATUSES))
+    count, checksum = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return f"{count}-{checksum}"
+
+# ==================== DRIVER LOCATION QUERIES ====================
+
+def get_active_deliveries_for_drivers(driver_ids):
+    """Active deliveries of the given drivers, as {DRIVER_ID: [DELIVERY_ID, ...]}"""
+    if not driver_ids:
+        return {}
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    ids = list(driver_ids)
+    placeholders = ", ".join(["%s"] * len(ids))
+    query = f"""
+        SELECT DRIVER_ID, DELIVERY_ID
+        FROM DELIVERIES
+        WHERE DRIVER_ID IN ({placeholders})
+          AND DELIVERY_STATUS IN (%s, %s, %s)
+    """
+    cursor.execute(query, (*ids, *ACTIVE_DELIVERY_STATUSES))
+    deliveries = {}
+    for driver_id, delivery_id in cursor.fetchall():
+        deliveries.setdefault(driver_id, []).append(delivery_id)
+    cursor.close()
+    conn.close()
+    return deliveries
+
+def save_driver_locations(latest, trail, batch_size=500):
+    """
+    Write coalesced driver positions in one transaction:
+    latest = [(DRIVER_ID, LATITUDE, LONGITUDE, RECORDED_AT)] upserted into
+    DRIVER_LOCATIONS (an older point never overwrites a newer one),
+    trail = [(DELIVERY_ID, LATITUDE, LONGITUDE, RECORDED_AT)] appended to
+    DELIVERY_TRAIL. Each batch_size rows go in one multi-row INSERT.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(latest), batch_size):
+            chunk = latest[start:start + batch_size]
+            # RECORDED_AT is assigned last: MySQL applies the SET list left to right
+            cursor.execute(f"""
+                INSERT INTO DRIVER_LOCATIONS (DRIVER_ID, LATITUDE, LONGITUDE, RECORDED_AT)
+                VALUES {", ".join(["(%s, %s, %s, %s)"] * len(chunk))}
+                ON DUPLICATE KEY UPDATE
+                    LATITUDE = IF(VALUES(RECORDED_AT) >= RECORDED_AT, VALUES(LATITUDE), LATITUDE),
+                    LONGITUDE = IF(VALUES(RECORDED_AT) >= RECORDED_AT, VALUES(LONGITUDE), LONGITUDE),
+                    RECORDED_AT = GREATEST(RECORDED_AT, VALUES(RECORDED_AT))
+            """, tuple(value for row in chunk for value in row))
+        for start in range(0, len(trail), batch_size):
+            chunk = trail[start:start + batch_size]
+            cursor.execute(f"""
+                INSERT INTO DELIVERY_TRAIL (DELIVERY_ID, LATITUDE, LONGITUDE, RECORDED_AT)
+                VALUES {", ".join(["(%s, %s, %s, %s)"] * len(chunk))}
+            """, tuple(value for row in chunk for value in row))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error saving driver locations: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_driver_location(driver_id):
+    """Last flushed position of a driver (any worker), or None"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT DRIVER_ID, LATITUDE, LONGITUDE, RECORDED_AT
+        FROM DRIVER_LOCATIONS
+        WHERE DRIVER_ID = %s
+    """
+    cursor.execute(query, (driver_id,))
+    location = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return location
+
+def get_delivery_trail(delivery_id):
+    """Downsampled driver positions recorded during a delivery, oldest first"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT LATITUDE, LONGITUDE, RECORDED_AT
+        FROM DELIVERY_TRAIL
+        WHERE DELIVERY_ID = %s
+        ORDER BY RECORDED_AT, TRAIL_ID
+    """
+    cursor.execute(query, (delivery_id,))
+    trail = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return trail
+
+# ==================== ETA QUERIES ====================
+
+def get_delivery_durations(after=None, since=None, limit=5000):
+    """
+    Completed deliveries as (DELIVERY_ID, RESTAURANT_ID, HOUR_OF_WEEK,
+    MINUTES, ACTUAL_TIME) tuples in (ACTUAL_TIME, DELIVERY_ID) order.
+    after=(ACTUAL_TIME, DELIVERY_ID) continues from the last row seen,
+    since only includes orders placed on or after that datetime.
+    HOUR_OF_WEEK is 0 for Monday 00:00-00:59 up to 167 (Python's weekday()).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    conditions = ["d.DELIVERY_STATUS = 'DELIVERED'", "d.ACTUAL_TIME >= o.ORDER_DATE"]
+    params = []
+    if after is not None:
+        conditions.append("(d.ACTUAL_TIME > %s OR (d.ACTUAL_TIME = %s AND d.DELIVERY_ID > %s))")
+        params += [after[0], after[0], after[1]]
+    if since is not None:
+        conditions.append("o.ORDER_DATE >= %s")
+        params.append(since)
+
+    cursor = conn.cursor()
+    query = f"""
+        SELECT
+            d.DELIVERY_ID,
+            o.RESTAURANT_ID,
+            WEEKDAY(o.ORDER_DATE) * 24 + HOUR(o.ORDER_DATE) AS HOUR_OF_WEEK,
+            TIMESTAMPDIFF(SECOND, o.ORDER_DATE, d.ACTUAL_TIME) / 60 AS MINUTES,
+            d.ACTUAL_TIME
+        FROM DELIVERIES d
+        JOIN ORDERS o ON d.ORDER_ID = o.ORDER_ID
+        WHERE {" AND ".join(conditions)}
+        ORDER BY d.ACTUAL_TIME, d.DELIVERY_ID
+        LIMIT %s
+    """
+    cursor.execute(query, (*params, limit))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+# ==================== DELIVERY EVENT QUERIES ====================
+
+EVENT_COLUMNS = ("DELIVERY_ID", "ORDER_ID", "RESTAURANT_ID", "DRIVER_ID", "FROM_STATUS", "TO_STATUS", "CREATED_AT")
+
+def insert_delivery_events(rows, batch_size=200):
+    """Append event dicts (EVENT_COLUMNS keys) to DELIVERY_EVENTS, batch_size rows per INSERT"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    row_placeholders = "(" + ", ".join(["%s"] * len(EVENT_COLUMNS)) + ")"
+    try:
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            cursor.execute(f"""
+                INSERT INTO DELIVERY_EVENTS ({", ".join(EVENT_COLUMNS)})
+                VALUES {", ".join([row_placeholders] * len(chunk))}
+            """, tuple(row[c] for row in chunk for c in EVENT_COLUMNS))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error writing delivery events: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_delivery_events(delivery_id):
+    """Status history of one delivery, oldest first"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT EVENT_ID, DELIVERY_ID, ORDER_ID, RESTAURANT_ID, DRIVER_ID,
+               FROM_STATUS, TO_STATUS, CREATED_AT
+        FROM DELIVERY_EVENTS
+        WHERE DELIVERY_ID = %s
+        ORDER BY CREATED_AT, EVENT_ID
+    """
+    cursor.execute(query, (delivery_id,))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+def get_delivery_stage_times(restaurant_id, since, until):
+    """
+    When each of a restaurant's deliveries last reached each status, for
+    deliveries with events between since and until: tuples of
+    (DELIVERY_ID, ASSIGNED_AT, PICKED_UP_AT, IN_TRANSIT_AT, DELIVERED_AT)
+    """
+    conn = get_db_connection(read_only=True)
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    query = """
+        SELECT
+            DELIVERY_ID,
+            MAX(CASE WHEN TO_STATUS = 'ASSIGNED' THEN CREATED_AT END),
+            MAX(CASE WHEN TO_STATUS = 'PICKED_UP' THEN CREATED_AT END),
+            MAX(CASE WHEN TO_STATUS = 'IN_TRANSIT' THEN CREATED_AT END),
+            MAX(CASE WHEN TO_STATUS = 'DELIVERED' THEN CREATED_AT END)
+        FROM DELIVERY_EVENTS
+        WHERE RESTAURANT_ID = %s AND CREATED_AT >= %s AND CREATED_AT < %s
+        GROUP BY DELIVERY_ID
+    """
+    cursor.execute(query, (restaurant_id, since, until))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+# ==================== IDEMPOTENCY QUERIES ====================
+
+def claim_idempotency_key(key, fingerprint):
+    """
+    Insert the key as IN_PROGRESS. Returns True if this caller claimed it,
+    False if it already exists, None if the database is unavailable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        query = """
+            INSERT IGNORE INTO IDEMPOTENCY_KEYS (IDEMPOTENCY_KEY, REQUEST_FINGERPRINT, STATUS)
+            VALUES (%s, %s, 'IN_PROGRESS')
+        """
+        cursor.execute(query, (key, fingerprint))
+        conn.commit()
+        claimed = cursor.rowcount == 1
+        cursor.close()
+        conn.close()
+        return claimed
+    except Exception as e:
+        print(f"Error claiming idempotency key: {e}")
+        conn.close()
+        return None
+
+def get_idempotency_key(key):
+    """Get the stored state for an idempotency key"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor(dictionary=True)
+    query = """
+        SELECT IDEMPOTENCY_KEY, REQUEST_FINGERPRINT, STATUS, ORDER_ID, RESPONSE_BODY,
+               TIMESTAMPDIFF(SECOND, CREATED_AT, NOW()) AS AGE_SECONDS
+        FROM IDEMPOTENCY_KEYS
+        WHERE IDEMPOTENCY_KEY = %s
+    """
+    cursor.execute(query, (key,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    return row
+
+def get_idempotency_orders(keys):
+    """ORDER_IDs recorded for many idempotency keys, as {IDEMPOTENCY_KEY: ORDER_ID}"""
+    keys = list(keys)
+    if not keys:
+        return {}
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    cursor = conn.cursor()
+    placeholders = ", ".join(["%s"] * len(keys))
+    query = f"""
+        SELECT IDEMPOTENCY_KEY, ORDER_ID
+        FROM IDEMPOTENCY_KEYS
+        WHERE IDEMPOTENCY_KEY IN ({placeholders}) AND STATUS = 'COMPLETED'
+    """
+    cursor.execute(query, tuple(keys))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return dict(rows)
+
+def complete_idempotency_key(key, order_id, response_body):
+    """Store the resulting order and response for replays"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    try:
+        cursor = conn.cursor()
+        query = """
+            UPDATE IDEMPOTENCY_KEYS
+            SET STATUS = 'COMPLETED', ORDER_ID = %s, RESPONSE_BODY = %s, COMPLETED_AT = NOW()
+            WHERE IDEMPOTENCY_KEY = %s
+        """
+        cursor.execute(query, (order_id, response_body, key))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Error completing idempotency key: {e}")
+        conn.close()
+        return False
+
+def take_over_idempotency_key(key, fingerprint, lease_seconds):
+    """
+    Claim an IN_PROGRESS key whose owner has held it for more than
+    lease_seconds (its worker died mid-request), restarting the lease.
+    Returns True if this caller now owns it, False if not (not stale, or
+    someone else took it), None if the database is unavailable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        query = """
+            UPDATE IDEMPOTENCY_KEYS SET CREATED_AT = NOW()
+            WHERE IDEMPOTENCY_KEY = %s AND REQUEST_FINGERPRINT = %s
+              AND STATUS = 'IN_PROGRESS'
+              AND CREATED_AT < NOW() - INTERVAL %s SECOND
+        """
+        cursor.execute(query, (key, fingerprint, lease_seconds))
+        conn.commit()
+        taken = cursor.rowcount == 1
+        cursor.close()
+        conn.close()
+        return taken
+    except Exception as e:
+        print(f"Error taking over idempotency key: {e}")
+        conn.close()
+        return None
+
+def release_idempotency_key(key):
+    """
+    Forget an IN_PROGRESS key after a failed attempt so the client can retry,
+    unless create_order already recorded an order on it: then the key is
+    kept and that ORDER_ID returned. None if released (or on error; the key
+    then stays IN_PROGRESS until a retry takes it over).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        query = """
+            DELETE FROM IDEMPOTENCY_KEYS
+            WHERE IDEMPOTENCY_KEY = %s AND STATUS = 'IN_PROGRESS' AND ORDER_ID IS NULL
+        """
+        cursor.execute(query, (key,))
+        order_id = None
+        if cursor.rowcount == 0:
+            cursor.execute("""
+                SELECT ORDER_ID FROM IDEMPOTENCY_KEYS
+                WHERE IDEMPOTENCY_KEY = %s AND STATUS = 'IN_PROGRESS'
+            """, (key,))
+            row = cursor.fetchone()
+            order_id = row[0] if row else None
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return order_id
+    except Exception as e:
+        print(f"Error releasing idempotency key: {e}")
+        conn.close()
+        return None
+
+def purge_idempotency_keys(max_age_hours):
+    """Delete keys older than max_age_hours"""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    
+    try:
+        cursor = conn.cursor()
+        query = """
+            DELETE FROM IDEMPOTENCY_KEYS
+            WHERE CREATED_AT < NOW() - INTERVAL %s HOUR
+        """
+        cursor.execute(query, (max_age_hours,))
+        conn.commit()
+        deleted = cursor.rowcount
+        cursor.close()
+        conn.close()
+        return deleted
+    except Exception as e:
+        print(f"Error purging idempotency keys: {e}")
+        conn.close()
+        return 0
+
+# ==================== OUTBOX QUERIES ====================
+# Change events for outbox.py, written with the caller's cursor before it
+# commits: (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, payload dict)
+
+def _outbox(cursor, changes):
+    if not changes or not outbox.OUTBOX_ENABLED:
+        return
+    cursor.executemany("""
+        INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+        VALUES (%s, %s, %s, %s)
+    """, [
+        (aggregate, aggregate_id, event_type, json.dumps(payload, default=str))
+        for aggregate, aggregate_id, event_type, payload in changes
+    ])
+
+def _order_created(order_id, user_id, restaurant_id, total_amount, subtotal, status="CONFIRMED"):
+    return ("ORDER", order_id, "created", {
+        "ORDER_ID": order_id,
+        "USER_ID": user_id,
+        "RESTAURANT_ID": restaurant_id,
+        "STATUS": status,
+        "TOTAL_AMOUNT": total_amount,
+        "PLATFORM_COMMISSION": pricing.platform_commission(subtotal),
+        "SERVICE_FEE": pricing.SERVICE_FEE,
+    })
+
+def _delivery_created(delivery_id, order_id, driver_id, restaurant_id):
+    return ("DELIVERY", delivery_id, "created", {
+        "DELIVERY_ID": delivery_id,
+        "ORDER_ID": order_id,
+        "RESTAURANT_ID": restaurant_id,
+        "DRIVER_ID": driver_id,
+        "FROM": None,
+        "TO": "ASSIGNED",
+        "DELIVERY_PLATFORM_CUT": pricing.DELIVERY_PLATFORM_CUT,
+    })
+
+_OUTBOX_SELECT = """
+    SELECT OUTBOX_ID, AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD, CREATED_AT,
+           TIMESTAMPDIFF(MICROSECOND, CREATED_AT, NOW(3)) / 1000 AS AGE_MS
+    FROM OUTBOX
+    WHERE OUTBOX_ID > %s
+    ORDER BY OUTBOX_ID
+    LIMIT %s
+"""
+
+def _outbox_rows(cursor):
+    rows = cursor.fetchall()
+    for row in rows:
+        row["PAYLOAD"] = json.loads(row["PAYLOAD"])
+        row["AGE_MS"] = float(row["AGE_MS"])
+    return rows
+
+def get_outbox_events(after_id, limit=500):
+    """
+    Outbox rows after after_id, oldest first, with PAYLOAD decoded and AGE_MS
+    (time since written, by the database clock); None on error
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(_OUTBOX_SELECT, (after_id, limit))
+        return _outbox_rows(cursor)
+    except Exception as e:
+        print(f"Error reading outbox: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_outbox_events_by_ids(outbox_ids):
+    """The given outbox rows that exist (committed), like get_outbox_events(); None on error"""
+    if not outbox_ids:
+        return []
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    placeholders = ", ".join(["%s"] * len(outbox_ids))
+    try:
+        cursor.execute(f"""
+            SELECT OUTBOX_ID, AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD, CREATED_AT,
+                   TIMESTAMPDIFF(MICROSECOND, CREATED_AT, NOW(3)) / 1000 AS AGE_MS
+            FROM OUTBOX
+            WHERE OUTBOX_ID IN ({placeholders})
+            ORDER BY OUTBOX_ID
+        """, tuple(outbox_ids))
+        return _outbox_rows(cursor)
+    except Exception as e:
+        print(f"Error reading outbox: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_outbox_head():
+    """Highest OUTBOX_ID (0 if empty), None on error"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(OUTBOX_ID), 0) FROM OUTBOX")
+        return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Error reading outbox head: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def ensure_outbox_checkpoint(consumer):
+    """Create a shared consumer's checkpoint (at the start of the outbox) if missing"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT IGNORE INTO OUTBOX_CHECKPOINTS (CONSUMER) VALUES (%s)", (consumer,))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error creating outbox checkpoint: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def consume_outbox(consumer, apply, limit=500, late_seconds=3600):
+    """
+    One step of a shared outbox consumer, in one transaction: lock its
+    OUTBOX_CHECKPOINTS row (SKIP LOCKED, so while another worker runs the
+    step this returns False), read up to `limit` events after the
+    checkpoint and the ones it skipped earlier that have committed since
+    (OUTBOX_SKIPPED), call apply(cursor, checkpoint, events, late) and
+    store the (OUTBOX_ID, skipped IDs) it returns. apply writes with
+    `cursor`, so its effects commit together with the checkpoint. Skipped
+    IDs still missing after late_seconds are forgotten. Returns (old, new
+    checkpoint, late events, forgotten IDs), False if locked elsewhere,
+    None on error.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT LAST_OUTBOX_ID FROM OUTBOX_CHECKPOINTS
+            WHERE CONSUMER = %s
+            FOR UPDATE SKIP LOCKED
+        """, (consumer,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return False
+        checkpoint = row["LAST_OUTBOX_ID"]
+
+        cursor.execute("""
+            SELECT o.OUTBOX_ID, o.AGGREGATE, o.AGGREGATE_ID, o.EVENT_TYPE, o.PAYLOAD, o.CREATED_AT,
+                   TIMESTAMPDIFF(MICROSECOND, o.CREATED_AT, NOW(3)) / 1000 AS AGE_MS
+            FROM OUTBOX_SKIPPED s
+            JOIN OUTBOX o ON o.OUTBOX_ID = s.OUTBOX_ID
+            WHERE s.CONSUMER = %s
+            ORDER BY o.OUTBOX_ID
+            LIMIT %s
+        """, (consumer, limit))
+        late = _outbox_rows(cursor)
+        cursor.execute(_OUTBOX_SELECT, (checkpoint, limit))
+        position, skipped = apply(cursor, checkpoint, _outbox_rows(cursor), late)
+        if position != checkpoint:
+            cursor.execute("""
+                UPDATE OUTBOX_CHECKPOINTS SET LAST_OUTBOX_ID = %s, UPDATED_AT = NOW(3)
+                WHERE CONSUMER = %s
+            """, (position, consumer))
+        if late:
+            placeholders = ", ".join(["%s"] * len(late))
+            cursor.execute(
+                f"DELETE FROM OUTBOX_SKIPPED WHERE CONSUMER = %s AND OUTBOX_ID IN ({placeholders})",
+                (consumer, *[e["OUTBOX_ID"] for e in late])
+            )
+        if skipped:
+            cursor.executemany(
+                "INSERT IGNORE INTO OUTBOX_SKIPPED (CONSUMER, OUTBOX_ID) VALUES (%s, %s)",
+                [(consumer, outbox_id) for outbox_id in skipped]
+            )
+        cursor.execute("""
+            DELETE FROM OUTBOX_SKIPPED
+            WHERE CONSUMER = %s AND SKIPPED_AT < NOW(3) - INTERVAL %s SECOND
+        """, (consumer, late_seconds))
+        abandoned = cursor.rowcount
+        conn.commit()
+        return checkpoint, position, late, abandoned
+    except Exception as e:
+        print(f"Error in outbox consumer {consumer}: {e}")
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def purge_outbox(max_age_hours, limit=10000):
+    """Delete up to `limit` events older than max_age_hours that every shared consumer has passed"""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MIN(LAST_OUTBOX_ID), 0) FROM OUTBOX_CHECKPOINTS")
+        floor = cursor.fetchone()[0]
+        cursor.execute("""
+            DELETE FROM OUTBOX
+            WHERE OUTBOX_ID <= %s AND CREATED_AT < NOW() - INTERVAL %s HOUR
+            ORDER BY OUTBOX_ID
+            LIMIT %s
+        """, (floor, max_age_hours, limit))
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        print(f"Error purging outbox: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
+        conn.close()
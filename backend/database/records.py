@@ -0,0 +1,111 @@
+# backend/database/records.py
+"""
+Compact typed rows for large result sets
+Queries here read plain tuples (no dictionary cursor) and map them onto
+__slots__ dataclasses with a fixed column order, so a row costs one small
+object instead of a dict with repeated string keys. RecordJSONResponse
+serializes them directly (orjson when installed).
+"""
+
+import dataclasses
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+@dataclass(slots=True)
+class RevenueReportRow:
+    RESTAURANT_NAME: str
+    TOTAL_ORDERS: int
+    TOTAL_REVENUE: Optional[Decimal]
+    AVG_ORDER_VALUE: Optional[Decimal]
+    UNIQUE_CUSTOMERS: int
+    PLATFORM_COMMISSION: Optional[Decimal]
+    SERVICE_FEES: Optional[Decimal]
+    DELIVERY_PROFIT: Optional[Decimal]
+
+
+@dataclass(slots=True)
+class RevenueDetailRow:
+    ORDER_ID: int
+    RESTAURANT_NAME: Optional[str]
+    ORDER_DATE: Optional[datetime]
+    PLATFORM_COMMISSION: Optional[Decimal]
+    SERVICE_FEE: Optional[Decimal]
+    DELIVERY_PLATFORM_CUT: Optional[Decimal]
+    TOTAL_PLATFORM_PROFIT: Optional[Decimal]
+
+
+@dataclass(slots=True)
+class OrderSummaryRow:
+    ORDER_ID: int
+    USER_ID: int
+    RESTAURANT_ID: int
+    ORDER_DATE: Optional[datetime]
+    STATUS: Optional[str]
+    TOTAL_AMOUNT: Decimal
+    RESTAURANT_NAME: Optional[str]
+
+
+def columns(record_type):
+    """Column names in SELECT order (the dataclass field order)"""
+    return [f.name for f in dataclasses.fields(record_type)]
+
+
+def select_list(record_type, prefix=""):
+    """Explicit SELECT list for a record type, e.g. "o.ORDER_ID, o.USER_ID" """
+    return ", ".join(f"{prefix}{name}" for name in columns(record_type))
+
+
+def fetch_records(cursor, record_type):
+    """Map every remaining tuple row of `cursor` onto `record_type`"""
+    return [record_type(*row) for row in cursor.fetchall()]
+
+
+# ==================== SERIALIZATION ====================
+
+_FIELD_ORDER = {}
+
+
+def _field_order(record_type):
+    order = _FIELD_ORDER.get(record_type)
+    if order is None:
+        order = _FIELD_ORDER[record_type] = tuple(columns(record_type))
+    return order
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        # Same as FastAPI's encoder: whole numbers as int, others as float
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if dataclasses.is_dataclass(obj):
+        return {name: getattr(obj, name) for name in _field_order(type(obj))}
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """JSON bytes for payloads containing records, Decimals and datetimes"""
+    if orjson is not None:
+        # orjson writes dataclasses and datetimes natively; Decimal goes through _default
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RecordJSONResponse(Response):
+    """JSONResponse that skips FastAPI's jsonable_encoder walk"""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,78 @@
+# backend/database/repository.py
+"""
+Typed read queries for large lists (revenue reports, order history)
+Same SQL as the matching functions in queries.py, but with an explicit
+column list, a plain tuple cursor and records from database/records.py.
+"""
+
+from database.connection import get_db_connection
+from database.records import (
+    OrderSummaryRow,
+    RevenueDetailRow,
+    RevenueReportRow,
+    fetch_records,
+    select_list,
+)
+from database.singleflight import coalesce
+
+
+def _fetch(record_type, query, params=(), read_only=False):
+    conn = get_db_connection(read_only=read_only)
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return fetch_records(cursor, record_type)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@coalesce(read_only=True)
+def get_revenue_report_records():
+    """Per-restaurant revenue aggregates (see queries.get_revenue_report)"""
+    query = """
+        SELECT
+            r.RESTAURANT_NAME,
+            COUNT(o.ORDER_ID),
+            SUM(o.TOTAL_AMOUNT),
+            AVG(o.TOTAL_AMOUNT),
+            COUNT(DISTINCT o.USER_ID),
+            SUM(o.PLATFORM_COMMISSION),
+            SUM(o.SERVICE_FEE),
+            SUM(COALESCE(d.DELIVERY_PLATFORM_CUT, 0))
+        FROM ORDERS o
+        JOIN RESTAURANT r ON o.RESTAURANT_ID = r.RESTAURANT_ID
+        LEFT JOIN DELIVERIES d ON o.ORDER_ID = d.ORDER_ID
+        WHERE o.STATUS = 'DELIVERED'
+        GROUP BY r.RESTAURANT_ID, r.RESTAURANT_NAME
+        ORDER BY SUM(o.TOTAL_AMOUNT) DESC
+    """
+    return _fetch(RevenueReportRow, query, read_only=True)
+
+
+@coalesce(read_only=True)
+def get_revenue_details_records():
+    """Order-by-order profit rows from INVESTOR_PROFIT_VIEW (see queries.get_revenue_details)"""
+    query = f"""
+        SELECT {select_list(RevenueDetailRow)}
+        FROM INVESTOR_PROFIT_VIEW
+        ORDER BY ORDER_DATE DESC
+    """
+    return _fetch(RevenueDetailRow, query, read_only=True)
+
+
+@coalesce
+def get_user_order_summaries(user_id):
+    """A user's orders, newest first, without items/delivery"""
+    query = """
+        SELECT o.ORDER_ID, o.USER_ID, o.RESTAURANT_ID, o.ORDER_DATE,
+               o.STATUS, o.TOTAL_AMOUNT, r.RESTAURANT_NAME
+        FROM ORDERS o
+        JOIN RESTAURANT r ON o.RESTAURANT_ID = r.RESTAURANT_ID
+        WHERE o.USER_ID = %s
+        ORDER BY o.ORDER_DATE DESC
+    """
+    return _fetch(OrderSummaryRow, query, (user_id,))
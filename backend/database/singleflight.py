@@ -0,0 +1,106 @@
+# backend/database/singleflight.py
+"""
+Single-flight for read queries
+Identical concurrent calls (same function, same arguments) share one
+database round trip: the first caller runs the query, the others wait for
+it and receive the same result object. Results are shared, so callers must
+treat them as read-only.
+Calls inside primary() never coalesce: a flight that started before the
+caller's write may have read a replica (or the primary) too early.
+"""
+
+import functools
+import threading
+
+from database.connection import pinned
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def _stat(self, name):
+        stat = self._stats.get(name)
+        if stat is None:
+            stat = self._stats.setdefault(name, {"calls": 0, "executed": 0, "coalesced": 0, "pinned": 0})
+        return stat
+
+    def do(self, name, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless an identical call is already in flight"""
+        with self._lock:
+            stat = self._stat(name)
+            stat["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                stat["executed"] += 1
+            else:
+                call.waiters += 1
+                stat["coalesced"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def run(self, name, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on its own, without joining or leading a flight"""
+        with self._lock:
+            stat = self._stat(name)
+            stat["calls"] += 1
+            stat["executed"] += 1
+            stat["pinned"] += 1
+        return fn(*args, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(stat) for name, stat in self._stats.items()}
+
+
+flights = SingleFlight()
+
+
+def coalesce(fn=None, *, read_only=False):
+    """
+    Decorator for read-only query functions (arguments must be hashable).
+    Pass read_only=True when fn reads with get_db_connection(read_only=True),
+    so its flights are kept apart from primary reads.
+    """
+    if fn is None:
+        return functools.partial(coalesce, read_only=read_only)
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        pin = pinned()
+        if pin:
+            return flights.run(name, fn, *args, **kwargs)
+        key = (name, pin, read_only, args, tuple(sorted(kwargs.items())))
+        return flights.do(name, key, fn, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,282 @@
+# backend/dispatch.py
+"""
+Driver assignment for new deliveries
+Each worker keeps an index of drivers (USERS with ROLES='driver') with their
+active delivery count and last known location. A new order goes to the
+driver with the lowest
+    distance to the restaurant (km) + KM_PER_QUEUED_DELIVERY * active deliveries
+Located drivers live in a grid of DISPATCH_CELL_KM cells, searched ring by
+ring outwards from the restaurant until no closer ring can win, so a lookup
+only looks at nearby drivers. Drivers (or restaurants) without a location,
+and orders arriving when every nearby driver is full, fall back to a heap of
+all drivers by load (when everyone is at MAX_ACTIVE_DELIVERIES the order
+queues on the least busy one).
+
+A worker adds to a driver's load when it assigns a delivery and takes it
+off when the delivery is DELIVERED or FAILED. Loads are re-read from the
+active (ASSIGNED / PICKED_UP / IN_TRANSIT) deliveries every
+DISPATCH_REFRESH_SECONDS, which picks up the other workers' assignments.
+Locations are refreshed at the same time from DRIVER_LOCATIONS (pings seen
+by any worker); a driver whose newest point is older than
+DISPATCH_LOCATION_MAX_AGE_SECONDS is taken off the grid.
+"""
+
+import asyncio
+import heapq
+import math
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from database import catalog
+from database.queries import get_driver_loads, get_driver_locations, get_drivers, reassign_delivery
+
+DISPATCH_CELL_KM = float(os.getenv("DISPATCH_CELL_KM", "2"))
+MAX_ACTIVE_DELIVERIES = int(os.getenv("DISPATCH_MAX_ACTIVE", "3"))
+KM_PER_QUEUED_DELIVERY = float(os.getenv("DISPATCH_KM_PER_QUEUED", "3"))
+DISPATCH_REFRESH_SECONDS = int(os.getenv("DISPATCH_REFRESH_SECONDS", "30"))
+# Drivers not heard from for this long (offline) lose their place on the grid
+DISPATCH_LOCATION_MAX_AGE_SECONDS = int(os.getenv("DISPATCH_LOCATION_MAX_AGE_SECONDS", "600"))
+# Give up on the grid after this many rings (then use the least-loaded heap)
+MAX_RINGS = 25
+# Used when there are no drivers at all (the previous hard-coded behaviour)
+FALLBACK_DRIVER_ID = 1
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+@dataclass(slots=True)
+class Driver:
+    driver_id: int
+    load: int = 0
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    cell: Optional[tuple] = None
+    located_at: Optional[datetime] = None
+
+
+_lock = threading.Lock()
+_drivers = {}  # driver_id -> Driver
+_cells = {}  # (x, y) -> {driver_id: Driver}
+_by_load = []  # heap of (load, driver_id) over all drivers; stale entries are skipped on pop
+_stats = {"assigned": 0, "grid": 0, "fallback": 0, "unassigned": 0, "reassigned": 0}
+
+
+# ==================== GEOMETRY ====================
+
+def _cell(lat, lng):
+    # Equirectangular projection is plenty for city-sized distances
+    x = lng * KM_PER_DEGREE_LAT * math.cos(math.radians(lat))
+    y = lat * KM_PER_DEGREE_LAT
+    return (math.floor(x / DISPATCH_CELL_KM), math.floor(y / DISPATCH_CELL_KM))
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    dx = (lng2 - lng1) * KM_PER_DEGREE_LAT * math.cos(math.radians((lat1 + lat2) / 2))
+    dy = (lat2 - lat1) * KM_PER_DEGREE_LAT
+    return math.hypot(dx, dy)
+
+
+def _ring(cx, cy, r):
+    if r == 0:
+        yield (cx, cy)
+        return
+    for dx in range(-r, r + 1):
+        yield (cx + dx, cy - r)
+        yield (cx + dx, cy + r)
+    for dy in range(-r + 1, r):
+        yield (cx - r, cy + dy)
+        yield (cx + r, cy + dy)
+
+
+# ==================== INDEX (call with _lock held) ====================
+
+def _push_load(driver):
+    heapq.heappush(_by_load, (driver.load, driver.driver_id))
+    if len(_by_load) > 4 * len(_drivers) + 64:
+        # Too many stale entries: rebuild from the current loads
+        _by_load[:] = [(d.load, d.driver_id) for d in _drivers.values()]
+        heapq.heapify(_by_load)
+
+
+def _set_load(driver, load):
+    driver.load = max(0, load)
+    _push_load(driver)
+
+
+def _place(driver, lat, lng, located_at):
+    if driver.cell is not None:
+        cell = _cells.get(driver.cell)
+        if cell is not None:
+            cell.pop(driver.driver_id, None)
+            if not cell:
+                del _cells[driver.cell]
+    driver.lat, driver.lng, driver.located_at = lat, lng, located_at
+    driver.cell = _cell(lat, lng) if lat is not None else None
+    if driver.cell is not None:
+        _cells.setdefault(driver.cell, {})[driver.driver_id] = driver
+
+
+def _nearest(lat, lng, exclude):
+    """Best located driver by distance + queue, or None"""
+    cx, cy = _cell(lat, lng)
+    best, best_cost = None, math.inf
+    for r in range(MAX_RINGS + 1):
+        # Nothing in ring r can be closer than (r - 1) cells
+        if best is not None and (r - 1) * DISPATCH_CELL_KM > best_cost:
+            break
+        for key in _ring(cx, cy, r):
+            for driver in _cells.get(key, {}).values():
+                if driver.load >= MAX_ACTIVE_DELIVERIES or driver.driver_id in exclude:
+                    continue
+                cost = distance_km(lat, lng, driver.lat, driver.lng) + KM_PER_QUEUED_DELIVERY * driver.load
+                if cost < best_cost:
+                    best, best_cost = driver, cost
+    return best
+
+
+def _least_loaded(exclude):
+    """Driver with the lowest load (possibly at MAX_ACTIVE_DELIVERIES), or None"""
+    skipped = []
+    found = None
+    while _by_load:
+        load, driver_id = heapq.heappop(_by_load)
+        driver = _drivers.get(driver_id)
+        if driver is None or driver.load != load:
+            continue  # stale entry
+        if driver_id in exclude:
+            skipped.append((load, driver_id))
+            continue
+        found = driver
+        break
+    for entry in skipped:
+        heapq.heappush(_by_load, entry)
+    return found
+
+
+# ==================== PUBLIC API ====================
+
+def load():
+    """
+    (Re)build the index from USERS, DELIVERIES and DRIVER_LOCATIONS. Each
+    driver keeps the newer of this worker's last ping and the flushed row;
+    points older than DISPATCH_LOCATION_MAX_AGE_SECONDS are dropped.
+    """
+    cutoff = datetime.now() - timedelta(seconds=DISPATCH_LOCATION_MAX_AGE_SECONDS)
+    drivers = get_drivers()
+    loads = get_driver_loads()
+    if drivers is None or loads is None:
+        return 0
+    # Without the table (or the database) keep going on this worker's pings
+    flushed = get_driver_locations(cutoff) or {}
+
+    with _lock:
+        known = dict(_drivers)
+        _drivers.clear()
+        _cells.clear()
+        _by_load.clear()
+        for row in drivers:
+            driver_id = row["USER_ID"]
+            driver = _drivers[driver_id] = Driver(driver_id)
+            old = known.get(driver_id)
+            if old is not None and old.located_at is not None and old.located_at >= cutoff:
+                lat, lng, located_at = old.lat, old.lng, old.located_at
+            else:
+                lat = lng = located_at = None
+            point = flushed.get(driver_id)
+            if point is not None and (located_at is None or point["RECORDED_AT"] > located_at):
+                lat, lng, located_at = float(point["LATITUDE"]), float(point["LONGITUDE"]), point["RECORDED_AT"]
+            if located_at is not None:
+                _place(driver, lat, lng, located_at)
+            _set_load(driver, loads.get(driver_id, 0))
+    return len(drivers)
+
+
+def update_location(driver_id, lat, lng):
+    """Record a driver's latest position (False if driver_id is not a driver)"""
+    with _lock:
+        driver = _drivers.get(driver_id)
+        if driver is None:
+            return False
+        _place(driver, lat, lng, datetime.now())
+        return True
+
+
+def _restaurant_location(restaurant_id):
+    restaurant = catalog.get_restaurant(restaurant_id)
+    if not restaurant or restaurant.get("LATITUDE") is None or restaurant.get("LONGITUDE") is None:
+        return None
+    return float(restaurant["LATITUDE"]), float(restaurant["LONGITUDE"])
+
+
+def assign(restaurant_id, exclude=(), location=None):
+    """
+    Pick a driver for a new delivery from `restaurant_id` and count it
+    against their load. location=(lat, lng) skips the catalog lookup.
+    Returns None only when every driver is excluded.
+    """
+    if location is None:
+        location = _restaurant_location(restaurant_id)
+
+    with _lock:
+        if not _drivers:
+            return FALLBACK_DRIVER_ID
+
+        driver = _nearest(location[0], location[1], exclude) if location and _cells else None
+        if driver is not None:
+            _stats["grid"] += 1
+        else:
+            # Under capacity if anyone is; otherwise queue on the least busy driver
+            driver = _least_loaded(exclude)
+            if driver is None:
+                _stats["unassigned"] += 1
+                return None
+            _stats["fallback"] += 1
+
+        _set_load(driver, driver.load + 1)
+        _stats["assigned"] += 1
+        return driver.driver_id
+
+
+def release(driver_id):
+    """A delivery of this driver finished (DELIVERED / FAILED) or was never created"""
+    with _lock:
+        driver = _drivers.get(driver_id)
+        if driver is not None:
+            _set_load(driver, driver.load - 1)
+
+
+def reassign(delivery):
+    """
+    Handle a FAILED delivery (row from get_delivery_by_id): free its driver
+    and hand it to the best other driver. Returns the new driver ID or None.
+    """
+    release(delivery["DRIVER_ID"])
+    driver_id = assign(delivery["RESTAURANT_ID"], exclude=(delivery["DRIVER_ID"],))
+    if driver_id is None or driver_id == delivery["DRIVER_ID"]:
+        return None
+    if not reassign_delivery(delivery["DELIVERY_ID"], driver_id):
+        release(driver_id)
+        return None
+    _stats["reassigned"] += 1
+    return driver_id
+
+
+async def run_refresher():
+    """Reload drivers and loads every DISPATCH_REFRESH_SECONDS (in a worker thread)"""
+    while True:
+        try:
+            await asyncio.to_thread(load)
+        except Exception as e:
+            print(f"❌ Dispatch refresh failed: {e}")
+        await asyncio.sleep(DISPATCH_REFRESH_SECONDS)
+
+
+def stats():
+    with _lock:
+        drivers = len(_drivers)
+        located = sum(len(c) for c in _cells.values())
+        busy = sum(1 for d in _drivers.values() if d.load >= MAX_ACTIVE_DELIVERIES)
+    return {"drivers": drivers, "located": located, "at_capacity": busy, **_stats}
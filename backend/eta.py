@@ -0,0 +1,205 @@
+# backend/eta.py
+"""
+Delivery ETA from history instead of a fixed 30 minutes
+Order-to-delivered durations from DELIVERIES / ORDERS are kept as
+per-(restaurant, hour of week) histograms of whole minutes. After each
+refresh the ETA_QUANTILE of every touched histogram is written to a plain
+dict, so estimate() at order time is a handful of dict lookups:
+
+    (restaurant, hour of week) -> (restaurant, any hour)
+        -> (any restaurant, hour of week) -> everything -> DEFAULT_MINUTES
+
+taking the first level with at least ETA_MIN_SAMPLES deliveries.
+Durations under ETA_MIN_MINUTES are left out: deliveries that were written
+as DELIVERED when the order was placed have ACTUAL_TIME = ORDER_DATE and
+say nothing about how long a delivery takes.
+Refreshes only read deliveries completed since the last one (keyset on
+ACTUAL_TIME, DELIVERY_ID); a full rebuild every ETA_REBUILD_HOURS drops
+anything older than ETA_WINDOW_DAYS.
+
+benchmarks/eta_eval.py scores the model on held-out deliveries.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from database.queries import get_delivery_durations
+
+ETA_QUANTILE = float(os.getenv("ETA_QUANTILE", "0.5"))
+ETA_MIN_SAMPLES = int(os.getenv("ETA_MIN_SAMPLES", "20"))
+ETA_WINDOW_DAYS = int(os.getenv("ETA_WINDOW_DAYS", "90"))
+ETA_REFRESH_SECONDS = int(os.getenv("ETA_REFRESH_SECONDS", "300"))
+ETA_REBUILD_HOURS = int(os.getenv("ETA_REBUILD_HOURS", "24"))
+ETA_MIN_MINUTES = float(os.getenv("ETA_MIN_MINUTES", "5"))
+DEFAULT_MINUTES = 30
+# Longer durations are counted as this (forgotten status updates, not traffic)
+MAX_MINUTES = 180
+FETCH_BATCH = 5000
+
+ANY = None
+
+
+def hour_of_week(when):
+    return when.weekday() * 24 + when.hour
+
+
+class EtaModel:
+    """Duration histograms plus the quantile lookup table built from them"""
+
+    def __init__(self, quantile=ETA_QUANTILE, min_samples=ETA_MIN_SAMPLES):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.histograms = {}  # (restaurant_id | ANY, hour_of_week | ANY) -> Counter
+        self.table = {}  # same keys -> minutes, only for keys with enough samples
+        self.samples = 0
+        self._touched = set()
+
+    def add(self, restaurant_id, how, minutes):
+        """Count one delivery; False (and not counted) if it is too short to be real"""
+        if minutes < ETA_MIN_MINUTES:
+            return False
+        minutes = min(int(round(minutes)), MAX_MINUTES)
+        for key in ((restaurant_id, how), (restaurant_id, ANY), (ANY, how), (ANY, ANY)):
+            self.histograms.setdefault(key, Counter())[minutes] += 1
+            self._touched.add(key)
+        self.samples += 1
+        return True
+
+    def _quantile(self, histogram):
+        total = sum(histogram.values())
+        if total < self.min_samples:
+            return None
+        rank = self.quantile * total
+        seen = 0
+        for minutes in sorted(histogram):
+            seen += histogram[minutes]
+            if seen >= rank:
+                return minutes
+        return max(histogram)
+
+    def build(self):
+        """Recompute the lookup entries of histograms changed since the last build"""
+        for key in self._touched:
+            minutes = self._quantile(self.histograms[key])
+            if minutes is None:
+                self.table.pop(key, None)
+            else:
+                self.table[key] = minutes
+        changed = len(self._touched)
+        self._touched.clear()
+        return changed
+
+    def minutes(self, restaurant_id, how):
+        table = self.table
+        for key in ((restaurant_id, how), (restaurant_id, ANY), (ANY, how), (ANY, ANY)):
+            minutes = table.get(key)
+            if minutes is not None:
+                return minutes
+        return DEFAULT_MINUTES
+
+
+_lock = threading.Lock()
+_model = EtaModel()
+_cursor = None  # (ACTUAL_TIME, DELIVERY_ID) of the last delivery read
+_built_at = None  # monotonic time of the last successful rebuild
+_stats = {"refreshes": 0, "rebuilds": 0, "deliveries_read": 0, "implausible": 0, "estimates": 0}
+
+
+def _read(model, after, since):
+    """
+    Add every delivery after `after` to model, one page at a time
+    Returns (ok, cursor of the last row read)
+    """
+    while True:
+        rows = get_delivery_durations(after=after, since=since, limit=FETCH_BATCH)
+        if rows is None:
+            return False, after
+        for _, restaurant_id, how, minutes, _ in rows:
+            if not model.add(restaurant_id, int(how), float(minutes)):
+                _stats["implausible"] += 1
+        _stats["deliveries_read"] += len(rows)
+        if rows:
+            after = (rows[-1][4], rows[-1][0])
+        if len(rows) < FETCH_BATCH:
+            return True, after
+
+
+def rebuild():
+    """Build a fresh model from the last ETA_WINDOW_DAYS of deliveries"""
+    global _model, _cursor, _built_at
+    model = EtaModel()
+    since = datetime.now() - timedelta(days=ETA_WINDOW_DAYS)
+    ok, cursor = _read(model, None, since)
+    if not ok:
+        return False  # keep the current model rather than a partial one
+    model.build()
+    with _lock:
+        _model, _cursor, _built_at = model, cursor, time.monotonic()
+    _stats["rebuilds"] += 1
+    return True
+
+
+def refresh():
+    """Fold in deliveries completed since the last refresh (or rebuild when due)"""
+    if _built_at is None or time.monotonic() - _built_at > ETA_REBUILD_HOURS * 3600:
+        return rebuild()
+
+    # Update copies and swap them in, so estimate() never sees a
+    # half-updated table; only touched quantiles are recomputed
+    global _model, _cursor
+    model = _model
+    pending = EtaModel(model.quantile, model.min_samples)
+    ok, cursor = _read(pending, _cursor, None)
+    if not ok:
+        return False
+    if pending.samples:
+        updated = EtaModel(model.quantile, model.min_samples)
+        updated.histograms = dict(model.histograms)
+        updated.table = dict(model.table)
+        updated.samples = model.samples + pending.samples
+        for key, histogram in pending.histograms.items():
+            updated.histograms[key] = updated.histograms.get(key, Counter()) + histogram
+            updated._touched.add(key)
+        updated.build()
+        model = updated
+    with _lock:
+        _model, _cursor = model, cursor
+    _stats["refreshes"] += 1
+    return True
+
+
+def estimate_minutes(restaurant_id, when=None):
+    when = when or datetime.now()
+    _stats["estimates"] += 1
+    return _model.minutes(restaurant_id, hour_of_week(when))
+
+
+def estimate(restaurant_id, when=None):
+    """ESTIMATED_TIME for an order placed at `when` (default now)"""
+    when = when or datetime.now()
+    return when + timedelta(minutes=estimate_minutes(restaurant_id, when))
+
+
+async def run_refresher():
+    """refresh() every ETA_REFRESH_SECONDS (in a worker thread)"""
+    while True:
+        try:
+            await asyncio.to_thread(refresh)
+        except Exception as e:
+            print(f"❌ ETA refresh failed: {e}")
+        await asyncio.sleep(ETA_REFRESH_SECONDS)
+
+
+def stats():
+    model = _model
+    return {
+        "deliveries": model.samples,
+        "keys": len(model.table),
+        "quantile": model.quantile,
+        "last_delivery": str(_cursor[0]) if _cursor else None,
+        **_stats,
+    }
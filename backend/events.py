@@ -0,0 +1,180 @@
+# backend/events.py
+"""
+Delivery event log (DELIVERY_EVENTS)
+Every committed delivery status change calls record(): creation
+(None -> ASSIGNED), transitions, and reassignment (FAILED -> ASSIGNED). Events are buffered per worker and a writer thread appends
+them with one multi-row INSERT when EVENTS_BATCH_SIZE are waiting or the
+oldest has waited EVENTS_FLUSH_SECONDS, so the history costs one extra
+statement per batch rather than one per status change.
+
+Events are timestamped when recorded, not when written. A worker that dies
+loses at most its unflushed buffer; stop() writes what is left on shutdown.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import queries
+
+EVENTS_BATCH_SIZE = int(os.getenv("EVENTS_BATCH_SIZE", "200"))
+EVENTS_FLUSH_SECONDS = float(os.getenv("EVENTS_FLUSH_SECONDS", "1"))
+# Events kept while the database is unreachable (oldest are dropped beyond this)
+MAX_BUFFERED = 50000
+RETRY_SECONDS = 1.0
+
+# Report stage -> (from status, to status), timed between the two events
+STAGES = {
+    "to_pickup": ("ASSIGNED", "PICKED_UP"),
+    "at_pickup": ("PICKED_UP", "IN_TRANSIT"),
+    "in_transit": ("IN_TRANSIT", "DELIVERED"),
+    "total": ("ASSIGNED", "DELIVERED"),
+}
+STAGE_COLUMNS = {"ASSIGNED": 1, "PICKED_UP": 2, "IN_TRANSIT": 3, "DELIVERED": 4}
+
+_lock = threading.Condition()
+_buffer = []  # event dicts, oldest first
+_oldest_at = None  # monotonic time the oldest buffered event was recorded
+_writer = None
+_stopping = False
+_stats = {"recorded": 0, "written": 0, "batches": 0, "failures": 0, "dropped": 0}
+
+
+def record(delivery_id, order_id, restaurant_id, driver_id, from_status, to_status):
+    """Buffer one status change (call after it has been committed)"""
+    global _oldest_at
+    event = {
+        "DELIVERY_ID": delivery_id,
+        "ORDER_ID": order_id,
+        "RESTAURANT_ID": restaurant_id,
+        "DRIVER_ID": driver_id,
+        "FROM_STATUS": from_status,
+        "TO_STATUS": to_status,
+        "CREATED_AT": datetime.now(),
+    }
+    with _lock:
+        if not _buffer:
+            _oldest_at = time.monotonic()
+        _buffer.append(event)
+        _stats["recorded"] += 1
+        if len(_buffer) > MAX_BUFFERED:
+            del _buffer[:len(_buffer) - MAX_BUFFERED]
+            _stats["dropped"] += 1
+        if len(_buffer) >= EVENTS_BATCH_SIZE:
+            _lock.notify()
+
+
+def pending(delivery_id):
+    """This worker's not-yet-written events for a delivery"""
+    with _lock:
+        return [e for e in _buffer if e["DELIVERY_ID"] == delivery_id]
+
+
+def flush():
+    """Write everything buffered now (in EVENTS_BATCH_SIZE INSERTs); False on failure"""
+    global _oldest_at
+    with _lock:
+        batch = list(_buffer)
+        _buffer.clear()
+        _oldest_at = None
+    if not batch:
+        return True
+
+    if queries.insert_delivery_events(batch, EVENTS_BATCH_SIZE):
+        with _lock:
+            _stats["written"] += len(batch)
+            _stats["batches"] += 1
+        return True
+
+    # Put them back in front of anything recorded meanwhile
+    with _lock:
+        _stats["failures"] += 1
+        _buffer[:0] = batch
+        if len(_buffer) > MAX_BUFFERED:
+            _stats["dropped"] += len(_buffer) - MAX_BUFFERED
+            del _buffer[:len(_buffer) - MAX_BUFFERED]
+        _oldest_at = time.monotonic()
+    return False
+
+
+def _run():
+    while True:
+        with _lock:
+            while not _stopping:
+                if len(_buffer) >= EVENTS_BATCH_SIZE:
+                    break
+                if _buffer and time.monotonic() - _oldest_at >= EVENTS_FLUSH_SECONDS:
+                    break
+                wait = EVENTS_FLUSH_SECONDS
+                if _buffer:
+                    wait -= time.monotonic() - _oldest_at
+                _lock.wait(max(wait, 0.01))
+            if _stopping:
+                return
+        if not flush():
+            time.sleep(RETRY_SECONDS)
+
+
+def start():
+    global _writer, _stopping
+    if _writer is not None:
+        return
+    _stopping = False
+    _writer = threading.Thread(target=_run, name="delivery-events", daemon=True)
+    _writer.start()
+
+
+def stop(timeout=5.0):
+    """Stop the writer and write what is still buffered"""
+    global _writer, _stopping
+    if _writer is not None:
+        with _lock:
+            _stopping = True
+            _lock.notify()
+        _writer.join(timeout)
+        _writer = None
+    flush()
+
+
+def timeline(delivery_id):
+    """Written events plus this worker's buffered ones, oldest first (None if the database is down)"""
+    written = queries.get_delivery_events(delivery_id)
+    if written is None:
+        return None
+    return written + pending(delivery_id)
+
+
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile"""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def stage_percentiles(restaurant_id, days=30, percentiles=(50, 90, 95)):
+    """
+    Minutes spent in each of STAGES by a restaurant's deliveries over the
+    last `days`: {stage: {"deliveries": n, "p50": ..., ...}}, or None
+    """
+    until = datetime.now()
+    rows = queries.get_delivery_stage_times(restaurant_id, until - timedelta(days=days), until)
+    if rows is None:
+        return None
+
+    report = {}
+    for stage, (start, end) in STAGES.items():
+        a, b = STAGE_COLUMNS[start], STAGE_COLUMNS[end]
+        minutes = sorted(
+            (row[b] - row[a]).total_seconds() / 60
+            for row in rows
+            if row[a] is not None and row[b] is not None and row[b] >= row[a]
+        )
+        report[stage] = {"deliveries": len(minutes)}
+        for p in percentiles:
+            report[stage][f"p{p}"] = round(_percentile(minutes, p), 1) if minutes else None
+    return report
+
+
+def stats():
+    with _lock:
+        return {"buffered": len(_buffer), **_stats}
@@ -0,0 +1,31 @@
+# backend/gunicorn.conf.py
+# Production server settings: `python app.py --prod` or
+# `gunicorn -c gunicorn.conf.py app:app` from the backend folder
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master; workers fork with it already loaded
+preload_app = True
+
+# Seconds a worker gets to finish in-flight requests after SIGTERM / HUP
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+# Recycle workers now and then (with jitter so they don't all restart together)
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+
+def post_fork(server, worker):
+    # Sockets must not be shared between processes: each worker builds its own pool
+    from database.connection import reset_pool
+    reset_pool()
+
+
+def worker_int(worker):
+    worker.log.info("Worker %s interrupted, draining", worker.pid)
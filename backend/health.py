@@ -0,0 +1,148 @@
+# backend/health.py
+"""
+Background database health prober
+Pings a pooled connection every HEALTH_INTERVAL_SECONDS and caches the
+result, so /api/health and /api/ready answer from memory instead of
+opening a new MySQL connection per probe.
+"""
+
+import asyncio
+import os
+import time
+
+from mysql.connector import Error
+from mysql.connector.pooling import PoolError
+
+from database.connection import check_replicas, get_db_connection, pool_stats, pooled_connection, replica_stats
+
+HEALTH_INTERVAL_SECONDS = float(os.getenv("HEALTH_INTERVAL_SECONDS", "5"))
+# Above these the service is reported "degraded" (still ready)
+LATENCY_DEGRADED_MS = float(os.getenv("HEALTH_LATENCY_DEGRADED_MS", "250"))
+SATURATION_DEGRADED = float(os.getenv("HEALTH_SATURATION_DEGRADED", "0.9"))
+# Cached status older than this counts as unknown (prober stuck or stopped)
+STALE_AFTER_SECONDS = HEALTH_INTERVAL_SECONDS * 3
+
+TABLES_TTL_SECONDS = 60
+
+status = {
+    "status": "unknown",
+    "database": "unknown",
+    "db_latency_ms": None,
+    "pool": None,
+    "replicas": [],
+    "reasons": [],
+    "checked_at": None,
+    "last_error": None,
+}
+
+_tables = {"names": None, "fetched_at": 0.0}
+
+
+def _unhealthy(reason, database, error=None):
+    status.update(
+        status="unhealthy",
+        database=database,
+        db_latency_ms=None,
+        pool=pool_stats(),
+        replicas=replica_stats(),
+        reasons=[reason],
+        checked_at=time.time(),
+        last_error=error or status["last_error"],
+    )
+    return status
+
+
+def probe():
+    """
+    Ping the database through the pool once (and re-check read replicas) and
+    update the cached status. Only a pooled connection counts: an exhausted
+    pool is reported unhealthy (not ready) instead of being masked by the
+    direct-connection fallback request handlers get.
+    """
+    check_replicas()
+    reasons = []
+    started = time.perf_counter()
+    try:
+        conn = pooled_connection()
+    except PoolError as e:
+        pool = pool_stats()
+        in_use = f" ({pool['in_use']}/{pool['size']} in use)" if pool else ""
+        return _unhealthy(f"pool exhausted{in_use}", status["database"], str(e))
+    except Error as e:
+        return _unhealthy("database unreachable", "disconnected", str(e))
+    if not conn:
+        return _unhealthy("database unreachable", "disconnected")
+
+    try:
+        conn.ping(reconnect=False)
+        latency_ms = (time.perf_counter() - started) * 1000
+        error = None
+    except Exception as e:
+        latency_ms = None
+        error = str(e)
+    finally:
+        conn.close()
+
+    pool = pool_stats()
+    if error:
+        state, database = "unhealthy", "disconnected"
+        reasons.append("ping failed")
+    else:
+        state, database = "healthy", "connected"
+        if latency_ms > LATENCY_DEGRADED_MS:
+            state = "degraded"
+            reasons.append(f"db latency {latency_ms:.0f} ms > {LATENCY_DEGRADED_MS:.0f} ms")
+        if pool and pool["in_use"] / pool["size"] >= SATURATION_DEGRADED:
+            state = "degraded"
+            reasons.append(f"pool saturated ({pool['in_use']}/{pool['size']} in use)")
+
+    status.update(
+        status=state,
+        database=database,
+        db_latency_ms=round(latency_ms, 2) if latency_ms is not None else None,
+        pool=pool,
+        replicas=replica_stats(),
+        reasons=reasons,
+        checked_at=time.time(),
+        last_error=error or status["last_error"],
+    )
+    return status
+
+
+def snapshot():
+    """Cached status (marked stale if the prober hasn't run recently)"""
+    current = dict(status)
+    checked_at = current["checked_at"]
+    if checked_at is None or time.time() - checked_at > STALE_AFTER_SECONDS:
+        current["status"] = "unknown"
+        current["reasons"] = current["reasons"] + ["health status is stale"]
+    return current
+
+
+def is_db_ready():
+    return snapshot()["status"] in ("healthy", "degraded")
+
+
+def table_names():
+    """SHOW TABLES result, refreshed at most once per TABLES_TTL_SECONDS"""
+    if _tables["names"] is None or time.monotonic() - _tables["fetched_at"] > TABLES_TTL_SECONDS:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES;")
+        _tables["names"] = [table[0] for table in cursor.fetchall()]
+        _tables["fetched_at"] = time.monotonic()
+        cursor.close()
+        conn.close()
+    return _tables["names"]
+
+
+async def run_prober():
+    """Loop forever, probing in a worker thread so the event loop never blocks"""
+    while True:
+        try:
+            await asyncio.to_thread(probe)
+        except Exception as e:
+            status.update(status="unhealthy", last_error=str(e), checked_at=time.time())
+        await asyncio.sleep(HEALTH_INTERVAL_SECONDS)
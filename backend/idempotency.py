@@ -0,0 +1,199 @@
+# backend/idempotency.py
+"""
+Idempotency-Key support for POST /api/orders
+The first request with a key claims it in IDEMPOTENCY_KEYS (primary key
+insert), places the order and stores the response. Retries with the same
+key and body get that stored response back; concurrent duplicates wait for
+the first one to finish instead of placing a second order. Completed keys
+are also kept in a small in-memory cache so hot retries skip MySQL.
+
+create_order() records the ORDER_ID on the key in its own transaction, so
+an attempt that fails (or whose worker dies) after the order exists never
+frees the key for a second order: the key is completed with that order
+instead. A key left IN_PROGRESS for IDEMPOTENCY_LEASE_SECONDS is taken over
+by the next retry.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database.queries import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    get_idempotency_key,
+    purge_idempotency_keys,
+    release_idempotency_key,
+    take_over_idempotency_key,
+)
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+# How long a duplicate waits for the original request before giving up with 409
+IN_PROGRESS_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# An IN_PROGRESS key older than this is presumed abandoned (its worker died);
+# keep it well above the slowest order placement
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+POLL_INTERVAL_SECONDS = 0.1
+FRONT_CACHE_SIZE = 10000
+MAX_KEY_LENGTH = 100
+PURGE_EVERY_CLAIMS = 1000
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+_lock = threading.Lock()
+_completed = OrderedDict()  # key -> (fingerprint, response body)
+_in_flight = {}  # key -> Event, for duplicates arriving at this same worker
+_claims = 0
+
+
+def fingerprint(payload):
+    """Stable hash of the request body"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _remember(key, fp, body):
+    with _lock:
+        _completed[key] = (fp, body)
+        _completed.move_to_end(key)
+        while len(_completed) > FRONT_CACHE_SIZE:
+            _completed.popitem(last=False)
+
+
+def _check_fingerprint(stored_fp, fp):
+    if stored_fp != fp:
+        raise IdempotencyError(422, "Idempotency-Key was already used with a different request body")
+
+
+def _cached(key, fp):
+    entry = _completed.get(key)
+    if entry is None:
+        return None
+    _check_fingerprint(entry[0], fp)
+    return entry[1]
+
+
+def _maybe_purge():
+    global _claims
+    _claims += 1
+    if _claims % PURGE_EVERY_CLAIMS == 0:
+        purge_idempotency_keys(IDEMPOTENCY_TTL_HOURS)
+
+
+def begin(key, fp, replay_order):
+    """
+    Returns the stored response body (JSON string) if this key was already
+    completed, or None if the caller now owns the key and must place the
+    order, then call complete() or abandon(). replay_order(order_id) returns
+    the response body for an order an earlier, interrupted attempt created.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+    body = _cached(key, fp)
+    if body is not None:
+        return body
+
+    # Duplicate inside this worker: wait on the original without touching MySQL
+    with _lock:
+        event = _in_flight.get(key)
+        if event is None:
+            _in_flight[key] = threading.Event()
+    if event is not None:
+        event.wait(IN_PROGRESS_WAIT_SECONDS)
+        body = _cached(key, fp)
+        if body is not None:
+            return body
+        with _lock:
+            if key in _in_flight:
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed")
+            _in_flight[key] = threading.Event()
+
+    try:
+        return _claim_or_wait(key, fp, replay_order)
+    except BaseException:
+        _finish_local(key)
+        raise
+
+
+def _claim_or_wait(key, fp, replay_order):
+    deadline = time.monotonic() + IN_PROGRESS_WAIT_SECONDS
+    while True:
+        claimed = claim_idempotency_key(key, fp)
+        if claimed is None:
+            raise IdempotencyError(503, "Cannot reach the database to check Idempotency-Key")
+        if claimed:
+            _maybe_purge()
+            return None
+
+        # Another worker owns it (or finished it)
+        row = get_idempotency_key(key)
+        while row is not None:
+            _check_fingerprint(row["REQUEST_FINGERPRINT"], fp)
+            if row["STATUS"] == "COMPLETED":
+                _remember(key, fp, row["RESPONSE_BODY"])
+                _finish_local(key)
+                return row["RESPONSE_BODY"]
+            if row["AGE_SECONDS"] >= IDEMPOTENCY_LEASE_SECONDS:
+                taken = take_over_idempotency_key(key, fp, IDEMPOTENCY_LEASE_SECONDS)
+                if taken is None:
+                    raise IdempotencyError(503, "Cannot reach the database to check Idempotency-Key")
+                if taken:
+                    if row["ORDER_ID"] is not None:
+                        return _complete_existing(key, fp, row["ORDER_ID"], replay_order)
+                    return None
+            if time.monotonic() > deadline:
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed")
+            time.sleep(POLL_INTERVAL_SECONDS)
+            row = get_idempotency_key(key)
+        # Row vanished: the other attempt failed and released it - try to claim again
+
+
+def _finish_local(key):
+    with _lock:
+        event = _in_flight.pop(key, None)
+    if event is not None:
+        event.set()
+
+
+def complete(key, fp, order_id, body):
+    """Record the successful response (body: JSON string) for future retries"""
+    complete_idempotency_key(key, order_id, body)
+    _remember(key, fp, body)
+    _finish_local(key)
+
+
+def _complete_existing(key, fp, order_id, replay_order):
+    body = replay_order(order_id)
+    if body is None:
+        raise IdempotencyError(503, "Cannot load the order placed with this Idempotency-Key")
+    complete(key, fp, order_id, body)
+    return body
+
+
+def abandon(key, fp, replay_order):
+    """
+    The attempt failed: release the key so the client can retry, or, if the
+    order was already created, complete the key with it so a retry gets that
+    order back instead of placing a second one. Returns that order's
+    response body, or None.
+    """
+    try:
+        order_id = release_idempotency_key(key)
+        if order_id is not None:
+            return _complete_existing(key, fp, order_id, replay_order)
+    except Exception as e:
+        # Still IN_PROGRESS: a retry takes it over after IDEMPOTENCY_LEASE_SECONDS
+        print(f"❌ Could not settle Idempotency-Key {key}: {e}")
+    finally:
+        _finish_local(key)
+    return None
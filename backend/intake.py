@@ -0,0 +1,389 @@
+# backend/intake.py
+"""
+Write-behind order intake (ORDER_INTAKE_MODE=queued)
+POST /api/orders prices the order from the catalog cache, appends it to
+this worker's journal file and answers 202 with a provisional ID. Writer
+threads drain the queue into MySQL in batches (create_orders_bulk), storing
+the provisional ID in IDEMPOTENCY_KEYS in the same transaction, so a journal
+replayed after a crash never creates an order twice.
+
+Each worker process owns (flock) its own intake-<pid>-<random>.jsonl, a new
+name on every start, so a restarted worker that reuses a PID never mistakes
+a dead worker's journal for its own. On startup a worker adopts every
+journal whose lock is free and re-queues what it still had.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from decimal import Decimal
+
+import dispatch
+import payments
+from database.queries import (
+    DB_TRANSIENT,
+    DB_UNAVAILABLE,
+    create_orders_bulk,
+    get_idempotency_key,
+    get_idempotency_orders,
+)
+
+INTAKE_MODE = os.getenv("ORDER_INTAKE_MODE", "direct")  # "queued" turns this on
+JOURNAL_DIR = os.getenv(
+    "INTAKE_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intake-journal")
+)
+QUEUE_SIZE = int(os.getenv("INTAKE_QUEUE_SIZE", "1000"))
+WRITERS = int(os.getenv("INTAKE_WRITERS", "2"))
+BATCH_SIZE = int(os.getenv("INTAKE_BATCH_SIZE", "100"))
+FSYNC = os.getenv("INTAKE_FSYNC", "1") == "1"
+BATCH_WAIT_SECONDS = 0.05
+RETRY_SECONDS = 1.0
+STATUS_CACHE_SIZE = 10000
+# create_orders_bulk errors that leave the order queued instead of FAILED
+RETRYABLE_ERRORS = (DB_UNAVAILABLE, DB_TRANSIENT)
+
+
+class IntakeFull(Exception):
+    pass
+
+
+_lock = threading.Condition()
+_queue = deque()  # (provisional_id, order)
+_status = OrderedDict()  # provisional_id -> {"status", "ORDER_ID", "error"}
+_outstanding = 0  # journaled but not yet written or failed
+_journal = None
+_writers = []
+_stopping = False
+
+
+def enabled():
+    return _journal is not None and not _stopping
+
+
+# ==================== JOURNAL ====================
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _load_order(order):
+    order["estimated_time"] = datetime.fromisoformat(order["estimated_time"])
+    for item in order["items"]:
+        item["price"] = Decimal(item["price"])
+    return order
+
+
+def _append(records):
+    """Append journal records and make them durable (call with _lock held)"""
+    _journal.write("".join(json.dumps(r, default=_default) + "\n" for r in records))
+    _journal.flush()
+    if FSYNC:
+        os.fsync(_journal.fileno())
+
+
+def _read_journal(path):
+    """Entries still pending in a journal file: {provisional_id: order}, plus failures"""
+    pending, failed = {}, {}
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # torn last line from a crash mid-write
+            if record["op"] == "enqueue":
+                pending[record["id"]] = record["order"]
+            else:
+                pending.pop(record["id"], None)
+                if record["op"] == "failed":
+                    failed[record["id"]] = record["error"]
+    return pending, failed
+
+
+def _try_lock(f):
+    import fcntl
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+# ==================== QUEUE ====================
+
+def _set_status(provisional_id, status, order_id=None, error=None):
+    _status[provisional_id] = {"status": status, "ORDER_ID": order_id, "error": error}
+    _status.move_to_end(provisional_id)
+    while len(_status) > STATUS_CACHE_SIZE:
+        _status.popitem(last=False)
+
+
+def _enqueue(entries):
+    """Journal and queue (provisional_id, order) pairs (call with _lock held)"""
+    global _outstanding
+    _append({"op": "enqueue", "id": pid, "order": order} for pid, order in entries)
+    for pid, order in entries:
+        _queue.append((pid, order))
+        _set_status(pid, "QUEUED")
+    _outstanding += len(entries)
+    _lock.notify_all()
+
+
+def submit(order, fingerprint):
+    """
+    Journal a priced order (same shape as create_orders_bulk takes) and return
+    its provisional ID. Raises IntakeFull when the queue is at capacity.
+    """
+    provisional_id = f"intake-{os.getpid()}-{uuid.uuid4().hex[:16]}"
+    order = dict(order, intake_key=provisional_id, fingerprint=fingerprint)
+    with _lock:
+        if len(_queue) >= QUEUE_SIZE:
+            raise IntakeFull()
+        _enqueue([(provisional_id, order)])
+    return provisional_id
+
+
+def _finish(batch, results):
+    global _outstanding
+    records = []
+    with _lock:
+        if _journal is None:
+            return  # stop() timed out; replay will find these orders in MySQL
+        for (pid, order), (order_id, error) in zip(batch, results):
+            if error:
+                dispatch.release(order["driver_id"])
+                records.append({"op": "failed", "id": pid, "error": error})
+                _set_status(pid, "FAILED", error=error)
+            else:
+                records.append({"op": "done", "id": pid, "order_id": order_id})
+                _set_status(pid, "CREATED", order_id=order_id)
+        _append(records)
+        _outstanding -= len(batch)
+        if _outstanding == 0:
+            # Everything journaled so far is in MySQL: start the file over
+            _journal.seek(0)
+            _journal.truncate()
+
+
+def _writer():
+    while True:
+        with _lock:
+            while not _queue and not _stopping:
+                _lock.wait()
+            if not _queue:
+                return
+            short = len(_queue) < BATCH_SIZE
+        if short and not _stopping:
+            time.sleep(BATCH_WAIT_SECONDS)  # let a few more orders join this batch
+
+        with _lock:
+            batch = [_queue.popleft() for _ in range(min(BATCH_SIZE, len(_queue)))]
+        if not batch:
+            continue
+
+        try:
+            retry = _write(batch)
+        except Exception as e:
+            # Keep the thread and the orders; a batch that did commit is
+            # recognised by its IDEMPOTENCY_KEYS rows on the next attempt
+            print(f"❌ Intake writer error: {e}")
+            retry = batch
+        if retry:
+            # Nothing was written for these: keep them queued and wait for MySQL
+            with _lock:
+                _queue.extendleft(reversed(retry))
+            if _stopping:
+                return
+            time.sleep(RETRY_SECONDS)
+
+
+def _match_payment_mode(orders):
+    """
+    Orders journaled under the other PAYMENT_MODE (before a restart): an
+    async-priced order written synchronously needs a driver now, and a
+    sync-priced one written as PENDING gives its driver back
+    """
+    async_payment = payments.PAYMENT_MODE == "async"
+    for order in orders:
+        if async_payment and order["driver_id"] is not None:
+            dispatch.release(order["driver_id"])
+            order["driver_id"] = None
+        elif not async_payment and order["driver_id"] is None:
+            order["driver_id"] = dispatch.assign(order["restaurant_id"])
+    return async_payment
+
+
+def _write(batch):
+    """Write a batch and journal the outcome; returns the entries to retry"""
+    orders = [order for _, order in batch]
+    async_payment = _match_payment_mode(orders)
+    results = create_orders_bulk(orders, BATCH_SIZE,
+                                 pending_payment=payments.submit_order if async_payment else None)
+
+    # An order retried after an ambiguous failure (connection lost around
+    # COMMIT) may already exist: it then fails on its IDEMPOTENCY_KEYS row
+    failed = [pid for (pid, _), (_, error) in zip(batch, results) if error and error not in RETRYABLE_ERRORS]
+    written = get_idempotency_orders(failed) if failed else {}
+
+    retry, done, outcomes = [], [], []
+    for entry, (order_id, error) in zip(batch, results):
+        if error and written and entry[0] in written:
+            order_id, error = written[entry[0]], None
+        if error in RETRYABLE_ERRORS or (error and written is None):
+            retry.append(entry)
+        else:
+            done.append(entry)
+            outcomes.append((order_id, error))
+    if done:
+        _finish(done, outcomes)
+    return retry
+
+
+# ==================== REPLAY ====================
+
+def _adopt(path):
+    """Re-queue the pending entries of a dead worker's journal, then delete it"""
+    try:
+        f = open(path, "r+")
+    except FileNotFoundError:
+        return 0  # adopted by another worker meanwhile
+    if not _try_lock(f):
+        f.close()  # a live worker still owns it
+        return 0
+
+    try:
+        if os.fstat(f.fileno()).st_nlink == 0:
+            return 0  # another worker adopted and deleted it before we got the lock
+
+        pending, failed = _read_journal(path)
+        written = get_idempotency_orders(pending)
+        while written is None and not _stopping:
+            time.sleep(RETRY_SECONDS)
+            written = get_idempotency_orders(pending)
+        if written is None:
+            return 0
+
+        with _lock:
+            for pid, error in failed.items():
+                _set_status(pid, "FAILED", error=error)
+            for pid, order_id in written.items():
+                # Committed before the crash, just not marked done in the journal
+                _set_status(pid, "CREATED", order_id=order_id)
+            entries = [(pid, _load_order(order)) for pid, order in pending.items() if pid not in written]
+            if entries:
+                _enqueue(entries)
+        os.unlink(path)
+        print(f"📒 Replayed {os.path.basename(path)}: {len(entries)} queued, {len(written)} already written")
+        return len(entries)
+    finally:
+        f.close()
+
+
+def _replay():
+    """Adopt every journal whose lock is free (their workers are gone)"""
+    own = os.path.abspath(_journal.name)
+    for path in sorted(glob.glob(os.path.join(JOURNAL_DIR, "intake-*.jsonl"))):
+        if os.path.abspath(path) != own:
+            try:
+                _adopt(path)
+            except Exception as e:
+                print(f"❌ Could not replay {path}: {e}")
+
+
+# ==================== LIFECYCLE ====================
+
+def start():
+    """Open this worker's journal, adopt orphaned journals and start the writers"""
+    global _journal, _stopping
+    if INTAKE_MODE != "queued" or _journal is not None:
+        return
+
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    # Unique per process start: a PID reused after a crash gets a fresh file
+    journal = open(os.path.join(JOURNAL_DIR, f"intake-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"), "a+")
+    if not _try_lock(journal):
+        journal.close()
+        raise RuntimeError(f"Intake journal {journal.name} is locked by another process")
+
+    _stopping = False
+    _journal = journal
+    _writers[:] = [threading.Thread(target=_writer, daemon=True, name=f"intake-writer-{i}") for i in range(WRITERS)]
+    _writers.append(threading.Thread(target=_replay, daemon=True, name="intake-replay"))
+    for thread in _writers:
+        thread.start()
+    print(f"📒 Queued order intake on (journal {journal.name}, {WRITERS} writers)")
+
+
+def stop(timeout=30):
+    """Stop taking orders and give the writers `timeout` seconds to drain"""
+    global _journal, _stopping
+    if _journal is None:
+        return
+
+    with _lock:
+        _stopping = True
+        _lock.notify_all()
+    deadline = time.monotonic() + timeout
+    for thread in _writers:
+        thread.join(max(0, deadline - time.monotonic()))
+
+    with _lock:
+        left = len(_queue)
+        if _outstanding == 0:
+            os.unlink(_journal.name)  # nothing to replay
+        _journal.close()  # releases the flock; leftovers are replayed by the next worker
+        _journal = None
+    if left:
+        print(f"📒 {left} queued orders left in the journal for replay")
+
+
+# ==================== STATUS ====================
+
+def _scan_journals(provisional_id):
+    needle = f'"id": "{provisional_id}"'
+    found = None
+    for path in glob.glob(os.path.join(JOURNAL_DIR, "intake-*.jsonl")):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if needle in line:
+                        record = json.loads(line)
+                        if record["op"] == "done":
+                            return {"status": "CREATED", "ORDER_ID": record["order_id"], "error": None}
+                        if record["op"] == "failed":
+                            return {"status": "FAILED", "ORDER_ID": None, "error": record["error"]}
+                        found = {"status": "QUEUED", "ORDER_ID": None, "error": None}
+        except (OSError, ValueError):
+            continue
+    return found
+
+
+def lookup(provisional_id):
+    """Status of a queued order: QUEUED, CREATED (with ORDER_ID) or FAILED; None if unknown"""
+    status = _status.get(provisional_id)
+    if status is not None:
+        return status
+
+    # Queued by another worker: MySQL knows it once written, its journal until then
+    row = get_idempotency_key(provisional_id)
+    if row and row["STATUS"] == "COMPLETED":
+        return {"status": "CREATED", "ORDER_ID": row["ORDER_ID"], "error": None}
+    return _scan_journals(provisional_id)
+
+
+def stats():
+    return {
+        "mode": INTAKE_MODE,
+        "queued": len(_queue),
+        "outstanding": _outstanding,
+        "capacity": QUEUE_SIZE,
+    }
@@ -0,0 +1,96 @@
+# backend/lazy.py
+"""
+Deferred imports for a fast cold start
+Heavy optional dependencies (openpyxl, future export libraries), whole
+routers and, with STARTUP_MODE=lazy, the app-level services are only
+imported when something first needs them.
+"""
+
+import importlib
+import os
+import threading
+
+# "lazy" registers routers on their first request instead of at import time
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stand-in for a module that imports the real one on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _import_lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Use instead of `import name` for libraries only a few endpoints need"""
+    return LazyModule(name)
+
+
+def startup_import(name):
+    """
+    `import name` for app-level services (dispatch, outbox, ...): imported now
+    in eager mode, on first use with STARTUP_MODE=lazy, so `import app` does
+    not pull in database.queries and everything behind it
+    """
+    return lazy_import(name) if STARTUP_MODE == "lazy" else importlib.import_module(name)
+
+
+class LazyRouters:
+    """
+    ASGI middleware that includes a router the first time a request hits its prefix
+    routers: {"/api/reports": "routes.reports", ...} (module must define `router`)
+    """
+
+    # Paths that need every route registered (interactive docs / schema)
+    LOAD_ALL_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+    def __init__(self, app, fastapi_app, routers):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.pending = dict(routers)
+        self.lock = threading.Lock()
+
+    def _include(self, prefix):
+        with self.lock:
+            module_name = self.pending.pop(prefix, None)
+            if module_name is None:
+                return
+            module = importlib.import_module(module_name)
+            self.fastapi_app.include_router(module.router)
+            # Regenerate /openapi.json with the new routes
+            self.fastapi_app.openapi_schema = None
+            print(f"📦 Router loaded on first use: {module_name}")
+
+    async def __call__(self, scope, receive, send):
+        if self.pending and scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if path.startswith(self.LOAD_ALL_PATHS):
+                for prefix in list(self.pending):
+                    self._include(prefix)
+            else:
+                for prefix in list(self.pending):
+                    if path == prefix or path.startswith(prefix + "/"):
+                        self._include(prefix)
+                        break
+        await self.app(scope, receive, send)
@@ -0,0 +1,125 @@
+# backend/lifecycle.py
+"""
+Worker startup / shutdown for the API
+Each worker opens its own connection pool, warms it up and primes the
+catalog cache before reporting ready, and stops reporting ready as soon
+as it starts draining.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import health
+from database.connection import init_pool
+from lazy import startup_import
+
+# Loaded by the lifespan at the latest (see lazy.startup_import)
+catalog = startup_import("database.catalog")
+dispatch = startup_import("dispatch")
+eta = startup_import("eta")
+events = startup_import("events")
+intake = startup_import("intake")
+locations = startup_import("locations")
+outbox = startup_import("outbox")
+payments = startup_import("payments")
+tracking = startup_import("tracking")
+
+# Connections to open and ping during warmup (0 = whole pool)
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "0"))
+WARMUP_RETRY_SECONDS = 5
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+state = {
+    "ready": False,
+    "draining": False,
+    "warmup_ms": None,
+    "warmup_error": None,
+}
+
+
+def warmup():
+    """Open the pool, touch every connection and load the catalog"""
+    started = time.perf_counter()
+
+    pool = init_pool()
+    if pool is None:
+        raise RuntimeError("database pool unavailable")
+
+    # Check connections out all at once so each one really gets opened
+    count = WARMUP_CONNECTIONS or pool.pool_size
+    conns = []
+    try:
+        for _ in range(min(count, pool.pool_size)):
+            conn = pool.get_connection()
+            conn.ping(reconnect=True)
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+
+    restaurants = catalog.load()
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"🔥 Warmup done in {elapsed:.0f} ms ({len(conns)} connections, {restaurants} restaurants, pid {os.getpid()})")
+    return elapsed
+
+
+async def _try_warmup():
+    try:
+        state["warmup_ms"] = await asyncio.to_thread(warmup)
+        state["warmup_error"] = None
+        state["ready"] = True
+    except Exception as e:
+        # Keep serving /api/health so the problem is visible; /api/ready stays 503
+        state["warmup_error"] = str(e)
+        print(f"❌ Warmup failed: {e}")
+
+
+async def _retry_warmup():
+    while not state["ready"] and not state["draining"]:
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+        await _try_warmup()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """FastAPI lifespan: warm up before serving, drain on shutdown"""
+    state["ready"] = False
+    state["draining"] = False
+
+    # The worker doesn't accept connections until this first attempt returns
+    await _try_warmup()
+    await asyncio.to_thread(health.probe)
+    await asyncio.to_thread(intake.start)
+    events.start()
+    payments.start()
+    tracking.start()
+    outbox.start()
+    retry = asyncio.create_task(_retry_warmup())
+    prober = asyncio.create_task(health.run_prober())
+    dispatcher = asyncio.create_task(dispatch.run_refresher())
+    location_flusher = asyncio.create_task(locations.run_flusher())
+    eta_refresher = asyncio.create_task(eta.run_refresher())
+    payment_sweeper = asyncio.create_task(payments.run_sweeper())
+
+    yield
+
+    # New traffic is refused from here on; in-flight requests finish first
+    state["ready"] = False
+    state["draining"] = True
+    retry.cancel()
+    prober.cancel()
+    dispatcher.cancel()
+    location_flusher.cancel()
+    eta_refresher.cancel()
+    payment_sweeper.cancel()
+    tracking.stop()
+    print(f"🛑 Worker {os.getpid()} draining")
+    # Write out queued orders; whatever is left is replayed from the journal
+    await asyncio.to_thread(intake.stop, GRACEFUL_TIMEOUT * 0.8)
+    await asyncio.to_thread(payments.stop, GRACEFUL_TIMEOUT * 0.1)
+    # Last driver positions and delivery events this worker has not written yet
+    await asyncio.to_thread(locations.flush)
+    await asyncio.to_thread(events.stop)
+    await asyncio.to_thread(outbox.stop)
@@ -0,0 +1,161 @@
+# backend/locations.py
+"""
+Driver location ingest
+Driver apps send a GPS ping every few seconds. ping() only updates this
+worker's in-memory store (and the dispatch index); a flusher writes the
+coalesced result every LOCATION_FLUSH_SECONDS in one transaction:
+    - the latest point per driver that moved since the last flush
+      (DRIVER_LOCATIONS, one upsert row per driver however many pings)
+    - a downsampled trail for each of the driver's active deliveries
+      (DELIVERY_TRAIL, at most one point per LOCATION_TRAIL_SECONDS unless
+      the driver moved LOCATION_TRAIL_METERS)
+"Where is my driver" is answered from memory; a worker that has not seen
+the driver recently falls back to DRIVER_LOCATIONS.
+"""
+
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+import dispatch
+from database.queries import get_active_deliveries_for_drivers, save_driver_locations
+
+LOCATION_FLUSH_SECONDS = float(os.getenv("LOCATION_FLUSH_SECONDS", "5"))
+LOCATION_TRAIL_SECONDS = float(os.getenv("LOCATION_TRAIL_SECONDS", "30"))
+LOCATION_TRAIL_METERS = float(os.getenv("LOCATION_TRAIL_METERS", "100"))
+FLUSH_BATCH_SIZE = 500
+# Trail points kept per driver while the database is unreachable
+MAX_PENDING_TRAIL = 120
+# A point older than this is not trusted over DRIVER_LOCATIONS
+STALE_SECONDS = 2 * LOCATION_FLUSH_SECONDS
+
+
+@dataclass(slots=True, frozen=True)
+class Point:
+    lat: float
+    lng: float
+    recorded_at: datetime
+
+
+_lock = threading.Lock()
+_latest = {}  # driver_id -> Point
+_dirty = set()  # drivers whose latest point is not flushed yet
+_trail = {}  # driver_id -> [Point] waiting for the next flush
+_last_trail = {}  # driver_id -> last Point kept for the trail
+_deliveries = {}  # delivery_id -> driver_id, active deliveries seen at the last flush
+_driver_deliveries = {}  # driver_id -> [delivery_id]
+_stats = {"pings": 0, "coalesced": 0, "trail_points": 0, "flushes": 0,
+          "rows_written": 0, "flush_failures": 0}
+
+
+def _keep_for_trail(driver_id, point):
+    last = _last_trail.get(driver_id)
+    if last is None:
+        return True
+    if (point.recorded_at - last.recorded_at).total_seconds() >= LOCATION_TRAIL_SECONDS:
+        return True
+    return dispatch.distance_km(last.lat, last.lng, point.lat, point.lng) * 1000 >= LOCATION_TRAIL_METERS
+
+
+# ==================== PUBLIC API ====================
+
+def ping(driver_id, lat, lng):
+    """Record a GPS ping; False if driver_id is not a known driver"""
+    if not dispatch.update_location(driver_id, lat, lng):
+        return False
+
+    point = Point(lat, lng, datetime.now().replace(microsecond=0))
+    with _lock:
+        _stats["pings"] += 1
+        if driver_id in _dirty:
+            _stats["coalesced"] += 1
+        _latest[driver_id] = point
+        _dirty.add(driver_id)
+        if _keep_for_trail(driver_id, point):
+            _last_trail[driver_id] = point
+            pending = _trail.setdefault(driver_id, [])
+            pending.append(point)
+            del pending[:-MAX_PENDING_TRAIL]
+            _stats["trail_points"] += 1
+    return True
+
+
+def latest(driver_id):
+    """This worker's latest Point for a driver if it is recent, else None"""
+    with _lock:
+        point = _latest.get(driver_id)
+    if point is None or (datetime.now() - point.recorded_at).total_seconds() > STALE_SECONDS:
+        return None
+    return point
+
+
+def driver_for_delivery(delivery_id):
+    """DRIVER_ID of an active delivery as of the last flush, or None"""
+    with _lock:
+        return _deliveries.get(delivery_id)
+
+
+def flush():
+    """Write everything pending in one transaction; returns rows written"""
+    with _lock:
+        dirty = {driver_id: _latest[driver_id] for driver_id in _dirty}
+        trail = dict(_trail)
+        _dirty.clear()
+        _trail.clear()
+    if not dirty and not trail:
+        return 0
+
+    active = get_active_deliveries_for_drivers(set(dirty) | set(trail))
+    latest_rows = [(d, p.lat, p.lng, p.recorded_at) for d, p in dirty.items()]
+    trail_rows = [
+        (delivery_id, p.lat, p.lng, p.recorded_at)
+        for driver_id, points in trail.items()
+        for delivery_id in (active or {}).get(driver_id, ())
+        for p in points
+    ]
+
+    if active is None or not save_driver_locations(latest_rows, trail_rows, FLUSH_BATCH_SIZE):
+        # Put it back; newer pings win, older trail points go first
+        with _lock:
+            _stats["flush_failures"] += 1
+            _dirty.update(dirty)
+            for driver_id, points in trail.items():
+                pending = _trail.setdefault(driver_id, [])
+                pending[:0] = points
+                del pending[:-MAX_PENDING_TRAIL]
+        return 0
+
+    with _lock:
+        _stats["flushes"] += 1
+        _stats["rows_written"] += len(latest_rows) + len(trail_rows)
+        for driver_id in set(dirty) | set(trail):
+            for delivery_id in _driver_deliveries.pop(driver_id, ()):
+                _deliveries.pop(delivery_id, None)
+            if active.get(driver_id):
+                _driver_deliveries[driver_id] = active[driver_id]
+                for delivery_id in active[driver_id]:
+                    _deliveries[delivery_id] = driver_id
+    return len(latest_rows) + len(trail_rows)
+
+
+async def run_flusher():
+    """flush() every LOCATION_FLUSH_SECONDS (in a worker thread)"""
+    while True:
+        await asyncio.sleep(LOCATION_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush)
+        except Exception as e:
+            print(f"❌ Driver location flush failed: {e}")
+
+
+def stats():
+    with _lock:
+        return {
+            "drivers": len(_latest),
+            "pending_drivers": len(_dirty),
+            "pending_trail": sum(len(p) for p in _trail.values()),
+            "tracked_deliveries": len(_deliveries),
+            **_stats,
+        }
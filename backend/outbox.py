@@ -0,0 +1,356 @@
+# backend/outbox.py
+"""
+Change stream from the transactional outbox (OUTBOX, db/outbox.sql)
+queries.py writes one OUTBOX row per change to ORDERS, PAYMENTS and
+DELIVERIES in the transaction that makes the change (triggers do the same
+for RESTAURANT and MENU), so an event exists if and only if the change
+committed. A relay thread in every worker tails OUTBOX by OUTBOX_ID in
+batches of OUTBOX_BATCH_SIZE and hands them to in-process subscribers:
+    - subscribe(): this worker's caches and push channels (catalog
+      invalidation, order / driver ETags, delivery push). Each worker starts
+      at the end of the outbox, since its caches start empty.
+    - consumer(): shared consumers with a checkpoint in OUTBOX_CHECKPOINTS
+      (REVENUE_DAILY). One worker at a time runs a step; the handler's
+      writes and the new checkpoint commit in the same transaction.
+Delivery is at-least-once: if a handler raises, the batch is handed to
+every subscriber again after RETRY_SECONDS, so handlers must be idempotent.
+
+OUTBOX_IDs are allocated at INSERT but become visible at COMMIT, so a
+missing ID can be a transaction still in flight. The relay stops at a gap
+until the row shows up or OUTBOX_GAP_SECONDS pass (a rollback also leaves
+a gap), which keeps events in order. IDs it then moves past are re-checked
+on every step for OUTBOX_LATE_SECONDS (in memory for the relay, in
+OUTBOX_SKIPPED for shared consumers): a transaction that commits late is
+still handed out, after the events that overtook it, and counted as late.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+import tracking
+from conditional import bump_driver_version, bump_order_version
+from database import queries
+from lazy import lazy_import
+
+# catalog imports queries, which imports this module
+catalog = lazy_import("database.catalog")
+
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "1") == "1"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "0.5"))
+OUTBOX_GAP_SECONDS = float(os.getenv("OUTBOX_GAP_SECONDS", "2"))
+# Skipped IDs still missing after this were rolled back; stop re-checking them
+OUTBOX_LATE_SECONDS = float(os.getenv("OUTBOX_LATE_SECONDS", "3600"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+RETRY_SECONDS = 1.0
+PURGE_INTERVAL_SECONDS = 600
+
+_lock = threading.Condition()
+_subscribers = {}  # name -> (handler, aggregates or None)
+_consumers = {}  # name -> handler(cursor, events)
+_position = None  # last OUTBOX_ID handed to this worker's subscribers
+_gaps = defaultdict(dict)  # position owner -> {first missing OUTBOX_ID: monotonic time first seen}
+_skipped = {}  # OUTBOX_ID the relay moved past while missing -> monotonic time skipped
+_relay = None
+_stopping = False
+_purged_at = 0.0
+_lag = {"head": None, "lag_events": 0, "lag_ms": 0.0, "last_batch_age_ms": None}
+_checkpoints = {}  # shared consumer -> last checkpoint this worker saw
+_ensured = set()  # shared consumers whose OUTBOX_CHECKPOINTS row exists
+_stats = {"batches": 0, "events": 0, "retries": 0, "gaps_skipped": 0, "late_events": 0,
+          "gaps_abandoned": 0, "purged": 0}
+_handler_stats = defaultdict(lambda: {"events": 0, "failures": 0})
+
+
+def subscribe(name, handler, aggregates=None):
+    """handler(events) for each batch of this worker's stream (aggregates: e.g. ("ORDER",) or None for all)"""
+    with _lock:
+        _subscribers[name] = (handler, tuple(aggregates) if aggregates else None)
+
+
+def consumer(name, handler):
+    """Shared consumer: handler(cursor, events) writes with cursor; checkpointed in OUTBOX_CHECKPOINTS"""
+    with _lock:
+        _consumers[name] = handler
+
+
+# ==================== RELAY ====================
+
+def _ready(owner, position, events):
+    """
+    (ready, skipped): the events that can be handed on now, in order from
+    position up to an unexpired gap, and the missing OUTBOX_IDs moved past
+    """
+    gaps = _gaps[owner]
+    ready = []
+    skipped = []
+    expected = position + 1
+    now = time.monotonic()
+    for event in events:
+        if event["OUTBOX_ID"] != expected:
+            if now - gaps.setdefault(expected, now) < OUTBOX_GAP_SECONDS:
+                break
+            skipped.extend(range(expected, event["OUTBOX_ID"]))
+        ready.append(event)
+        expected = event["OUTBOX_ID"] + 1
+    for missing in [m for m in gaps if m < expected]:
+        del gaps[missing]
+    if skipped:
+        with _lock:
+            _stats["gaps_skipped"] += len(skipped)
+    return ready, skipped
+
+
+def _count_late(owner, late, abandoned):
+    if late:
+        print(f"⚠️ Outbox {owner}: {len(late)} events committed after their gap was skipped, handed out late")
+    with _lock:
+        _stats["late_events"] += len(late)
+        _stats["gaps_abandoned"] += abandoned
+
+
+def _recheck_skipped():
+    """Hand out skipped events that have committed since; forget ones missing for OUTBOX_LATE_SECONDS"""
+    if not _skipped:
+        return
+    late = queries.get_outbox_events_by_ids(sorted(_skipped)[:OUTBOX_BATCH_SIZE])
+    if late is None:
+        return
+    if late:
+        _hand_out(late)
+    for event in late:
+        del _skipped[event["OUTBOX_ID"]]
+    now = time.monotonic()
+    expired = [i for i, at in _skipped.items() if now - at > OUTBOX_LATE_SECONDS]
+    for i in expired:
+        del _skipped[i]
+    _count_late("relay", late, len(expired))
+
+
+def _hand_out(events):
+    with _lock:
+        subscribers = list(_subscribers.items())
+    for name, (handler, aggregates) in subscribers:
+        batch = [e for e in events if aggregates is None or e["AGGREGATE"] in aggregates]
+        if not batch:
+            continue
+        try:
+            handler(batch)
+        except Exception:
+            with _lock:
+                _handler_stats[name]["failures"] += 1
+            raise
+        with _lock:
+            _handler_stats[name]["events"] += len(batch)
+
+
+def step():
+    """Hand out one batch to this worker's subscribers; returns the number of events (None on error)"""
+    global _position
+    if _position is None:
+        head = queries.get_outbox_head()
+        if head is None:
+            return None
+        _position = head
+
+    _recheck_skipped()
+    events = queries.get_outbox_events(_position, OUTBOX_BATCH_SIZE)
+    if events is None:
+        return None
+    ready, skipped = _ready("relay", _position, events)
+    if ready:
+        _hand_out(ready)
+        _position = ready[-1]["OUTBOX_ID"]
+        now = time.monotonic()
+        _skipped.update((i, now) for i in skipped)
+
+    head = events[-1]["OUTBOX_ID"] if events else _position
+    if len(events) == OUTBOX_BATCH_SIZE:
+        head = queries.get_outbox_head() or head
+    waiting = events[len(ready):]
+    with _lock:
+        _stats["batches"] += bool(ready)
+        _stats["events"] += len(ready)
+        _lag.update(
+            head=head,
+            lag_events=head - _position,
+            lag_ms=waiting[0]["AGE_MS"] if waiting else 0.0,
+        )
+        if ready:
+            _lag["last_batch_age_ms"] = round(ready[-1]["AGE_MS"], 1)
+    return len(ready)
+
+
+def _run_consumer(name, handler):
+    if name not in _ensured:
+        if not queries.ensure_outbox_checkpoint(name):
+            return None
+        _ensured.add(name)
+
+    def apply(cursor, checkpoint, events, late):
+        ready, skipped = _ready(name, checkpoint, events)
+        if not ready and not late:
+            return checkpoint, []
+        # Late events first: they committed before the ones that overtook them
+        handler(cursor, late + ready)
+        with _lock:
+            _handler_stats[name]["events"] += len(late) + len(ready)
+        return (ready[-1]["OUTBOX_ID"] if ready else checkpoint), skipped
+
+    result = queries.consume_outbox(name, apply, OUTBOX_BATCH_SIZE, OUTBOX_LATE_SECONDS)
+    if result is None:
+        with _lock:
+            _handler_stats[name]["failures"] += 1
+        return None
+    if result:
+        old, new, late, abandoned = result
+        _count_late(name, late, abandoned)
+        with _lock:
+            _checkpoints[name] = new
+        return new - old
+    return 0
+
+
+def _purge():
+    global _purged_at
+    if time.monotonic() - _purged_at < PURGE_INTERVAL_SECONDS:
+        return
+    _purged_at = time.monotonic()
+    purged = queries.purge_outbox(OUTBOX_RETENTION_HOURS)
+    with _lock:
+        _stats["purged"] += purged
+
+
+def _run():
+    while True:
+        with _lock:
+            if _stopping:
+                return
+        busy = False
+        try:
+            handed = step()
+            busy = bool(handed) and handed >= OUTBOX_BATCH_SIZE
+            for name, handler in list(_consumers.items()):
+                _run_consumer(name, handler)
+            _purge()
+            wait = OUTBOX_POLL_SECONDS if handed is not None else RETRY_SECONDS
+        except Exception as e:
+            print(f"❌ Outbox relay error: {e}")
+            with _lock:
+                _stats["retries"] += 1
+            wait = RETRY_SECONDS
+        if busy:
+            continue
+        with _lock:
+            if not _stopping:
+                _lock.wait(wait)
+
+
+def start():
+    global _relay, _stopping
+    if not OUTBOX_ENABLED or _relay is not None:
+        return
+    _register_defaults()
+    _stopping = False
+    _relay = threading.Thread(target=_run, name="outbox-relay", daemon=True)
+    _relay.start()
+
+
+def stop(timeout=5.0):
+    global _relay, _stopping
+    if _relay is None:
+        return
+    with _lock:
+        _stopping = True
+        _lock.notify_all()
+    _relay.join(timeout)
+    _relay = None
+
+
+def stats():
+    with _lock:
+        return {
+            "enabled": OUTBOX_ENABLED,
+            "position": _position,
+            **_lag,
+            "pending_gaps": sum(len(g) for g in _gaps.values()),
+            "rechecking": len(_skipped),
+            "checkpoints": dict(_checkpoints),
+            "subscribers": {name: dict(s) for name, s in _handler_stats.items()},
+            **_stats,
+        }
+
+
+# ==================== SUBSCRIBERS ====================
+
+def _invalidate_catalog(events):
+    catalog.invalidate()
+
+
+def _bump_versions(events):
+    for event in events:
+        payload = event["PAYLOAD"]
+        if payload.get("ORDER_ID") is not None:
+            bump_order_version(payload["ORDER_ID"])
+        if payload.get("DRIVER_ID") is not None:
+            bump_driver_version(payload["DRIVER_ID"])
+
+
+def _push_deliveries(events):
+    for event in events:
+        payload = event["PAYLOAD"]
+        if "TO" not in payload:
+            continue  # not a status change (e.g. repriced)
+        tracking.deliver(
+            payload["ORDER_ID"], payload["DELIVERY_ID"], payload["TO"], payload.get("FROM"),
+            event["CREATED_AT"], event["OUTBOX_ID"],
+        )
+
+
+def _revenue_deltas(events):
+    """
+    REVENUE_DAILY rows: DELIVERED orders count on the day they became
+    DELIVERED, and their delivery's platform cut on the day it was DELIVERED.
+    'repriced' events (recalculate_profit.py) correct the day they name.
+    """
+    deltas = defaultdict(lambda: [0, Decimal("0"), Decimal("0"), Decimal("0"), Decimal("0")])
+    for event in events:
+        payload = event["PAYLOAD"]
+        if event["EVENT_TYPE"] == "repriced":
+            row = deltas[(date.fromisoformat(payload["DAY"]), payload.get("RESTAURANT_ID"))]
+            if event["AGGREGATE"] == "ORDER":
+                row[2] += Decimal(str(payload["PLATFORM_COMMISSION_CHANGE"]))
+                row[3] += Decimal(str(payload["SERVICE_FEE_CHANGE"]))
+            else:
+                row[4] += Decimal(str(payload["DELIVERY_PLATFORM_CUT_CHANGE"]))
+            continue
+        key = (event["CREATED_AT"].date(), payload.get("RESTAURANT_ID"))
+        if event["AGGREGATE"] == "ORDER" and event["EVENT_TYPE"] in ("created", "status_changed"):
+            if event["EVENT_TYPE"] == "created":
+                sign = 1 if payload["STATUS"] == "DELIVERED" else 0
+            else:
+                sign = (payload["TO"] == "DELIVERED") - (payload["FROM"] == "DELIVERED")
+            if sign:
+                row = deltas[key]
+                row[0] += sign
+                row[1] += sign * Decimal(str(payload["TOTAL_AMOUNT"]))
+                row[2] += sign * Decimal(str(payload["PLATFORM_COMMISSION"]))
+                row[3] += sign * Decimal(str(payload["SERVICE_FEE"]))
+        elif event["AGGREGATE"] == "DELIVERY" and payload.get("TO") == "DELIVERED" and payload.get("FROM") != "DELIVERED":
+            deltas[key][4] += Decimal(str(payload["DELIVERY_PLATFORM_CUT"]))
+    return [(day, restaurant_id, *row) for (day, restaurant_id), row in deltas.items() if restaurant_id is not None]
+
+
+def _apply_revenue(cursor, events):
+    queries.add_revenue_daily(cursor, _revenue_deltas(events))
+
+
+def _register_defaults():
+    subscribe("catalog", _invalidate_catalog, ("RESTAURANT", "MENU"))
+    subscribe("etags", _bump_versions, ("ORDER", "DELIVERY"))
+    subscribe("delivery_push", _push_deliveries, ("DELIVERY",))
+    consumer("revenue_daily", _apply_revenue)
@@ -0,0 +1,332 @@
+# backend/payments.py
+"""
+Asynchronous payment authorization (PAYMENT_MODE=async)
+POST /api/orders writes the order and its payment as PENDING and returns;
+worker threads then authorize the payment with the configured processor.
+    - success: PAYMENTS -> COMPLETED, ORDERS -> CONFIRMED, and the
+      dispatched delivery is created, all in one transaction
+    - decline, or PAYMENT_MAX_ATTEMPTS transient errors (exponential
+      backoff with jitter between them): PAYMENTS -> FAILED, ORDERS ->
+      CANCELLED, no delivery
+The queue lives in memory. Payments still PENDING after
+SWEEP_AFTER_SECONDS (their worker died or was restarted, or gave up after
+PAYMENT_MAX_ATTEMPTS settling errors) are claimed by whichever worker
+sweeps next. Processors get an idempotency key per
+PAYMENT_ID, so authorizing a payment twice never charges twice, and
+settle_payment() only moves a payment out of PENDING once.
+
+PAYMENT_PROCESSOR="module:Class" selects the processor (a Processor
+subclass); the default SimulatedProcessor stands in for a real one with
+configurable latency, transient errors and declines.
+"""
+
+import asyncio
+import heapq
+import importlib
+import itertools
+import os
+import random
+import threading
+import time
+import uuid
+
+import dispatch
+import eta
+from database.queries import claim_pending_payments, settle_payment
+
+PAYMENT_MODE = os.getenv("PAYMENT_MODE", "sync")  # "async" turns this on
+PAYMENT_PROCESSOR = os.getenv("PAYMENT_PROCESSOR", "payments:SimulatedProcessor")
+PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", "8"))
+PAYMENT_MAX_ATTEMPTS = int(os.getenv("PAYMENT_MAX_ATTEMPTS", "5"))
+PAYMENT_BACKOFF_SECONDS = float(os.getenv("PAYMENT_BACKOFF_SECONDS", "0.5"))
+PAYMENT_SIM_LATENCY_MS = float(os.getenv("PAYMENT_SIM_LATENCY_MS", "300"))
+PAYMENT_SIM_ERROR_RATE = float(os.getenv("PAYMENT_SIM_ERROR_RATE", "0.05"))
+PAYMENT_SIM_DECLINE_RATE = float(os.getenv("PAYMENT_SIM_DECLINE_RATE", "0.02"))
+MAX_BACKOFF_SECONDS = 30.0
+# Retry delay when the database is down while settling
+SETTLE_RETRY_SECONDS = 2.0
+SWEEP_AFTER_SECONDS = 120
+SWEEP_INTERVAL_SECONDS = 60
+# A sweep's claim on the payments it queued; past it another worker may take them
+SWEEP_CLAIM_SECONDS = 300
+
+# Paid orders get the status place_order writes in sync mode; the delivery
+# moves them on to OUT_FOR_DELIVERY / DELIVERED
+PAID_ORDER_STATUS = "CONFIRMED"
+FAILED_ORDER_STATUS = "CANCELLED"
+# Nothing to authorize: settled as soon as a worker picks them up
+OFFLINE_METHODS = ("CASH",)
+
+
+class PaymentDeclined(Exception):
+    """The processor refused the payment; final, never retried"""
+
+
+class ProcessorUnavailable(Exception):
+    """Timeout, 5xx or network error; retried with backoff"""
+
+
+# ==================== PROCESSORS ====================
+
+class Processor:
+    """
+    Card processor interface. authorize() returns the processor's reference
+    or raises PaymentDeclined / ProcessorUnavailable, and must return the
+    same outcome for a repeated idempotency_key without charging again.
+    """
+
+    def authorize(self, amount, method, idempotency_key):
+        raise NotImplementedError
+
+
+class SimulatedProcessor(Processor):
+    """Local stand-in: sleeps latency_ms (±50%), fails or declines at the given rates"""
+
+    def __init__(self, latency_ms=PAYMENT_SIM_LATENCY_MS, error_rate=PAYMENT_SIM_ERROR_RATE,
+                 decline_rate=PAYMENT_SIM_DECLINE_RATE, seed=None):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.decline_rate = decline_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._outcomes = {}  # idempotency_key -> reference or PaymentDeclined
+
+    def authorize(self, amount, method, idempotency_key):
+        with self._lock:
+            outcome = self._outcomes.get(idempotency_key)
+            jitter = self._rng.uniform(0.5, 1.5)
+            roll = self._rng.random()
+        if outcome is None:
+            time.sleep(self.latency * jitter)
+            if roll < self.error_rate:
+                raise ProcessorUnavailable("simulated processor timeout")
+            if roll < self.error_rate + self.decline_rate:
+                outcome = PaymentDeclined("simulated decline")
+            else:
+                outcome = f"sim_{uuid.uuid4().hex[:20]}"
+            with self._lock:
+                outcome = self._outcomes.setdefault(idempotency_key, outcome)
+        if isinstance(outcome, PaymentDeclined):
+            raise outcome
+        return outcome
+
+
+def load_processor(spec=PAYMENT_PROCESSOR):
+    """Instantiate "module:Class" """
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# ==================== PIPELINE ====================
+
+_lock = threading.Condition()
+_due = []  # heap of (monotonic due time, seq, job)
+_seq = itertools.count()
+_tracked = set()  # PAYMENT_IDs queued or being processed by this worker
+_workers = []
+_stopping = False
+_processor = None
+_stats = {"submitted": 0, "authorized": 0, "declined": 0, "failed": 0,
+          "retries": 0, "swept": 0, "already_settled": 0, "abandoned": 0}
+
+
+def enabled():
+    return bool(_workers) and not _stopping
+
+
+def _schedule(job, delay):
+    with _lock:
+        heapq.heappush(_due, (time.monotonic() + delay, next(_seq), job))
+        _lock.notify()
+
+
+def submit(payment_id, order_id, restaurant_id, amount, method):
+    """Queue a PENDING payment for authorization; False if it is already queued here"""
+    with _lock:
+        if payment_id in _tracked:
+            return False
+        _tracked.add(payment_id)
+        _stats["submitted"] += 1
+    _schedule({
+        "PAYMENT_ID": payment_id,
+        "ORDER_ID": order_id,
+        "RESTAURANT_ID": restaurant_id,
+        "AMOUNT": amount,
+        "METHOD": method,
+        "attempt": 0,
+    }, 0)
+    return True
+
+
+def submit_order(payment_id, order_id, order):
+    """submit() for an order row written by create_orders_bulk(pending_payment=...)"""
+    return submit(payment_id, order_id, order["restaurant_id"], order["total_amount"], order["method"])
+
+
+def _next_job():
+    with _lock:
+        while not _stopping:
+            if _due:
+                wait = _due[0][0] - time.monotonic()
+                if wait <= 0:
+                    return heapq.heappop(_due)[2]
+                _lock.wait(wait)
+            else:
+                _lock.wait()
+        return None
+
+
+def _backoff(attempt):
+    delay = min(MAX_BACKOFF_SECONDS, PAYMENT_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _settle(job, reference=None, failure=None):
+    if failure is None:
+        # Paid: the delivery is written with the payment, so nothing can
+        # leave a paid order undispatched
+        driver_id = dispatch.assign(job["RESTAURANT_ID"])
+        settled = settle_payment(job["PAYMENT_ID"], job["ORDER_ID"], "COMPLETED", PAID_ORDER_STATUS, reference,
+                                 delivery=(driver_id, eta.estimate(job["RESTAURANT_ID"])))
+        if not settled:
+            dispatch.release(driver_id)
+    else:
+        settled = settle_payment(job["PAYMENT_ID"], job["ORDER_ID"], "FAILED", FAILED_ORDER_STATUS,
+                                 failure_reason=failure)
+    if settled is None:
+        # Database down: authorizing again is safe (same idempotency key)
+        _retry_or_abandon(job, "database unavailable while settling")
+        return
+
+    with _lock:
+        _tracked.discard(job["PAYMENT_ID"])
+        if not settled:
+            _stats["already_settled"] += 1
+        elif failure is None:
+            _stats["authorized"] += 1
+        elif job["attempt"] >= PAYMENT_MAX_ATTEMPTS:
+            _stats["failed"] += 1
+        else:
+            _stats["declined"] += 1
+
+
+def process(job):
+    """One authorization attempt for a queued job"""
+    if job["METHOD"] in OFFLINE_METHODS:
+        _settle(job)
+        return
+
+    try:
+        reference = _processor.authorize(job["AMOUNT"], job["METHOD"], f"payment-{job['PAYMENT_ID']}")
+    except PaymentDeclined as e:
+        _settle(job, failure=str(e) or "declined")
+        return
+    except Exception as e:
+        job["attempt"] += 1
+        if job["attempt"] >= PAYMENT_MAX_ATTEMPTS:
+            _settle(job, failure=f"gave up after {job['attempt']} attempts: {e}")
+        else:
+            with _lock:
+                _stats["retries"] += 1
+            _schedule(job, _backoff(job["attempt"]))
+        return
+    _settle(job, reference)
+
+
+def _retry_or_abandon(job, error):
+    """
+    Settling failed (database down, unexpected error): retry with backoff,
+    at most PAYMENT_MAX_ATTEMPTS times. Then stop; the payment stays
+    PENDING and a later sweep picks it up (authorizing again is safe).
+    """
+    job["errors"] = job.get("errors", 0) + 1
+    if job["errors"] < PAYMENT_MAX_ATTEMPTS:
+        _schedule(job, min(MAX_BACKOFF_SECONDS, SETTLE_RETRY_SECONDS * 2 ** (job["errors"] - 1)))
+        return
+    with _lock:
+        _tracked.discard(job["PAYMENT_ID"])
+        _stats["abandoned"] += 1
+    print(f"❌ Payment {job['PAYMENT_ID']} left PENDING for the sweep after {job['errors']} errors: {error}")
+
+
+def _worker():
+    while True:
+        job = _next_job()
+        if job is None:
+            return
+        try:
+            process(job)
+        except Exception as e:
+            print(f"❌ Payment {job['PAYMENT_ID']} processing error: {e}")
+            _retry_or_abandon(job, e)
+
+
+def sweep():
+    """
+    Claim and queue PENDING payments nobody has settled for
+    SWEEP_AFTER_SECONDS. Each sweep claims its rows (SWEEP_CLAIM_SECONDS
+    lease), so workers sweeping at the same time never queue the same ones.
+    """
+    rows = claim_pending_payments(f"{os.getpid()}-{uuid.uuid4().hex[:16]}",
+                                  SWEEP_AFTER_SECONDS, SWEEP_CLAIM_SECONDS)
+    if not rows:
+        return 0
+    swept = sum(
+        submit(r["PAYMENT_ID"], r["ORDER_ID"], r["RESTAURANT_ID"], r["AMOUNT"], r["METHOD"])
+        for r in rows
+    )
+    with _lock:
+        _stats["swept"] += swept
+    return swept
+
+
+async def run_sweeper():
+    """sweep() every SWEEP_INTERVAL_SECONDS while async payments are on"""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+        if not enabled():
+            continue
+        try:
+            await asyncio.to_thread(sweep)
+        except Exception as e:
+            print(f"❌ Payment sweep failed: {e}")
+
+
+def start(processor=None, workers=PAYMENT_WORKERS):
+    """Start the authorization workers (processor: a Processor, default PAYMENT_PROCESSOR)"""
+    global _processor, _stopping
+    if PAYMENT_MODE != "async" and processor is None:
+        return
+    if _workers:
+        return
+    _processor = processor or load_processor()
+    _stopping = False
+    _workers[:] = [threading.Thread(target=_worker, daemon=True, name=f"payment-worker-{i}") for i in range(workers)]
+    for thread in _workers:
+        thread.start()
+    print(f"💳 Async payments on ({type(_processor).__name__}, {workers} workers)")
+
+
+def stop(timeout=10):
+    """Stop the workers; payments still queued stay PENDING for the sweep"""
+    global _stopping
+    if not _workers:
+        return
+    with _lock:
+        _stopping = True
+        _lock.notify_all()
+    deadline = time.monotonic() + timeout
+    for thread in _workers:
+        thread.join(max(0, deadline - time.monotonic()))
+    with _lock:
+        left = len(_tracked)
+        _due.clear()
+        _tracked.clear()
+    _workers.clear()
+    if left:
+        print(f"💳 {left} payments left PENDING for another worker's sweep")
+
+
+def stats():
+    with _lock:
+        return {"mode": "async" if enabled() else "sync", "queued": len(_due), "in_progress": len(_tracked), **_stats}
@@ -3,6 +3,7 @@ from database.connection import get_db_connection
 import random
 from datetime import datetime, timedelta
 from decimal import Decimal
+import pricing
 
 def populate_database():
     """Add data matching Krista's updated schema for Tableau dashboard"""
@@ -78,11 +79,9 @@ def populate_database():
     payment_methods = ["credit_card", "debit_card", "cash"]
     statuses = ["DELIVERED", "DELIVERED", "DELIVERED", "CANCELLED"]
 
-    COMMISSION_RATE = Decimal("0.15")
-    SERVICE_FEE = Decimal("2.99")
-    DELIVERY_FEE_TOTAL = Decimal("3.99")
-    DELIVERY_PLATFORM_RATE = Decimal("0.15")
-    DELIVERY_PLATFORM_CUT = (DELIVERY_FEE_TOTAL * DELIVERY_PLATFORM_RATE).quantize(Decimal("0.01"))
+    SERVICE_FEE = pricing.SERVICE_FEE
+    DELIVERY_FEE_TOTAL = pricing.DELIVERY_FEE
+    DELIVERY_PLATFORM_CUT = pricing.DELIVERY_PLATFORM_CUT
 
     orders_created = 0
 
@@ -119,7 +118,7 @@ def populate_database():
             is_delivered = status == "DELIVERED"
 
             if is_delivered:
-                platform_commission = (order_total * COMMISSION_RATE).quantize(Decimal("0.01"))
+                platform_commission = pricing.platform_commission(order_total)
                 service_fee = SERVICE_FEE
                 delivery_fee_total = DELIVERY_FEE_TOTAL
                 delivery_platform_cut = DELIVERY_PLATFORM_CUT
@@ -3,6 +3,7 @@ from database.connection import get_db_connection
 import random
 from datetime import datetime, timedelta
 from decimal import Decimal
+import pricing
 
 def populate_orders_only():
     """Add orders and payments only (skip deliveries to avoid trigger issue)"""
@@ -54,9 +55,9 @@ def populate_orders_only():
                 quantity = random.randint(1, 2)
                 order_total += price * quantity
             
-            platform_commission = (order_total * Decimal('0.10')).quantize(Decimal('0.01'))
-            service_fee = Decimal('2.99')
-            platform_profit_order = (platform_commission + service_fee).quantize(Decimal('0.01'))
+            platform_commission = pricing.platform_commission(order_total)
+            service_fee = pricing.SERVICE_FEE
+            platform_profit_order = pricing.order_platform_profit(order_total)
             
             # Insert order
             cursor.execute("""
@@ -0,0 +1,59 @@
+# backend/pricing.py
+"""
+The one place order money is computed
+Customer side (what checkout shows and ORDERS.TOTAL_AMOUNT stores):
+    total = subtotal + DELIVERY_FEE + SERVICE_FEE + subtotal * TAX_RATE
+Platform side (ORDERS / DELIVERIES profit columns, reports):
+    commission = subtotal * COMMISSION_RATE, plus SERVICE_FEE per order
+    and DELIVERY_PLATFORM_CUT of each DELIVERY_FEE
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+
+# Constants to match frontend checkout
+DELIVERY_FEE = Decimal("3.99")
+SERVICE_FEE = Decimal("2.99")
+TAX_RATE = Decimal("0.08")
+
+# Platform revenue
+COMMISSION_RATE = Decimal("0.15")
+DELIVERY_PLATFORM_CUT = Decimal("0.60")
+
+
+def money(x: Decimal) -> Decimal:
+    """Round to 2 decimals using standard financial rounding."""
+    return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+@dataclass
+class Quote:
+    subtotal: Decimal
+    delivery_fee: Decimal
+    service_fee: Decimal
+    tax: Decimal
+    total: Decimal
+
+
+def quote(lines):
+    """Price a cart from (unit price, quantity) pairs"""
+    subtotal = sum((Decimal(str(price)) * Decimal(quantity) for price, quantity in lines), Decimal("0.00"))
+    subtotal = money(subtotal)
+    tax = money(subtotal * TAX_RATE)
+    return Quote(
+        subtotal=subtotal,
+        delivery_fee=DELIVERY_FEE,
+        service_fee=SERVICE_FEE,
+        tax=tax,
+        total=money(subtotal + DELIVERY_FEE + SERVICE_FEE + tax),
+    )
+
+
+def platform_commission(subtotal) -> Decimal:
+    """Commission the platform keeps from the food subtotal"""
+    return money(Decimal(str(subtotal)) * COMMISSION_RATE)
+
+
+def order_platform_profit(subtotal) -> Decimal:
+    """ORDERS.PLATFORM_PROFIT_ORDER: commission + service fee"""
+    return platform_commission(subtotal) + SERVICE_FEE
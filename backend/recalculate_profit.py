@@ -0,0 +1,131 @@
+# backend/recalculate_profit.py
+"""
+Bulk profit recomputation (RECALCULATE_PROFIT, db/recalculateProfitSP.sql)
+Recomputes PLATFORM_COMMISSION, SERVICE_FEE, PLATFORM_PROFIT_ORDER and
+DELIVERY_PLATFORM_CUT from pricing.py for an ORDER_ID and/or ORDER_DATE
+range. The range is walked in windows of --chunk-size IDs, one procedure
+call (two set-based UPDATE ... JOINs) and one commit per window, so row
+locks are held for a window rather than the whole run and an interrupted
+run resumes with --start-id. Changes to DELIVERED orders reach REVENUE_DAILY
+as 'repriced' outbox events written by the procedure.
+
+    python recalculate_profit.py --since 2025-01-01 --until 2025-02-01
+    python recalculate_profit.py --start-id 1 --end-id 5000000 --chunk-size 20000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import pricing
+from database.connection import get_db_connection
+
+CHUNK_SIZE = 10000
+
+
+def id_range(conn, start_id=None, end_id=None, since=None, until=None):
+    """(first, last) ORDER_ID of the orders to recompute, or (None, None)"""
+    # ORDER_DATE has no index: a date range costs one scan here, after that
+    # every window is a primary key range
+    conditions, params = [], []
+    if start_id is not None:
+        conditions.append("ORDER_ID >= %s")
+        params.append(start_id)
+    if end_id is not None:
+        conditions.append("ORDER_ID <= %s")
+        params.append(end_id)
+    if since is not None:
+        conditions.append("ORDER_DATE >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("ORDER_DATE < %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MIN(ORDER_ID), MAX(ORDER_ID) FROM ORDERS {where}", params)
+    first, last = cursor.fetchone()
+    cursor.close()
+    return first, last
+
+
+def recalculate_window(conn, low, high, since=None, until=None):
+    """RECALCULATE_PROFIT for ORDER_IDs low..high; returns (orders, deliveries) changed"""
+    cursor = conn.cursor()
+    cursor.callproc("RECALCULATE_PROFIT", (
+        low, high, since, until,
+        pricing.COMMISSION_RATE, pricing.SERVICE_FEE, pricing.DELIVERY_PLATFORM_CUT,
+    ))
+    changed = (0, 0)
+    for result in cursor.stored_results():
+        row = result.fetchone()
+        if row:
+            changed = (int(row[0]), int(row[1]))
+    cursor.close()
+    conn.commit()
+    return changed
+
+
+def per_row_window(conn, low, high):
+    """The old way: CALCULATE_ORDER_PROFIT / CALCULATE_DELIVERY_PROFIT per row (benchmarks)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT ORDER_ID FROM ORDERS WHERE ORDER_ID BETWEEN %s AND %s", (low, high))
+    order_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT DELIVERY_ID FROM DELIVERIES WHERE ORDER_ID BETWEEN %s AND %s", (low, high))
+    delivery_ids = [row[0] for row in cursor.fetchall()]
+    for order_id in order_ids:
+        cursor.callproc("CALCULATE_ORDER_PROFIT", (order_id,))
+    for delivery_id in delivery_ids:
+        cursor.callproc("CALCULATE_DELIVERY_PROFIT", (delivery_id,))
+    cursor.close()
+    conn.commit()
+    return len(order_ids), len(delivery_ids)
+
+
+def recalculate(start_id=None, end_id=None, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """Recompute the whole range window by window; returns (orders, deliveries) changed"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Cannot connect to the database")
+
+    orders = deliveries = 0
+    started = time.perf_counter()
+    try:
+        first, last = id_range(conn, start_id, end_id, since, until)
+        if first is None:
+            print("No orders in range")
+            return 0, 0
+
+        for low in range(first, last + 1, chunk_size):
+            high = min(low + chunk_size - 1, last)
+            try:
+                changed = recalculate_window(conn, low, high, since, until)
+            except Exception:
+                conn.rollback()
+                print(f"❌ Failed at ORDER_ID {low}; rerun with --start-id {low}")
+                raise
+            orders += changed[0]
+            deliveries += changed[1]
+            print(f"   ORDER_ID ≤ {high:,}: {orders:,} orders, {deliveries:,} deliveries changed "
+                  f"({time.perf_counter() - started:.1f}s)")
+    finally:
+        conn.close()
+    return orders, deliveries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute order and delivery profit columns from pricing.py")
+    parser.add_argument("--start-id", type=int)
+    parser.add_argument("--end-id", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="first ORDER_DATE (inclusive)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="last ORDER_DATE (exclusive)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="ORDER_IDs per transaction")
+    args = parser.parse_args()
+
+    print(f"💰 Recomputing profit columns (commission {pricing.COMMISSION_RATE}, service fee "
+          f"{pricing.SERVICE_FEE}, delivery cut {pricing.DELIVERY_PLATFORM_CUT})")
+    orders, deliveries = recalculate(args.start_id, args.end_id, args.since, args.until, args.chunk_size)
+    print(f"✅ {orders:,} orders and {deliveries:,} deliveries changed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# backend/reconcile.py
+"""
+Payment / order / delivery reconciliation
+Walks ORDERS in ORDER_ID windows of --chunk-size IDs. Each window is one
+query joining the order with its items, payments and deliveries (each
+aggregated per order over the same ID range, so every join is a primary
+key or foreign key range scan), read through an unbuffered cursor with
+fetchmany(). The window becomes a pandas DataFrame, every check is a
+vectorized comparison on it, and the flagged rows are appended to a CSV.
+Memory stays at one window however many orders there are; --start-after
+resumes a run.
+
+Checks (amounts must agree within TOLERANCE, see pricing.py):
+    missing_payment        no PAYMENTS row
+    missing_delivery       DELIVERED / OUT_FOR_DELIVERY order without a delivery
+    payment_amount         COMPLETED payments != ORDERS.TOTAL_AMOUNT
+    duplicate_payment      more than one COMPLETED payment
+    cancelled_but_paid     CANCELLED order with a COMPLETED payment
+    order_total            TOTAL_AMOUNT != quote of its ORDER_ITEMS
+    platform_commission    PLATFORM_COMMISSION != subtotal * COMMISSION_RATE
+    platform_profit        PLATFORM_PROFIT_ORDER != commission + SERVICE_FEE
+    delivery_fee           DELIVERY_FEE_TOTAL / DELIVERY_PLATFORM_CUT != pricing.py
+
+    python reconcile.py --output reconciliation.csv [--chunk-size 50000] [--start-after 0]
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import pricing
+from database.connection import get_db_connection
+
+CHUNK_SIZE = 50000
+FETCH_SIZE = 5000
+# Largest difference accepted between two amounts (rounding steps in pricing.py)
+TOLERANCE = 0.011
+
+COLUMNS = [
+    "ORDER_ID", "STATUS", "TOTAL_AMOUNT", "PLATFORM_COMMISSION", "SERVICE_FEE",
+    "PLATFORM_PROFIT_ORDER", "SUBTOTAL", "PAYMENTS", "COMPLETED_PAYMENTS",
+    "PAID_AMOUNT", "DELIVERIES", "DELIVERY_FEE_TOTAL", "DELIVERY_PLATFORM_CUT",
+]
+REPORT_COLUMNS = ["ORDER_ID", "ISSUE", "EXPECTED", "ACTUAL", "STATUS"]
+
+WINDOW_QUERY = """
+    SELECT
+        o.ORDER_ID, o.STATUS, o.TOTAL_AMOUNT, o.PLATFORM_COMMISSION, o.SERVICE_FEE,
+        o.PLATFORM_PROFIT_ORDER,
+        i.SUBTOTAL,
+        COALESCE(p.PAYMENTS, 0), COALESCE(p.COMPLETED_PAYMENTS, 0), COALESCE(p.PAID_AMOUNT, 0),
+        COALESCE(d.DELIVERIES, 0), d.DELIVERY_FEE_TOTAL, d.DELIVERY_PLATFORM_CUT
+    FROM ORDERS o
+    LEFT JOIN (
+        SELECT ORDER_ID, SUM(QUANTITY * PRICE) AS SUBTOTAL
+        FROM ORDER_ITEMS
+        WHERE ORDER_ID BETWEEN %s AND %s
+        GROUP BY ORDER_ID
+    ) i ON i.ORDER_ID = o.ORDER_ID
+    LEFT JOIN (
+        SELECT ORDER_ID,
+               COUNT(*) AS PAYMENTS,
+               SUM(STATUS = 'COMPLETED') AS COMPLETED_PAYMENTS,
+               SUM(CASE WHEN STATUS = 'COMPLETED' THEN AMOUNT ELSE 0 END) AS PAID_AMOUNT
+        FROM PAYMENTS
+        WHERE ORDER_ID BETWEEN %s AND %s
+        GROUP BY ORDER_ID
+    ) p ON p.ORDER_ID = o.ORDER_ID
+    LEFT JOIN (
+        SELECT ORDER_ID,
+               COUNT(*) AS DELIVERIES,
+               MAX(DELIVERY_FEE_TOTAL) AS DELIVERY_FEE_TOTAL,
+               MAX(DELIVERY_PLATFORM_CUT) AS DELIVERY_PLATFORM_CUT
+        FROM DELIVERIES
+        WHERE ORDER_ID BETWEEN %s AND %s
+        GROUP BY ORDER_ID
+    ) d ON d.ORDER_ID = o.ORDER_ID
+    WHERE o.ORDER_ID BETWEEN %s AND %s
+    ORDER BY o.ORDER_ID
+"""
+
+
+def _id_bounds(conn, start_after):
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(ORDER_ID), MAX(ORDER_ID) FROM ORDERS WHERE ORDER_ID > %s", (start_after,))
+    low, high = cursor.fetchone()
+    cursor.close()
+    return low, high
+
+
+def read_window(conn, low, high):
+    """Orders low..high (inclusive) with their aggregates, as a DataFrame"""
+    cursor = conn.cursor(buffered=False)
+    cursor.execute(WINDOW_QUERY, (low, high) * 4)
+    frames = []
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        frames.append(pd.DataFrame.from_records(rows, columns=COLUMNS))
+    cursor.close()
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _money(series):
+    return pd.to_numeric(series, errors="coerce").astype("float64")
+
+
+def _issues(df, mask, issue, expected, actual):
+    mask = mask.fillna(False).to_numpy(dtype=bool)
+    if not mask.any():
+        return None
+    return pd.DataFrame({
+        "ORDER_ID": df["ORDER_ID"].to_numpy()[mask],
+        "ISSUE": issue,
+        "EXPECTED": np.broadcast_to(np.asarray(expected, dtype=object), mask.shape)[mask],
+        "ACTUAL": np.broadcast_to(np.asarray(actual, dtype=object), mask.shape)[mask],
+        "STATUS": df["STATUS"].to_numpy()[mask],
+    })
+
+
+def find_discrepancies(df):
+    """Vectorized checks over one window; returns REPORT_COLUMNS rows"""
+    if df.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    total = _money(df["TOTAL_AMOUNT"])
+    subtotal = _money(df["SUBTOTAL"])
+    paid = _money(df["PAID_AMOUNT"])
+    payments = df["PAYMENTS"].astype("int64")
+    completed = pd.to_numeric(df["COMPLETED_PAYMENTS"]).astype("int64")
+    deliveries = df["DELIVERIES"].astype("int64")
+    status = df["STATUS"]
+
+    delivery_fee = float(pricing.DELIVERY_FEE)
+    service_fee = float(pricing.SERVICE_FEE)
+    # Same formula as pricing.quote(), rounded per step like money()
+    tax = (subtotal * float(pricing.TAX_RATE)).round(2)
+    expected_total = (subtotal + delivery_fee + service_fee + tax).round(2)
+    expected_commission = (subtotal * float(pricing.COMMISSION_RATE)).round(2)
+    commission = _money(df["PLATFORM_COMMISSION"])
+    expected_profit = (commission + _money(df["SERVICE_FEE"])).round(2)
+    fee_total = _money(df["DELIVERY_FEE_TOTAL"])
+    platform_cut = _money(df["DELIVERY_PLATFORM_CUT"])
+
+    def differs(a, b):
+        return (a - b).abs() > TOLERANCE
+
+    has_items = subtotal.notna()
+    has_delivery = deliveries > 0
+    found = [
+        _issues(df, payments == 0, "missing_payment", "payment", "none"),
+        _issues(df, status.isin(["DELIVERED", "OUT_FOR_DELIVERY"]) & ~has_delivery,
+                "missing_delivery", "delivery", "none"),
+        _issues(df, (completed > 0) & differs(paid, total), "payment_amount", total, paid),
+        _issues(df, completed > 1, "duplicate_payment", 1, completed),
+        _issues(df, (status == "CANCELLED") & (completed > 0), "cancelled_but_paid", 0, paid),
+        _issues(df, has_items & differs(total, expected_total), "order_total", expected_total, total),
+        _issues(df, has_items & differs(commission, expected_commission),
+                "platform_commission", expected_commission, commission),
+        _issues(df, differs(_money(df["PLATFORM_PROFIT_ORDER"]), expected_profit),
+                "platform_profit", expected_profit, _money(df["PLATFORM_PROFIT_ORDER"])),
+        _issues(df, has_delivery & (differs(fee_total, delivery_fee) | differs(platform_cut, float(pricing.DELIVERY_PLATFORM_CUT))),
+                "delivery_fee",
+                f"{delivery_fee:.2f} / {float(pricing.DELIVERY_PLATFORM_CUT):.2f}",
+                fee_total.map("{:.2f}".format) + " / " + platform_cut.map("{:.2f}".format)),
+    ]
+    found = [f for f in found if f is not None]
+    if not found:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(found, ignore_index=True).sort_values(["ORDER_ID", "ISSUE"], kind="stable", ignore_index=True)
+
+
+def reconcile(output, chunk_size=CHUNK_SIZE, start_after=0):
+    """Write every discrepancy to `output` (CSV); returns {issue: count}"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Cannot connect to the database")
+
+    counts = {}
+    orders = 0
+    started = time.perf_counter()
+    try:
+        low, high = _id_bounds(conn, start_after)
+        if low is None:
+            print("Nothing to reconcile")
+            return counts
+
+        pd.DataFrame(columns=REPORT_COLUMNS).to_csv(output, index=False)
+        for window_low in range(low, high + 1, chunk_size):
+            window_high = min(window_low + chunk_size - 1, high)
+            df = read_window(conn, window_low, window_high)
+            issues = find_discrepancies(df)
+            if not issues.empty:
+                issues.to_csv(output, mode="a", header=False, index=False)
+                for issue, n in issues["ISSUE"].value_counts().items():
+                    counts[issue] = counts.get(issue, 0) + int(n)
+            orders += len(df)
+            rate = orders / (time.perf_counter() - started)
+            print(f"   ORDER_ID ≤ {window_high:,}: {orders:,} orders, "
+                  f"{sum(counts.values()):,} issues ({rate:,.0f} orders/s)")
+    finally:
+        conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile ORDERS, PAYMENTS and DELIVERIES")
+    parser.add_argument("--output", default=f"reconciliation-{datetime.now():%Y%m%d-%H%M%S}.csv")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="ORDER_IDs per window")
+    parser.add_argument("--start-after", type=int, default=0, help="resume after this ORDER_ID")
+    args = parser.parse_args()
+
+    print(f"🔍 Reconciling orders after ORDER_ID {args.start_after} into {os.path.abspath(args.output)}")
+    counts = reconcile(args.output, args.chunk_size, args.start_after)
+    print("=" * 70)
+    if not counts:
+        print("✅ No discrepancies")
+    for issue, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+        print(f"   {issue:22}{n:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# backend/routes/batch.py
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from database.connection import shared_connection
+
+router = APIRouter(prefix="/api/batch", tags=["Batch"])
+
+MAX_BATCH_SIZE = 20
+# A sub-request still running after this long answers 504 (the others are kept)
+SUBREQUEST_TIMEOUT_SECONDS = 10
+# Endpoints that never finish (SSE / WebSocket) cannot be batched
+STREAMING_PATHS = (re.compile(r"^/api/deliveries/order/[^/]+/(events|ws)/?$"),)
+STREAMING_CONTENT_TYPES = ("text/event-stream",)
+
+# Request headers forwarded from the batch call to every sub-request
+FORWARDED_HEADERS = (b"authorization", b"cookie", b"accept-language")
+# Sub-request bodies are embedded as JSON in the batch response (which is
+# compressed as a whole), so they must come back uncompressed
+DROPPED_SUBREQUEST_HEADERS = (b"accept-encoding",)
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    path: str  # e.g. "/api/restaurants/3/menu" (query string allowed)
+    headers: Dict[str, str] = {}  # e.g. {"If-None-Match": "\"...\""}
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+
+class _StreamingResponse(Exception):
+    """Raised from send() when a sub-request starts a stream"""
+
+
+async def _run_subrequest(app, parent_scope, sub):
+    """Call one GET route in-process through the full ASGI app"""
+    parts = urlsplit(sub.path)
+    headers = [(k, v) for k, v in parent_scope.get("headers", []) if k in FORWARDED_HEADERS]
+    for k, v in sub.headers.items():
+        name = k.lower().encode("latin-1")
+        if name not in DROPPED_SUBREQUEST_HEADERS:
+            headers.append((name, v.encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server"),
+        "client": parent_scope.get("client"),
+        "root_path": parent_scope.get("root_path", ""),
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "headers": headers,
+    }
+
+    response = {"status": 500, "headers": {}, "body": b""}
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a client that stays connected until the response is complete
+        # (returning at once would spin any route that listens for disconnect)
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                k.decode("latin-1"): v.decode("latin-1") for k, v in message.get("headers", [])
+            }
+            if response["headers"].get("content-type", "").startswith(STREAMING_CONTENT_TYPES):
+                # Stop here rather than wait for a stream that never ends
+                raise _StreamingResponse()
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    except _StreamingResponse:
+        return {"id": sub.id, "path": sub.path, "status": 400,
+                "body": {"detail": "Streaming endpoints cannot be batched"}}
+    except Exception as e:
+        return {"id": sub.id, "path": sub.path, "status": 500, "body": {"detail": str(e)}}
+
+    body = response["body"]
+    status = response["status"]
+    if status == 405:
+        # Sub-requests are always GET, so this path only takes writes
+        return {"id": sub.id, "path": sub.path, "status": 405,
+                "body": {"detail": "Only GET routes can be batched"}}
+    content_type = response["headers"].get("content-type", "")
+    if body and content_type.startswith("application/json"):
+        try:
+            body = json.loads(body)
+        except ValueError as e:
+            # One unreadable sub-response fails only its own entry
+            status, body = 502, {"detail": f"Invalid JSON from sub-request: {e}"}
+    elif body:
+        body = body.decode("utf-8", errors="replace")
+    else:
+        body = None
+
+    result = {"id": sub.id, "path": sub.path, "status": status, "body": body}
+    if "etag" in response["headers"]:
+        result["etag"] = response["headers"]["etag"]
+    return result
+
+
+async def _run_with_timeout(app, parent_scope, sub):
+    try:
+        return await asyncio.wait_for(_run_subrequest(app, parent_scope, sub), SUBREQUEST_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return {"id": sub.id, "path": sub.path, "status": 504,
+                "body": {"detail": f"Sub-request took longer than {SUBREQUEST_TIMEOUT_SECONDS}s"}}
+
+
+@router.post("")
+@router.post("/")
+async def run_batch(batch: BatchRequest, request: Request):
+    """
+    Run several GET requests in one round trip
+    Sub-requests run concurrently and share one pooled DB connection (they take
+    turns on it). Each result has the sub-request's own status code and body;
+    one still running after SUBREQUEST_TIMEOUT_SECONDS answers 504.
+    """
+    if not batch.requests:
+        return {"success": True, "count": 0, "responses": []}
+
+    if len(batch.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(batch.requests)} requests (max {MAX_BATCH_SIZE})"
+        )
+
+    for sub in batch.requests:
+        if not sub.path.startswith("/api/") or sub.path.startswith("/api/batch"):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid sub-request path: {sub.path}"
+            )
+        if any(p.match(urlsplit(sub.path).path) for p in STREAMING_PATHS):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Streaming endpoints cannot be batched: {sub.path}"
+            )
+
+    with shared_connection():
+        results = await asyncio.gather(
+            *(_run_with_timeout(request.app, request.scope, sub) for sub in batch.requests)
+        )
+
+    return {
+        "success": True,
+        "count": len(results),
+        "responses": results
+    }
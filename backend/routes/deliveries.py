@@ -1,12 +1,51 @@
 # backend/routes/deliveries.py
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from database.queries import get_delivery_by_order_id, get_delivery_by_id, update_delivery_status
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+import asyncio
+import json
+from typing import List, Optional
+from database.queries import (
+    get_delivery_by_order_id, get_delivery_by_id, apply_delivery_transitions,
+    get_driver_location, get_delivery_trail, get_driver_active_deliveries,
+    get_driver_queue_version
+)
+from conditional import (
+    cached_driver_etag,
+    etag_matches,
+    json_with_etag,
+    not_modified,
+    remember_driver_etag,
+)
+from schemas import DeliveryStatus
+import dispatch
+import events
+import locations
+import tracking
 
 router = APIRouter(prefix="/api/deliveries", tags=["Deliveries"])
 
+# Comment line sent on idle SSE streams so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+
 class DeliveryStatusUpdate(BaseModel):
-    status: str  # ASSIGNED, PICKED_UP, IN_TRANSIT, DELIVERED
+    status: str  # ASSIGNED, PICKED_UP, IN_TRANSIT, DELIVERED, FAILED
+
+class DeliveryStatusChange(BaseModel):
+    DELIVERY_ID: int
+    status: str
+
+class DeliveryStatusBatch(BaseModel):
+    updates: List[DeliveryStatusChange]
+
+class DriverLocationPing(BaseModel):
+    LATITUDE: float = Field(..., ge=-90, le=90)
+    LONGITUDE: float = Field(..., ge=-180, le=180)
+
+VALID_STATUSES = [s.value for s in DeliveryStatus]
+MAX_STATUS_BATCH = 500
+MAX_QUEUE_PAGE = 100
 
 @router.get("/order/{order_id}")
 def get_delivery_for_order(order_id: int):
@@ -36,6 +75,132 @@ def get_delivery_for_order(order_id: int):
             detail=f"Failed to get delivery: {str(e)}"
         )
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/driver/{driver_id}")
+def get_driver_queue(
+    driver_id: int,
+    request: Request,
+    after: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=MAX_QUEUE_PAGE)
+):
+    """
+    A driver's active deliveries (ASSIGNED / PICKED_UP / IN_TRANSIT), oldest
+    first, with order, restaurant address and customer (supports If-None-Match)
+    Pass ?after=<next_after> from the previous page to continue.
+    """
+    # Read before the page, so a change in between makes the remembered ETag stale
+    version = get_driver_queue_version(driver_id)
+    if version is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+
+    # Same queue as when this worker last served the page (any worker's
+    # writes change the version): 304 without reading the page
+    page = (after, limit)
+    known = cached_driver_etag(driver_id, page)
+    if known and known[1] == version and etag_matches(request, known[0]):
+        return not_modified(known[0], "order")
+
+    rows = get_driver_active_deliveries(driver_id, after, limit + 1)
+    if rows is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response, etag = json_with_etag(request, {
+        "success": True,
+        "DRIVER_ID": driver_id,
+        "deliveries": rows,
+        "next_after": rows[-1]["DELIVERY_ID"] if has_more else None
+    }, "order")
+    remember_driver_etag(driver_id, etag, version, page)
+    return response
+
+@router.get("/order/{order_id}/events")
+async def stream_delivery_events(order_id: int):
+    """
+    Server-Sent Events for one order's delivery: a "snapshot" event with the
+    current delivery, then a "status" event for every status change until
+    it is DELIVERED, including a FAILED delivery's reassignment (replaces
+    polling /order/{order_id})
+    """
+    # Subscribe first so a change committed during the snapshot read isn't missed
+    queue = tracking.subscribe(order_id)
+    delivery = await asyncio.to_thread(get_delivery_by_order_id, order_id)
+    if not delivery:
+        tracking.unsubscribe(order_id, queue)
+        raise HTTPException(
+            status_code=404,
+            detail=f"No delivery found for order {order_id}"
+        )
+    tracking.seed(order_id, delivery)
+
+    async def events():
+        try:
+            yield _sse("snapshot", jsonable_encoder(delivery))
+            status = delivery["DELIVERY_STATUS"]
+            while status not in tracking.FINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse("status", event)
+                status = event["DELIVERY_STATUS"]
+        finally:
+            tracking.unsubscribe(order_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/order/{order_id}/ws")
+async def delivery_socket(websocket: WebSocket, order_id: int):
+    """
+    WebSocket version of /order/{order_id}/events: sends
+    {"type": "snapshot", "delivery": {...}} then {"type": "status", ...}
+    messages, and closes once the delivery is DELIVERED
+    """
+    queue = tracking.subscribe(order_id)
+    receiver = None
+    try:
+        delivery = await asyncio.to_thread(get_delivery_by_order_id, order_id)
+        if not delivery:
+            await websocket.close(code=4404)
+            return
+        tracking.seed(order_id, delivery)
+
+        await websocket.accept()
+        await websocket.send_json({"type": "snapshot", "delivery": jsonable_encoder(delivery)})
+        status = delivery["DELIVERY_STATUS"]
+
+        # Clients don't send anything; listening is how we notice them leave
+        receiver = asyncio.ensure_future(websocket.receive())
+        while status not in tracking.FINAL_STATUSES:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                event = getter.result()
+                await websocket.send_json({"type": "status", **event})
+                status = event["DELIVERY_STATUS"]
+            else:
+                getter.cancel()
+            if receiver in done:
+                if receiver.result()["type"] == "websocket.disconnect":
+                    return
+                receiver = asyncio.ensure_future(websocket.receive())
+
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        tracking.unsubscribe(order_id, queue)
+
 @router.get("/{delivery_id}")
 def get_delivery(delivery_id: int):
     """
@@ -63,33 +228,191 @@ def get_delivery(delivery_id: int):
             detail=f"Failed to get delivery: {str(e)}"
         )
 
+@router.post("/drivers/{driver_id}/location", status_code=202)
+def report_driver_location(driver_id: int, ping: DriverLocationPing):
+    """
+    GPS ping from the driver app
+    Kept in memory and written to the database in batches by locations.py
+    """
+    if not locations.ping(driver_id, ping.LATITUDE, ping.LONGITUDE):
+        raise HTTPException(status_code=404, detail=f"Driver {driver_id} not found")
+    return {"success": True}
+
+@router.get("/{delivery_id}/driver-location")
+def get_driver_location_for_delivery(delivery_id: int):
+    """
+    Where is my driver: latest known position of the delivery's driver
+    """
+    try:
+        driver_id = locations.driver_for_delivery(delivery_id)
+        if driver_id is None:
+            delivery = get_delivery_by_id(delivery_id)
+            if not delivery:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Delivery {delivery_id} not found"
+                )
+            driver_id = delivery["DRIVER_ID"]
+
+        point = locations.latest(driver_id)
+        if point is not None:
+            location = {"LATITUDE": point.lat, "LONGITUDE": point.lng, "RECORDED_AT": point.recorded_at}
+        else:
+            # Pings for this driver went to another worker (or stopped)
+            location = get_driver_location(driver_id)
+            if not location:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No location reported for driver {driver_id}"
+                )
+
+        return {
+            "success": True,
+            "DELIVERY_ID": delivery_id,
+            "DRIVER_ID": driver_id,
+            "LATITUDE": float(location["LATITUDE"]),
+            "LONGITUDE": float(location["LONGITUDE"]),
+            "RECORDED_AT": location["RECORDED_AT"]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get driver location: {str(e)}"
+        )
+
+@router.get("/{delivery_id}/timeline")
+def get_delivery_timeline(delivery_id: int):
+    """
+    Every status change of a delivery, oldest first (DELIVERY_EVENTS)
+    """
+    history = events.timeline(delivery_id)
+    if history is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    if not history:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No events for delivery {delivery_id}"
+        )
+    return {
+        "success": True,
+        "DELIVERY_ID": delivery_id,
+        "events": history
+    }
+
+@router.get("/{delivery_id}/trail")
+def get_trail(delivery_id: int):
+    """
+    Downsampled route the driver took during a delivery (flushed points only)
+    """
+    trail = get_delivery_trail(delivery_id)
+    if trail is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    return {
+        "success": True,
+        "DELIVERY_ID": delivery_id,
+        "trail": trail
+    }
+
+def _after_transition(outcome):
+    """
+    Free the driver of a finished delivery; a FAILED delivery goes to the
+    next best driver (returns the new DRIVER_ID, or None)
+    """
+    if outcome["TO"] == "DELIVERED":
+        dispatch.release(outcome["DRIVER_ID"])
+    elif outcome["TO"] == "FAILED":
+        delivery = get_delivery_by_id(outcome["DELIVERY_ID"])
+        if delivery:
+            return dispatch.reassign({**delivery, "DRIVER_ID": outcome["DRIVER_ID"]})
+    return None
+
+@router.patch("/status")
+def update_deliveries(batch: DeliveryStatusBatch):
+    """
+    Apply many status changes in one transaction (fleet apps flushing
+    queued updates). Changes for the same delivery apply in order; each
+    one is checked against the ASSIGNED -> PICKED_UP -> IN_TRANSIT ->
+    DELIVERED / FAILED state machine. Returns one result per change.
+    """
+    if len(batch.updates) > MAX_STATUS_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {MAX_STATUS_BATCH} updates"
+        )
+
+    results = [None] * len(batch.updates)
+    valid = []
+    for index, update in enumerate(batch.updates):
+        if update.status in VALID_STATUSES:
+            valid.append(index)
+        else:
+            results[index] = {
+                "DELIVERY_ID": update.DELIVERY_ID,
+                "TO": update.status,
+                "result": "rejected",
+                "error": f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}",
+            }
+
+    outcomes = apply_delivery_transitions(
+        [(batch.updates[i].DELIVERY_ID, batch.updates[i].status) for i in valid]
+    )
+    if outcomes is None:
+        raise HTTPException(status_code=500, detail="Failed to update deliveries")
+
+    for index, outcome in zip(valid, outcomes):
+        if outcome["result"] == "applied":
+            reassigned_to = _after_transition(outcome)
+            if reassigned_to:
+                outcome["reassigned_to"] = reassigned_to
+        results[index] = outcome
+
+    applied = sum(1 for r in results if r["result"] == "applied")
+    return {
+        "success": applied == len(results),
+        "applied": applied,
+        "rejected": len(results) - applied,
+        "results": results,
+    }
+
 @router.patch("/{delivery_id}/status")
 def update_delivery(delivery_id: int, data: DeliveryStatusUpdate):
     """
     Update delivery status
-    Used by drivers to update progress
+    Used by drivers to update progress (ASSIGNED -> PICKED_UP -> IN_TRANSIT
+    -> DELIVERED, or FAILED before delivery)
     """
     try:
         # Validate status
-        valid_statuses = ["ASSIGNED", "PICKED_UP", "IN_TRANSIT", "DELIVERED"]
-        if data.status not in valid_statuses:
+        if data.status not in VALID_STATUSES:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
+                detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}"
             )
         
-        success = update_delivery_status(delivery_id, data.status)
-        
-        if not success:
+        outcomes = apply_delivery_transitions([(delivery_id, data.status)])
+        if outcomes is None:
+            raise Exception("database unavailable")
+
+        outcome = outcomes[0]
+        if outcome["result"] == "not_found":
             raise HTTPException(
                 status_code=404,
                 detail=f"Delivery {delivery_id} not found"
             )
+        if outcome["result"] == "rejected":
+            raise HTTPException(status_code=409, detail=outcome["error"])
         
-        return {
+        result = {
             "success": True,
             "message": f"Delivery status updated to {data.status}"
         }
+        reassigned_to = _after_transition(outcome)
+        if data.status == "FAILED":
+            result["reassigned_to"] = reassigned_to
+        return result
     
     except HTTPException:
         raise
@@ -97,4 +420,4 @@ def update_delivery(delivery_id: int, data: DeliveryStatusUpdate):
         raise HTTPException(
             status_code=500,
             detail=f"Failed to update delivery: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -1,9 +1,10 @@
 # backend/routes/orders.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List
-from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
 
 from database.queries import (
     create_order,
@@ -11,18 +12,34 @@ from database.queries import (
     create_payment,
     create_delivery,
     get_order_details,
+    get_order_version,
     get_menu_item_by_id,
+    get_menu_items_by_ids,
+    create_orders_bulk,
     get_orders_for_user,
+    get_user_order_rows,
+    parse_fields,
+    ORDER_COLUMNS,
+    ORDER_SUBRESOURCES,
 )
-
-# Constants to match frontend checkout
-DELIVERY_FEE = Decimal("3.99")
-SERVICE_FEE = Decimal("2.99")
-TAX_RATE = Decimal("0.08")
-
-def money(x: Decimal) -> Decimal:
-    """Round to 2 decimals using standard financial rounding."""
-    return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+from database import catalog
+from database.connection import primary
+from database.repository import get_user_order_summaries
+from database.records import RecordJSONResponse
+from conditional import (
+    cached_order_etag,
+    etag_matches,
+    json_with_etag,
+    not_modified,
+    remember_order_etag,
+    render_json,
+)
+import dispatch
+import eta
+import idempotency
+import intake
+import payments
+import pricing
 
 router = APIRouter(prefix="/api/orders", tags=["Orders"])
 
@@ -38,19 +55,31 @@ class OrderCreate(BaseModel):
     delivery_address: str
     items: List[OrderItemRequest]
 
-@router.post("/")
-def place_order(order_data: OrderCreate):
-    """Create a new order with items, payment, and delivery.
-    Stores GRAND TOTAL in ORDERS.TOTAL_AMOUNT:
-      grand_total = subtotal + DELIVERY_FEE + SERVICE_FEE + (subtotal * TAX_RATE)
+class QuoteRequest(BaseModel):
+    RESTAURANT_ID: int
+    items: List[OrderItemRequest]
+
+class BulkOrderCreate(BaseModel):
+    orders: List[OrderCreate]
+
+MAX_BULK_ORDERS = 500
+BULK_CHUNK_SIZE = 100
+
+def _price_order(order_data: OrderCreate, lookup_menu_item):
     """
+    Validate an order's items and price it to match the frontend checkout.
+    lookup_menu_item(menu_item_id) returns the MENU row or None.
+    Returns (subtotal, grand_total, items_to_process).
+    """
+    quote, items_to_process = _quote_items(order_data, lookup_menu_item)
+    return quote.subtotal, quote.total, items_to_process
 
-    # 1) Calculate subtotal and validate items
-    subtotal = Decimal("0.00")
+def _quote_items(order_data, lookup_menu_item):
+    """Validate items against MENU rows and price them (pricing.quote)"""
     items_to_process = []
 
     for item in order_data.items:
-        menu_item = get_menu_item_by_id(item.MENU_ITEM_ID)
+        menu_item = lookup_menu_item(item.MENU_ITEM_ID)
 
         if not menu_item or menu_item["RESTAURANT_ID"] != order_data.RESTAURANT_ID:
             raise HTTPException(
@@ -58,31 +87,145 @@ def place_order(order_data: OrderCreate):
                 detail=f"Menu item {item.MENU_ITEM_ID} invalid or doesn't belong to this restaurant"
             )
 
-        # Ensure Decimal safety even if DB adapter returns Decimal/float/str
-        price = Decimal(str(menu_item["PRICE"]))
-        item_total = price * Decimal(item.QUANTITY)
-        subtotal += item_total
-
         items_to_process.append({
             "menu_item_id": item.MENU_ITEM_ID,
+            "item_name": menu_item.get("ITEM_NAME"),
             "quantity": item.QUANTITY,
-            "price": price,  # keep Decimal for DB insert if supported
+            # Ensure Decimal safety even if DB adapter returns Decimal/float/str
+            "price": Decimal(str(menu_item["PRICE"])),
         })
 
-    # 2) Compute grand total to match frontend
-    subtotal = money(subtotal)
-    tax = money(subtotal * TAX_RATE)
-    grand_total = money(subtotal + DELIVERY_FEE + SERVICE_FEE + tax)
+    quote = pricing.quote((item["price"], item["quantity"]) for item in items_to_process)
+    return quote, items_to_process
+
+def _order_row(order_data: OrderCreate, subtotal, grand_total, items, estimated_time, async_payment=False):
+    """A priced order in the shape create_orders_bulk / intake.submit take
+    (async_payment: no driver yet, payments.py dispatches it once paid)"""
+    return {
+        "user_id": order_data.user_id,
+        "restaurant_id": order_data.RESTAURANT_ID,
+        "subtotal": float(subtotal),
+        "total_amount": float(grand_total),
+        "items": items,
+        "method": order_data.PAYMENT_METHOD,
+        "driver_id": None if async_payment else dispatch.assign(order_data.RESTAURANT_ID),
+        "estimated_time": estimated_time,
+    }
+
+@router.post("/")
+def place_order(order_data: OrderCreate, idempotency_key: Optional[str] = Header(None)):
+    """Create a new order (see _place_order).
+    With an Idempotency-Key header, retries of the same request return the
+    original response (marked Idempotent-Replayed) instead of a second order.
+    """
+    if not idempotency_key:
+        if intake.enabled():
+            return _enqueue_order(order_data)
+        return _place_order(order_data)
+
+    fingerprint = idempotency.fingerprint(order_data.model_dump())
+    try:
+        stored = idempotency.begin(idempotency_key, fingerprint, _order_response)
+    except idempotency.IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    if stored is not None:
+        return Response(
+            content=stored,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    try:
+        order = _place_order(order_data, idempotency_key)
+    except BaseException:
+        idempotency.abandon(idempotency_key, fingerprint, _order_response)
+        raise
+
+    if order is None:
+        # Committed, but the read-back failed: never store a null response.
+        # The key already has the ORDER_ID, so this (or a later retry) replays it
+        stored = idempotency.abandon(idempotency_key, fingerprint, _order_response)
+        if stored is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Order was placed but could not be loaded; retry with the same Idempotency-Key",
+                headers={"Retry-After": str(idempotency.IDEMPOTENCY_LEASE_SECONDS)}
+            )
+        return Response(content=stored, media_type="application/json")
+
+    body = render_json(order)
+    idempotency.complete(idempotency_key, fingerprint, order["ORDER_ID"], body.decode("utf-8"))
+    return Response(content=body, media_type="application/json")
+
+def _order_response(order_id):
+    """place_order's response body for an existing order (idempotent replays), or None"""
+    with primary():
+        order = get_order_details(order_id)
+    return render_json(order).decode("utf-8") if order else None
+
+def _enqueue_order(order_data: OrderCreate):
+    """
+    Queued intake (ORDER_INTAKE_MODE=queued): price from the catalog cache,
+    journal the order and answer 202 with a provisional ID to poll
+    """
+    menu = {row["MENU_ITEM_ID"]: row for row in catalog.get_menu(order_data.RESTAURANT_ID)}
+    subtotal, grand_total, items = _price_order(order_data, menu.get)
+    order = _order_row(order_data, subtotal, grand_total, items, eta.estimate(order_data.RESTAURANT_ID),
+                       payments.enabled())
+
+    try:
+        provisional_id = intake.submit(order, idempotency.fingerprint(order_data.model_dump()))
+    except intake.IntakeFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Order queue is full, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "status": "QUEUED",
+        "provisional_id": provisional_id,
+        "status_url": f"/api/orders/intake/{provisional_id}",
+        "TOTAL_AMOUNT": order["total_amount"],
+    })
+
+@router.get("/intake/{provisional_id}")
+def get_intake_status(provisional_id: str):
+    """Poll a queued order: QUEUED, CREATED (with ORDER_ID) or FAILED"""
+    status = intake.lookup(provisional_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown provisional order ID")
+
+    result = {"provisional_id": provisional_id, **status}
+    if status["ORDER_ID"] is not None:
+        result["order_url"] = f"/api/orders/{status['ORDER_ID']}"
+    return result
+
+def _place_order(order_data: OrderCreate, idempotency_key: Optional[str] = None):
+    """Create a new order with items, payment, and delivery.
+    Stores GRAND TOTAL in ORDERS.TOTAL_AMOUNT:
+      grand_total = subtotal + DELIVERY_FEE + SERVICE_FEE + (subtotal * TAX_RATE)  (pricing.py)
+    idempotency_key (already claimed) gets the ORDER_ID with the order row.
+    """
+
+    # 1-2) Validate items and compute the grand total
+    subtotal, grand_total, items_to_process = _price_order(order_data, get_menu_item_by_id)
 
     try:
         grand_total_float = float(grand_total)
+        # PAYMENT_MODE=async: the order stays PENDING until payments.py authorizes it
+        async_payment = payments.enabled()
 
         # 3) Create main order with GRAND TOTAL
         order_id = create_order(
             user_id=order_data.user_id,
             restaurant_id=order_data.RESTAURANT_ID,
             subtotal=float(subtotal),
-            total_amount=grand_total_float  # <-- store grand total in ORDERS.TOTAL_AMOUNT
+            total_amount=grand_total_float,  # <-- store grand total in ORDERS.TOTAL_AMOUNT
+            status="PENDING" if async_payment else "CONFIRMED",
+            idempotency_key=idempotency_key
         )
 
         if not order_id:
@@ -98,23 +241,37 @@ def place_order(order_data: OrderCreate):
             )
 
         # 5) Create payment for GRAND TOTAL
-        create_payment(
+        payment_id = create_payment(
             order_id=order_id,
             amount=grand_total_float,  # <-- charge grand total
-            method=order_data.PAYMENT_METHOD
+            method=order_data.PAYMENT_METHOD,
+            status="PENDING" if async_payment else "COMPLETED"
         )
 
-        # 6) Create delivery (assign to driver ID 1 for now)
-        estimated_time = datetime.now() + timedelta(minutes=30)
-        create_delivery(
+        if async_payment:
+            # Authorized in the background; the delivery is created once it is paid
+            if payment_id:
+                payments.submit(payment_id, order_id, order_data.RESTAURANT_ID,
+                                grand_total_float, order_data.PAYMENT_METHOD)
+            with primary():
+                return get_order_details(order_id)
+
+        # 6) Create delivery with the best available driver (dispatch.py)
+        estimated_time = eta.estimate(order_data.RESTAURANT_ID)
+        driver_id = dispatch.assign(order_data.RESTAURANT_ID)
+        delivery_id = create_delivery(
             order_id=order_id,
-            driver_id=1,
+            driver_id=driver_id,
             delivery_address=order_data.delivery_address,
-            estimated_time=estimated_time
+            estimated_time=estimated_time,
+            restaurant_id=order_data.RESTAURANT_ID
         )
+        if not delivery_id:
+            dispatch.release(driver_id)
 
-        # 7) Return order details
-        return get_order_details(order_id)
+        # 7) Return order details (just written: never from a replica)
+        with primary():
+            return get_order_details(order_id)
 
     except Exception as e:
         raise HTTPException(
@@ -122,10 +279,122 @@ def place_order(order_data: OrderCreate):
             detail=f"Order processing failed: {str(e)}"
         )
 
+@router.post("/quote")
+def quote_order(cart: QuoteRequest):
+    """
+    Price a cart exactly as placing it would, from the catalog cache
+    (no database round trip once the catalog is warm)
+    """
+    menu = {row["MENU_ITEM_ID"]: row for row in catalog.get_menu(cart.RESTAURANT_ID)}
+    quote, items = _quote_items(cart, menu.get)
+    return {
+        "success": True,
+        "RESTAURANT_ID": cart.RESTAURANT_ID,
+        "items": [
+            {
+                "MENU_ITEM_ID": item["menu_item_id"],
+                "ITEM_NAME": item["item_name"],
+                "QUANTITY": item["quantity"],
+                "PRICE": item["price"],
+                "LINE_TOTAL": pricing.money(item["price"] * item["quantity"]),
+            }
+            for item in items
+        ],
+        "SUBTOTAL": quote.subtotal,
+        "DELIVERY_FEE": quote.delivery_fee,
+        "SERVICE_FEE": quote.service_fee,
+        "TAX": quote.tax,
+        "TOTAL": quote.total,
+    }
+
+@router.post("/bulk")
+def place_orders_bulk(bulk: BulkOrderCreate):
+    """
+    Create many orders in one request (partner integrations, kiosks).
+    All menu items in the batch are validated with one query and the orders
+    are written in chunked transactions. Returns one result per order, in
+    request order; a rejected order does not stop the others.
+    """
+    if len(bulk.orders) > MAX_BULK_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A bulk request can contain at most {MAX_BULK_ORDERS} orders"
+        )
+
+    menu_items = get_menu_items_by_ids(
+        item.MENU_ITEM_ID for order in bulk.orders for item in order.items
+    )
+    if menu_items is None:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+
+    # PAYMENT_MODE=async: PENDING orders, authorized by payments.py like place_order's
+    async_payment = payments.enabled()
+    results = [None] * len(bulk.orders)
+    to_create = []
+    placed_at = datetime.now()
+    for index, order_data in enumerate(bulk.orders):
+        try:
+            subtotal, grand_total, items = _price_order(order_data, menu_items.get)
+        except HTTPException as e:
+            results[index] = {"index": index, "success": False, "error": e.detail}
+            continue
+        estimated_time = eta.estimate(order_data.RESTAURANT_ID, placed_at)
+        to_create.append((index, _order_row(order_data, subtotal, grand_total, items, estimated_time, async_payment)))
+
+    created = create_orders_bulk([order for _, order in to_create], BULK_CHUNK_SIZE,
+                                 pending_payment=payments.submit_order if async_payment else None)
+    for (index, order), (order_id, error) in zip(to_create, created):
+        if error:
+            dispatch.release(order["driver_id"])
+            results[index] = {"index": index, "success": False, "error": f"Order processing failed: {error}"}
+        else:
+            results[index] = {
+                "index": index,
+                "success": True,
+                "ORDER_ID": order_id,
+                "TOTAL_AMOUNT": order["total_amount"],
+            }
+
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "success": succeeded == len(results),
+        "created": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+def _order_fields(fields: Optional[str]):
+    """Parse ?fields=... for order endpoints (400 on unknown names)"""
+    try:
+        return parse_fields(fields, ORDER_COLUMNS, ORDER_SUBRESOURCES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _user_orders(user_id: int, fields):
+    if fields is not None and not any(f in fields for f in ORDER_SUBRESOURCES):
+        # Flat list view: one projected query instead of one lookup per order
+        return get_user_order_rows(user_id, fields)
+    order_ids = get_orders_for_user(user_id)
+    return [get_order_details(oid, fields) for oid in order_ids]
+
 @router.get("/{order_id}")
-def get_single_order(order_id: int):
-    """Get order details by ID"""
-    order_details = get_order_details(order_id)
+def get_single_order(order_id: int, request: Request, fields: Optional[str] = None):
+    """
+    Get order details by ID (supports If-None-Match)
+    ?fields=ORDER_ID,STATUS,TOTAL_AMOUNT,items limits the columns and nested parts returned
+    """
+    selected = _order_fields(fields)
+
+    # Read before the order, so a change in between makes the remembered ETag stale
+    version = get_order_version(order_id)
+
+    # Same version as when this worker last served it (any worker's writes
+    # change it): 304 without reading the order
+    known = cached_order_etag(order_id, selected)
+    if known and version is not None and known[1] == version and etag_matches(request, known[0]):
+        return not_modified(known[0], "order")
+
+    order_details = get_order_details(order_id, selected)
 
     if not order_details:
         raise HTTPException(
@@ -133,15 +402,24 @@ def get_single_order(order_id: int):
             detail=f"Order {order_id} not found"
         )
 
-    return order_details
+    response, etag = json_with_etag(request, order_details, "order")
+    if version is not None:
+        remember_order_etag(order_id, etag, version, selected)
+    return response
 
 @router.get("/user/{user_id}")
-def list_user_orders(user_id: int):
-    """List all orders for a user"""
-    order_ids = get_orders_for_user(user_id)
-    return [get_order_details(oid) for oid in order_ids]
+def list_user_orders(user_id: int, fields: Optional[str] = None):
+    """List all orders for a user (?fields=... as for a single order)"""
+    return _user_orders(user_id, _order_fields(fields))
+
+@router.get("/user/{user_id}/summaries")
+def list_user_order_summaries(user_id: int):
+    """Compact order history for list views (no items / delivery)"""
+    summaries = get_user_order_summaries(user_id)
+    if summaries is None:
+        raise HTTPException(status_code=500, detail="Failed to connect to database")
+    return RecordJSONResponse(summaries)
 
 @router.get("/")
-def list_orders(user_id: int = Query(...)):
-    order_ids = get_orders_for_user(user_id)
-    return [get_order_details(oid) for oid in order_ids]
+def list_orders(user_id: int = Query(...), fields: Optional[str] = None):
+    return _user_orders(user_id, _order_fields(fields))
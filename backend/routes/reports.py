@@ -1,16 +1,21 @@
 # backend/routes/reports.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
-from database.queries import get_revenue_report, get_revenue_details
+from database.queries import get_revenue_daily, get_revenue_report
+from database.repository import get_revenue_report_records, get_revenue_details_records
+from database.records import RecordJSONResponse
 from database.connection import get_db_connection
-import openpyxl
+from lazy import lazy_import
 from io import BytesIO
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import events
+import pricing
 
-router = APIRouter(prefix="/api/reports", tags=["Reports"])
+# Only the Excel exports need openpyxl - import it on first use
+openpyxl = lazy_import("openpyxl")
 
-COMMISSION_RATE = 0.15
+router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
 
 def _to_float(x: Any, default: float = 0.0) -> float:
@@ -38,22 +43,15 @@ def get_revenue_data():
     Returns aggregated statistics per restaurant (from database)
     """
     try:
-        report = get_revenue_report()
-
-        print(f"🔍 Revenue report type: {type(report)}")
-        print(f"🔍 Revenue report value: {report}")
+        report = get_revenue_report_records()
 
         if report is None:
-            print("⚠️ get_revenue_report() returned None")
-            return []
-
-        if not isinstance(report, list):
-            print(f"⚠️ Expected list, got {type(report)}")
+            print("⚠️ get_revenue_report_records() returned None")
             return []
 
         # Just return the data as-is from the database query
         # The query already includes PLATFORM_COMMISSION, SERVICE_FEES, DELIVERY_PROFIT
-        return report
+        return RecordJSONResponse(report)
 
     except Exception as e:
         print(f"❌ Error in get_revenue_data: {e}")
@@ -66,21 +64,37 @@ def get_detailed_revenue():
     Returns individual order profit data from INVESTOR_PROFIT_VIEW
     """
     try:
-        details = get_revenue_details()
+        details = get_revenue_details_records()
 
         if details is None:
             raise HTTPException(status_code=500, detail="Failed to connect to database")
 
-        return {
+        return RecordJSONResponse({
             "success": True,
             "message": "Revenue details retrieved",
             "data": details,
-        }
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get details: {str(e)}")
 
 
+@router.get("/revenue/daily")
+def get_daily_revenue(days: int = Query(30, ge=1, le=366)):
+    """
+    Revenue of DELIVERED orders per day and restaurant for the last `days`
+    days, from REVENUE_DAILY (kept current from the outbox, no joins over ORDERS)
+    """
+    rows = get_revenue_daily(date.today() - timedelta(days=days - 1))
+    if rows is None:
+        raise HTTPException(status_code=500, detail="Failed to connect to database")
+    return RecordJSONResponse({
+        "success": True,
+        "days": days,
+        "data": rows,
+    })
+
+
 @router.get("/revenue/excel")
 def download_revenue_excel():
     try:
@@ -92,9 +106,8 @@ def download_revenue_excel():
                 detail="No revenue data available"
             )
 
-        COMMISSION_RATE = 0.15
-        SERVICE_FEE_PER_ORDER = 2.99
-        DELIVERY_COMMISSION_PER_ORDER = 0.60
+        SERVICE_FEE_PER_ORDER = float(pricing.SERVICE_FEE)
+        DELIVERY_COMMISSION_PER_ORDER = float(pricing.DELIVERY_PLATFORM_CUT)
 
         wb = openpyxl.Workbook()
         ws = wb.active
@@ -139,10 +152,8 @@ def download_revenue_excel():
             avg = float(row.get("AVG_ORDER_VALUE") or 0.0)
             uniq = int(row.get("UNIQUE_CUSTOMERS") or 0)
 
-            commission = row.get("PLATFORM_COMMISSION")
-            if commission is None:
-                commission = gross * COMMISSION_RATE
-            commission = float(commission or 0.0)
+            # Stored per order (from the food subtotal, see pricing.py)
+            commission = float(row.get("PLATFORM_COMMISSION") or 0.0)
 
             net_to_restaurant = row.get("NET_RESTAURANT_REVENUE")
             if net_to_restaurant is None:
@@ -254,6 +265,24 @@ def download_revenue_excel():
             detail=f"Excel generation failed: {str(e)}"
         )
 
+@router.get("/restaurant/{restaurant_id}/delivery-stages")
+def get_delivery_stages(restaurant_id: int, days: int = Query(30, ge=1, le=365)):
+    """
+    Delivery stage durations for a restaurant (minutes, from DELIVERY_EVENTS)
+    to_pickup: ASSIGNED -> PICKED_UP, at_pickup: PICKED_UP -> IN_TRANSIT,
+    in_transit: IN_TRANSIT -> DELIVERED, total: ASSIGNED -> DELIVERED
+    """
+    stages = events.stage_percentiles(restaurant_id, days)
+    if stages is None:
+        raise HTTPException(status_code=500, detail="Failed to connect to database")
+    return {
+        "success": True,
+        "RESTAURANT_ID": restaurant_id,
+        "days": days,
+        "stages": stages,
+    }
+
+
 @router.get("/restaurant/{restaurant_id}/excel")
 def download_restaurant_revenue_excel(restaurant_id: int):
     """
@@ -261,7 +290,7 @@ def download_restaurant_revenue_excel(restaurant_id: int):
     For restaurant owners to see their earnings
     """
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(read_only=True)
         cursor = conn.cursor(dictionary=True)
 
         cursor.execute(
@@ -287,8 +316,10 @@ def download_restaurant_revenue_excel(restaurant_id: int):
                 o.ORDER_DATE,
                 u.USER_NAME as CUSTOMER_NAME,
                 o.TOTAL_AMOUNT as GROSS_REVENUE,
-                (o.TOTAL_AMOUNT * 0.15) as PLATFORM_COMMISSION,
-                (o.TOTAL_AMOUNT * 0.85) as NET_REVENUE
+                o.PLATFORM_COMMISSION,
+                CASE WHEN o.PLATFORM_COMMISSION IS NULL THEN
+                    (SELECT SUM(oi.PRICE * oi.QUANTITY) FROM ORDER_ITEMS oi WHERE oi.ORDER_ID = o.ORDER_ID)
+                END as SUBTOTAL
             FROM ORDERS o
             JOIN USERS u ON o.USER_ID = u.USER_ID 
             WHERE o.RESTAURANT_ID = %s
@@ -298,6 +329,13 @@ def download_restaurant_revenue_excel(restaurant_id: int):
         )
         orders = cursor.fetchall()
 
+        # Commission is charged on the food subtotal, not the total with fees
+        # and tax: use the stored column, or price it for rows without one
+        for order in orders:
+            if order["PLATFORM_COMMISSION"] is None:
+                order["PLATFORM_COMMISSION"] = pricing.platform_commission(order["SUBTOTAL"] or 0)
+            order["NET_REVENUE"] = order["GROSS_REVENUE"] - order["PLATFORM_COMMISSION"]
+
         cursor.close()
         conn.close()
 
@@ -406,7 +444,7 @@ def download_restaurant_revenue_excel(restaurant_id: int):
 
 @router.get("/debug")
 def debug_orders():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     
     cursor.execute("SELECT STATUS, COUNT(*) as count FROM ORDERS GROUP BY STATUS")
@@ -430,7 +468,7 @@ def debug_orders():
 
 @router.get("/debug/breakdown")
 def debug_breakdown():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     
     # Get totals from ORDERS table
@@ -470,8 +508,8 @@ def debug_breakdown():
     delivery_profit = float(delivery_totals['total_delivery_profit'] or 0)
     
     # Frontend calculation
-    frontend_service_fees = orders * 2.99
-    frontend_delivery_commission = orders * 0.60
+    frontend_service_fees = orders * float(pricing.SERVICE_FEE)
+    frontend_delivery_commission = orders * float(pricing.DELIVERY_PLATFORM_CUT)
     frontend_total = commission + frontend_service_fees + frontend_delivery_commission
     
     return {
@@ -495,7 +533,7 @@ def debug_breakdown():
 
 @router.get("/debug/delivery-count")
 def debug_delivery_count():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     
     cursor.execute("SELECT COUNT(*) as order_count FROM ORDERS WHERE STATUS = 'DELIVERED'")
@@ -519,7 +557,7 @@ def debug_delivery_count():
 
 @router.get("/debug/deliveries")
 def debug_deliveries():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     
     # Get distinct delivery platform cut values and their counts
@@ -548,7 +586,7 @@ def debug_deliveries():
 
 @router.get("/debug/investor-view")
 def debug_investor_view():
-    conn = get_db_connection()
+    conn = get_db_connection(read_only=True)
     cursor = conn.cursor(dictionary=True)
     
     cursor.execute("""
@@ -1,33 +1,76 @@
 # backend/routes/restaurants.py
-from fastapi import APIRouter, HTTPException
-from database.queries import get_all_restaurants, get_restaurant_by_id, get_restaurant_menu
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from database.queries import get_restaurant_by_id, parse_fields, RESTAURANT_COLUMNS, MENU_COLUMNS
+from database import catalog
+from compression import precompressed_json
 
 # Create router
 router = APIRouter(prefix="/api/restaurants", tags=["Restaurants"])
 
+def _fields(fields: Optional[str], columns):
+    """
+    Parse ?fields=... (400 on unknown names), sorted so that every order of
+    the same names shares one precompressed response
+    """
+    try:
+        selected = parse_fields(fields, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return tuple(sorted(selected)) if selected else None
+
+def _project(rows, fields):
+    """Cached catalog rows trimmed to the requested fields (the catalog itself holds full rows)"""
+    if fields is None:
+        return rows
+    return [{f: row.get(f) for f in fields} for row in rows]
+
 # Browse restaurants endpoint
 @router.get("/")
-def get_restaurants(zip: str = None):
-    """Get all restaurants, optionally filtered by ZIP code"""
+def get_restaurants(request: Request, zip: str = None, fields: Optional[str] = None):
+    """Get all restaurants, optionally filtered by ZIP code (?fields=RESTAURANT_ID,RESTAURANT_NAME)"""
     
-    restaurants = get_all_restaurants()
+    selected = _fields(fields, RESTAURANT_COLUMNS)
     
     # TODO: Filter by ZIP once Krista adds ZIP_CODE column
     # if zip:
     #     restaurants = [r for r in restaurants if r.get('ZIP_CODE') == zip]
     
-    return {
-        "success": True,
-        "count": len(restaurants),
-        "restaurants": restaurants
-    }
+    restaurants = catalog.get_restaurants()
+    
+    # Serialized + compressed once per catalog version (and field selection)
+    return precompressed_json(
+        request,
+        ("restaurants", selected),
+        catalog.version(),
+        lambda: {
+            "success": True,
+            "count": len(restaurants),
+            "restaurants": _project(restaurants, selected)
+        }
+    )
 
 # Get specific restaurant
 @router.get("/{restaurant_id}")
-def get_restaurant(restaurant_id: int):
+def get_restaurant(request: Request, restaurant_id: int, fields: Optional[str] = None):
     """Get specific restaurant details"""
     
-    restaurant = get_restaurant_by_id(restaurant_id)
+    selected = _fields(fields, RESTAURANT_COLUMNS)
+    
+    restaurant = catalog.get_restaurant(restaurant_id)
+    if restaurant:
+        return precompressed_json(
+            request,
+            ("restaurant", restaurant_id, selected),
+            catalog.version(),
+            lambda: {
+                "success": True,
+                "restaurant": _project([restaurant], selected)[0]
+            }
+        )
+    
+    # Not in the cached catalog yet (e.g. just created)
+    restaurant = get_restaurant_by_id(restaurant_id, selected)
     
     if not restaurant:
         raise HTTPException(status_code=404, detail="Restaurant not found")
@@ -39,13 +82,27 @@ def get_restaurant(restaurant_id: int):
 
 # Get restaurant menu
 @router.get("/{restaurant_id}/menu")
-def get_menu(restaurant_id: int):
-    """Get restaurant menu"""
+def get_menu(request: Request, restaurant_id: int, fields: Optional[str] = None):
+    """Get restaurant menu (?fields=MENU_ITEM_ID,ITEM_NAME,PRICE)"""
     
-    menu = get_restaurant_menu(restaurant_id)
+    selected = _fields(fields, MENU_COLUMNS)
+    menu = catalog.get_menu(restaurant_id)
     
-    return {
-        "success": True,
-        "restaurant_id": restaurant_id,
-        "menu_items": menu
-    }
\ No newline at end of file
+    # Unknown restaurant or failed read: answer, but don't fill the cache with it
+    if not menu:
+        return {
+            "success": True,
+            "restaurant_id": restaurant_id,
+            "menu_items": []
+        }
+    
+    return precompressed_json(
+        request,
+        ("menu", restaurant_id, selected),
+        catalog.version(),
+        lambda: {
+            "success": True,
+            "restaurant_id": restaurant_id,
+            "menu_items": _project(menu, selected)
+        }
+    )
@@ -23,6 +23,29 @@ class DeliveryStatus(str, Enum):
     DELIVERED = 'DELIVERED'
     FAILED = 'FAILED'
 
+# Allowed DELIVERY_STATUS changes: ASSIGNED -> PICKED_UP -> IN_TRANSIT -> DELIVERED,
+# and FAILED from any step before DELIVERED. FAILED is final for status updates;
+# the one way out is dispatch.reassign (queries.reassign_delivery), which moves a
+# FAILED delivery back to ASSIGNED with a new driver and resets its order to
+# ORDER_STATUS_FOR_DELIVERY[ASSIGNED] in the same transaction
+DELIVERY_TRANSITIONS = {
+    DeliveryStatus.ASSIGNED: (DeliveryStatus.PICKED_UP, DeliveryStatus.FAILED),
+    DeliveryStatus.PICKED_UP: (DeliveryStatus.IN_TRANSIT, DeliveryStatus.FAILED),
+    DeliveryStatus.IN_TRANSIT: (DeliveryStatus.DELIVERED, DeliveryStatus.FAILED),
+    DeliveryStatus.DELIVERED: (),
+    DeliveryStatus.FAILED: (),
+}
+
+# ORDERS.STATUS an order moves to when its delivery reaches a DELIVERY_STATUS
+# (orders are CONFIRMED once paid; CANCELLED / DELIVERED orders never move)
+ORDER_STATUS_FOR_DELIVERY = {
+    DeliveryStatus.ASSIGNED: 'CONFIRMED',
+    DeliveryStatus.PICKED_UP: 'OUT_FOR_DELIVERY',
+    DeliveryStatus.IN_TRANSIT: 'OUT_FOR_DELIVERY',
+    DeliveryStatus.DELIVERED: 'DELIVERED',
+}
+FINAL_ORDER_STATUSES = ('DELIVERED', 'CANCELLED')
+
 # ====================================================
 # 2. USER AND AUTHENTICATION SCHEMAS
 # ====================================================
@@ -0,0 +1,13 @@
+# backend/tests/conftest.py
+"""
+Tests run without MySQL: they patch get_db_connection in the module under
+test with a small in-memory fake (see FakeDatabase in the test files).
+Run from backend/:
+
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,97 @@
+# backend/tests/test_compression.py
+"""choose_encoding and CompressionMiddleware: negotiation, ETags and Vary"""
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+import compression
+from conditional import etag_matches, not_modified
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0, *", None),
+    ("*;q=0, gzip", "gzip"),
+    ("br;q=0, *;q=0.3", "gzip"),
+    ("identity", None),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=abc", None),
+    ("", None),
+])
+def test_choose_encoding(no_brotli, header, expected):
+    assert compression.choose_encoding(header) == expected
+
+
+def test_choose_encoding_prefers_the_higher_q(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+
+    assert compression.choose_encoding("gzip, br") == "br"
+    assert compression.choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert compression.choose_encoding("gzip;q=0, *;q=0.1") == "br"
+
+
+BODY = b'{"items": "' + b"x" * 4000 + b'"}'
+ETAG = '"abc"'
+
+
+@pytest.fixture
+def client(no_brotli):
+    app = FastAPI()
+    app.add_middleware(compression.CompressionMiddleware)
+
+    @app.get("/order")
+    def order(request: Request):
+        if etag_matches(request, ETAG):
+            return not_modified(ETAG, "order")
+        return Response(BODY, media_type="application/json",
+                        headers={"ETag": ETAG, "Vary": "Authorization"})
+
+    return TestClient(app)
+
+
+def test_compressed_response_weakens_etag_and_keeps_vary(client):
+    response = client.get("/order", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY  # decoded by the client
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["vary"] == "Authorization, Accept-Encoding"
+
+
+def test_uncompressed_response_keeps_strong_etag(client):
+    response = client.get("/order", headers={"Accept-Encoding": "gzip;q=0, *"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
+
+
+def test_revalidating_the_compressed_copy(client):
+    response = client.get("/order", headers={"Accept-Encoding": "gzip", "If-None-Match": 'W/"abc"'})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == 'W/"abc"'
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(client, monkeypatch):
+    threads = []
+    to_thread = compression.asyncio.to_thread
+
+    async def recording_to_thread(fn, *args):
+        threads.append(fn)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(compression.asyncio, "to_thread", recording_to_thread)
+    monkeypatch.setattr(compression, "COMPRESSION_THREAD_SIZE", 1024)
+
+    response = client.get("/order", headers={"Accept-Encoding": "gzip"})
+
+    assert threads == [compression.compress]
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY
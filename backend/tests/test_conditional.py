@@ -0,0 +1,55 @@
+# backend/tests/test_conditional.py
+"""GET /api/orders/{id}: remembered ETags are only reused while the order version holds"""
+
+import pytest
+from starlette.requests import Request
+
+import conditional
+from routes import orders
+
+
+def _request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/api/orders/1", "headers": headers})
+
+
+@pytest.fixture
+def order(monkeypatch):
+    order = {"STATUS": "CONFIRMED", "version": "v1", "reads": 0}
+
+    def details(order_id, fields=None):
+        order["reads"] += 1
+        return {"ORDER_ID": 1, "STATUS": order["STATUS"]}
+
+    monkeypatch.setattr(orders, "get_order_version", lambda order_id: order["version"])
+    monkeypatch.setattr(orders, "get_order_details", details)
+    monkeypatch.setattr(conditional, "_order_etags", conditional.OrderedDict())
+    return order
+
+
+def test_unchanged_version_is_answered_from_memory(order):
+    etag = orders.get_single_order(1, _request()).headers["etag"]
+
+    response = orders.get_single_order(1, _request(etag))
+
+    assert response.status_code == 304
+    assert order["reads"] == 1
+
+
+def test_another_workers_write_is_never_hidden(order):
+    etag = orders.get_single_order(1, _request()).headers["etag"]
+    # Written elsewhere: this worker's memo was not bumped, the version moved
+    order.update(STATUS="OUT_FOR_DELIVERY", version="v2")
+
+    response = orders.get_single_order(1, _request(etag))
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_memo_is_bounded_least_recently_served_first(order, monkeypatch):
+    monkeypatch.setattr(conditional, "ETAG_MEMO_SIZE", 2)
+    for order_id in (1, 2, 1, 3):
+        conditional.remember_order_etag(order_id, f'"{order_id}"', "v1")
+
+    assert list(conditional._order_etags) == [1, 3]
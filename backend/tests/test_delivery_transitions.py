@@ -0,0 +1,239 @@
+# backend/tests/test_delivery_transitions.py
+"""apply_delivery_transitions: state machine checks, ACTUAL_TIME and order status"""
+
+import json
+import re
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import outbox
+from database import queries
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        sql = " ".join(query.split())
+        if sql.startswith("SELECT d.DELIVERY_ID"):
+            self.rows = [self.db.joined(i) for i in params if i in self.db.deliveries]
+        elif sql.startswith("UPDATE DELIVERIES d JOIN"):
+            self.rowcount = 0
+            for delivery_id, from_status, to_status in zip(*[iter(params)] * 3):
+                row = self.db.deliveries.get(delivery_id)
+                if row and row["DELIVERY_STATUS"] == from_status:
+                    row["DELIVERY_STATUS"] = to_status
+                    if to_status == "DELIVERED":
+                        row["ACTUAL_TIME"] = datetime.now()
+                    self.rowcount += 1
+        elif sql.startswith("UPDATE ORDERS o JOIN"):
+            self.rowcount = 0
+            for order_id, from_status, to_status in zip(*[iter(params)] * 3):
+                row = self.db.orders.get(order_id)
+                if row and row["STATUS"] == from_status:
+                    row["STATUS"] = to_status
+                    self.rowcount += 1
+        elif sql.startswith("UPDATE DELIVERIES SET DRIVER_ID"):
+            driver_id, delivery_id = params
+            row = self.db.deliveries.get(delivery_id)
+            self.rowcount = 0
+            if row and row["DELIVERY_STATUS"] == "FAILED":
+                row.update(DRIVER_ID=driver_id, DELIVERY_STATUS="ASSIGNED")
+                self.rowcount = 1
+        elif sql.startswith("SELECT d.ORDER_ID, o.RESTAURANT_ID, o.STATUS"):
+            row = self.db.joined(params[0])
+            self.rows = [tuple(row[k] for k in (
+                "ORDER_ID", "RESTAURANT_ID", "ORDER_STATUS", "TOTAL_AMOUNT", "PLATFORM_COMMISSION", "SERVICE_FEE"
+            ))]
+        elif sql.startswith("UPDATE ORDERS SET STATUS"):
+            to_status, order_id, from_status = params
+            row = self.db.orders[order_id]
+            self.rowcount = 0
+            if row["STATUS"] == from_status:
+                row["STATUS"] = to_status
+                self.rowcount = 1
+        else:
+            raise AssertionError(f"unexpected query: {sql[:60]}")
+        self.db.statements += 1
+
+    def executemany(self, query, rows):
+        assert re.match(r"\s*INSERT INTO OUTBOX", query)
+        self.db.outbox.extend(rows)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """DELIVERIES and ORDERS rows; committed only when the caller commits"""
+
+    def __init__(self):
+        self.deliveries = {}
+        self.orders = {}
+        self.outbox = []
+        self.statements = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def add(self, delivery_id, status="ASSIGNED", order_status="CONFIRMED"):
+        order_id = 100 + delivery_id
+        self.orders[order_id] = {
+            "ORDER_ID": order_id, "RESTAURANT_ID": 7, "STATUS": order_status,
+            "TOTAL_AMOUNT": Decimal("30.00"), "PLATFORM_COMMISSION": Decimal("3.00"),
+            "SERVICE_FEE": Decimal("2.99"),
+        }
+        self.deliveries[delivery_id] = {
+            "DELIVERY_ID": delivery_id, "ORDER_ID": order_id, "DRIVER_ID": 5,
+            "DELIVERY_STATUS": status, "DELIVERY_PLATFORM_CUT": Decimal("0.60"), "ACTUAL_TIME": None,
+        }
+
+    def joined(self, delivery_id):
+        d = self.deliveries[delivery_id]
+        o = self.orders[d["ORDER_ID"]]
+        return {
+            **{k: d[k] for k in ("DELIVERY_ID", "ORDER_ID", "DRIVER_ID", "DELIVERY_STATUS", "DELIVERY_PLATFORM_CUT")},
+            "RESTAURANT_ID": o["RESTAURANT_ID"], "ORDER_STATUS": o["STATUS"],
+            "TOTAL_AMOUNT": o["TOTAL_AMOUNT"], "PLATFORM_COMMISSION": o["PLATFORM_COMMISSION"],
+            "SERVICE_FEE": o["SERVICE_FEE"],
+        }
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    recorded = []
+    monkeypatch.setattr(queries, "get_db_connection", lambda **kwargs: db)
+    monkeypatch.setattr(queries.events, "record", lambda *args: recorded.append(args))
+    monkeypatch.setattr(queries.tracking, "publish", lambda *args: None)
+    monkeypatch.setattr(outbox, "OUTBOX_ENABLED", True)
+    db.recorded = recorded
+    return db
+
+
+def _results(outcomes):
+    return [o["result"] for o in outcomes]
+
+
+def test_legal_steps_apply_in_order(db):
+    db.add(1)
+    outcomes = queries.apply_delivery_transitions([(1, "PICKED_UP"), (1, "IN_TRANSIT")])
+
+    assert _results(outcomes) == ["applied", "applied"]
+    assert [(o["FROM"], o["TO"]) for o in outcomes] == [("ASSIGNED", "PICKED_UP"), ("PICKED_UP", "IN_TRANSIT")]
+    assert db.deliveries[1]["DELIVERY_STATUS"] == "IN_TRANSIT"
+    assert db.deliveries[1]["ACTUAL_TIME"] is None
+    assert db.orders[101]["STATUS"] == "OUT_FOR_DELIVERY"
+    assert db.commits == 1
+    assert [(r[4], r[5]) for r in db.recorded] == [("ASSIGNED", "PICKED_UP"), ("PICKED_UP", "IN_TRANSIT")]
+
+
+def test_delivered_sets_actual_time_and_delivers_the_order(db):
+    db.add(1, status="IN_TRANSIT", order_status="OUT_FOR_DELIVERY")
+    outcomes = queries.apply_delivery_transitions([(1, "DELIVERED")])
+
+    assert _results(outcomes) == ["applied"]
+    assert isinstance(db.deliveries[1]["ACTUAL_TIME"], datetime)
+    assert db.orders[101]["STATUS"] == "DELIVERED"
+    # REVENUE_DAILY counts the order and the delivery cut from these events
+    events = {(aggregate, event_type): payload for aggregate, _, event_type, payload in db.outbox}
+    assert '"TO": "DELIVERED"' in events[("ORDER", "status_changed")]
+    assert '"DELIVERY_PLATFORM_CUT": "0.60"' in events[("DELIVERY", "status_changed")]
+
+
+def test_illegal_changes_are_rejected_without_writing(db):
+    db.add(1)
+    db.add(2, status="DELIVERED", order_status="DELIVERED")
+    outcomes = queries.apply_delivery_transitions([(1, "DELIVERED"), (2, "PICKED_UP"), (1, "ASSIGNED")])
+
+    assert _results(outcomes) == ["rejected", "rejected", "rejected"]
+    assert outcomes[0]["error"] == "Cannot change ASSIGNED to DELIVERED"
+    assert db.deliveries[1]["DELIVERY_STATUS"] == "ASSIGNED"
+    assert db.deliveries[2]["DELIVERY_STATUS"] == "DELIVERED"
+    assert db.statements == 1  # the SELECT only
+    assert db.outbox == [] and db.recorded == []
+
+
+def test_rejected_change_does_not_block_the_rest_of_the_batch(db):
+    db.add(1)
+    db.add(2)
+    outcomes = queries.apply_delivery_transitions([(1, "IN_TRANSIT"), (2, "PICKED_UP"), (1, "FAILED")])
+
+    assert _results(outcomes) == ["rejected", "applied", "applied"]
+    assert db.deliveries[1]["DELIVERY_STATUS"] == "FAILED"
+    assert db.deliveries[2]["DELIVERY_STATUS"] == "PICKED_UP"
+    # FAILED leaves the order for the next driver
+    assert db.orders[101]["STATUS"] == "CONFIRMED"
+
+
+def test_unknown_delivery_is_not_found(db):
+    db.add(1)
+    outcomes = queries.apply_delivery_transitions([(99, "PICKED_UP"), (1, "PICKED_UP")])
+
+    assert _results(outcomes) == ["not_found", "applied"]
+    assert outcomes[0]["error"] == "Delivery 99 not found"
+    assert outcomes[0]["ORDER_ID"] is None
+
+
+def test_cancelled_order_keeps_its_status(db):
+    db.add(1, order_status="CANCELLED")
+    queries.apply_delivery_transitions([(1, "PICKED_UP")])
+
+    assert db.deliveries[1]["DELIVERY_STATUS"] == "PICKED_UP"
+    assert db.orders[101]["STATUS"] == "CANCELLED"
+
+
+def test_database_unavailable(monkeypatch):
+    monkeypatch.setattr(queries, "get_db_connection", lambda **kwargs: None)
+    assert queries.apply_delivery_transitions([(1, "PICKED_UP")]) is None
+    assert queries.apply_delivery_transitions([]) == []
+
+
+def test_reassignment_puts_the_order_back_to_confirmed(db):
+    db.add(1, status="IN_TRANSIT", order_status="OUT_FOR_DELIVERY")
+    queries.apply_delivery_transitions([(1, "FAILED")])
+
+    assert queries.reassign_delivery(1, 9) is True
+
+    assert db.deliveries[1]["DELIVERY_STATUS"] == "ASSIGNED"
+    assert db.deliveries[1]["DRIVER_ID"] == 9
+    assert db.orders[101]["STATUS"] == "CONFIRMED"
+    order_events = [json.loads(row[3]) for row in db.outbox if row[0] == "ORDER"]
+    assert (order_events[-1]["FROM"], order_events[-1]["TO"]) == ("OUT_FOR_DELIVERY", "CONFIRMED")
+    # Picked up again by the new driver
+    assert _results(queries.apply_delivery_transitions([(1, "PICKED_UP")])) == ["applied"]
+    assert db.orders[101]["STATUS"] == "OUT_FOR_DELIVERY"
+
+
+def test_reassignment_leaves_final_orders_alone(db):
+    db.add(1, status="FAILED", order_status="CANCELLED")
+    db.add(2, status="DELIVERED", order_status="DELIVERED")
+
+    assert queries.reassign_delivery(1, 9) is True
+    assert queries.reassign_delivery(2, 9) is False
+
+    assert db.orders[101]["STATUS"] == "CANCELLED"
+    assert db.orders[102]["STATUS"] == "DELIVERED"
+    assert [row[2] for row in db.outbox] == ["reassigned"]
@@ -0,0 +1,164 @@
+# backend/tests/test_dispatch.py
+"""dispatch: grid search, least-loaded fallback, reassignment and location refresh"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import dispatch
+
+RESTAURANT = (40.7128, -74.0060)
+
+
+def _north(km):
+    """A point km north of RESTAURANT"""
+    return RESTAURANT[0] + km / dispatch.KM_PER_DEGREE_LAT, RESTAURANT[1]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """Empty index with drivers 1..5 and no database"""
+    monkeypatch.setattr(dispatch, "_drivers", {})
+    monkeypatch.setattr(dispatch, "_cells", {})
+    monkeypatch.setattr(dispatch, "_by_load", [])
+    monkeypatch.setattr(dispatch, "_stats", dict.fromkeys(dispatch._stats, 0))
+    monkeypatch.setattr(dispatch, "get_drivers", lambda: [{"USER_ID": i} for i in range(1, 6)])
+    monkeypatch.setattr(dispatch, "get_driver_loads", lambda: {})
+    monkeypatch.setattr(dispatch, "get_driver_locations", lambda since: {})
+    dispatch.load()
+    return dispatch
+
+
+def _locate(driver_id, km, load=0):
+    dispatch.update_location(driver_id, *_north(km))
+    with dispatch._lock:
+        dispatch._set_load(dispatch._drivers[driver_id], load)
+
+
+def test_nearest_stops_once_no_outer_ring_can_win(index, monkeypatch):
+    _locate(1, 0.5)
+    _locate(2, 40)
+    rings = []
+    ring = dispatch._ring
+    monkeypatch.setattr(dispatch, "_ring", lambda cx, cy, r: rings.append(r) or ring(cx, cy, r))
+
+    with dispatch._lock:
+        driver = dispatch._nearest(*RESTAURANT, exclude=())
+
+    assert driver.driver_id == 1
+    # cost ~0.5 km: ring 2 starts at least 1 cell (2 km) away
+    assert rings == [0, 1]
+
+
+def test_nearest_weighs_queued_deliveries_against_distance(index):
+    _locate(1, 0.2, load=2)  # 0.2 + 2 * 3 km
+    _locate(2, 3.0)
+    _locate(3, 1.0, load=dispatch.MAX_ACTIVE_DELIVERIES)
+
+    with dispatch._lock:
+        assert dispatch._nearest(*RESTAURANT, exclude=()).driver_id == 2
+        assert dispatch._nearest(*RESTAURANT, exclude=(2,)).driver_id == 1
+        assert dispatch._nearest(*RESTAURANT, exclude=(1, 2)) is None
+
+
+def test_least_loaded_skips_excluded_drivers_and_keeps_them(index):
+    for driver_id, load in [(1, 0), (2, 1), (3, 2), (4, 3), (5, 3)]:
+        _locate(driver_id, driver_id, load=load)
+
+    with dispatch._lock:
+        assert dispatch._least_loaded(exclude=(1, 2)).driver_id == 3
+        # Excluded entries went back on the heap
+        assert dispatch._least_loaded(exclude=()).driver_id == 1
+        assert dispatch._least_loaded(exclude=(1, 2, 3, 4, 5)) is None
+
+
+def test_least_loaded_ignores_stale_heap_entries(index):
+    with dispatch._lock:
+        dispatch._set_load(dispatch._drivers[1], 3)
+        for driver_id in (2, 3, 4, 5):
+            dispatch._set_load(dispatch._drivers[driver_id], 2)
+        dispatch._set_load(dispatch._drivers[5], 1)
+        # (0, 1) and (2, 5) are still on the heap
+        assert dispatch._least_loaded(exclude=()).driver_id == 5
+
+
+def test_assign_falls_back_when_every_nearby_driver_is_full(index):
+    full = dispatch.MAX_ACTIVE_DELIVERIES
+    _locate(1, 0.5, load=full)
+    for driver_id in (2, 3, 4, 5):
+        with dispatch._lock:
+            dispatch._set_load(dispatch._drivers[driver_id], full)
+    with dispatch._lock:
+        dispatch._set_load(dispatch._drivers[4], full - 1)
+
+    assert dispatch.assign(7, location=RESTAURANT) == 4
+    assert dispatch._drivers[4].load == full
+    assert dispatch._stats["fallback"] == 1
+
+
+def test_reassign_moves_a_failed_delivery_to_another_driver(index, monkeypatch):
+    moved = []
+    monkeypatch.setattr(dispatch, "reassign_delivery", lambda delivery_id, driver_id: moved.append((delivery_id, driver_id)) or True)
+    monkeypatch.setattr(dispatch, "_restaurant_location", lambda restaurant_id: RESTAURANT)
+    _locate(1, 0.1, load=1)
+    _locate(2, 1.0)
+
+    assert dispatch.reassign({"DELIVERY_ID": 9, "DRIVER_ID": 1, "RESTAURANT_ID": 7}) == 2
+    assert moved == [(9, 2)]
+    assert dispatch._drivers[1].load == 0
+    assert dispatch._drivers[2].load == 1
+    assert dispatch._stats["reassigned"] == 1
+
+
+def test_reassign_gives_the_driver_back_when_the_update_fails(index, monkeypatch):
+    monkeypatch.setattr(dispatch, "reassign_delivery", lambda delivery_id, driver_id: False)
+    monkeypatch.setattr(dispatch, "_restaurant_location", lambda restaurant_id: RESTAURANT)
+    _locate(1, 0.1, load=1)
+    _locate(2, 1.0)
+
+    assert dispatch.reassign({"DELIVERY_ID": 9, "DRIVER_ID": 1, "RESTAURANT_ID": 7}) is None
+    assert dispatch._drivers[2].load == 0
+    assert dispatch._stats["reassigned"] == 0
+
+
+def test_reassign_without_another_driver(index, monkeypatch):
+    monkeypatch.setattr(dispatch, "get_drivers", lambda: [{"USER_ID": 1}])
+    monkeypatch.setattr(dispatch, "get_driver_loads", lambda: {1: 1})
+    monkeypatch.setattr(dispatch, "reassign_delivery", lambda delivery_id, driver_id: pytest.fail("no driver to move to"))
+    dispatch.load()
+
+    assert dispatch.reassign({"DELIVERY_ID": 9, "DRIVER_ID": 1, "RESTAURANT_ID": 7}) is None
+    assert dispatch._drivers[1].load == 0
+
+
+def test_load_seeds_locations_from_other_workers(index, monkeypatch):
+    now = datetime.now()
+    lat, lng = _north(1)
+    flushed = {
+        1: {"DRIVER_ID": 1, "LATITUDE": Decimal(f"{lat:.6f}"), "LONGITUDE": Decimal(f"{lng:.6f}"), "RECORDED_AT": now},
+        2: {"DRIVER_ID": 2, "LATITUDE": Decimal("40.0"), "LONGITUDE": Decimal("-74.0"), "RECORDED_AT": now - timedelta(seconds=60)},
+    }
+    cutoffs = []
+    monkeypatch.setattr(dispatch, "get_driver_locations", lambda since: cutoffs.append(since) or flushed)
+    # Driver 2 pinged this worker after its flushed row; driver 3 went quiet long ago
+    _locate(2, 5)
+    _locate(3, 2)
+    dispatch._drivers[3].located_at = now - timedelta(seconds=dispatch.DISPATCH_LOCATION_MAX_AGE_SECONDS + 1)
+
+    assert dispatch.load() == 5
+
+    drivers = dispatch._drivers
+    assert (drivers[1].lat, drivers[1].lng) == pytest.approx(_north(1))
+    assert (drivers[2].lat, drivers[2].lng) == pytest.approx(_north(5))
+    assert drivers[3].cell is None and drivers[3].lat is None
+    assert dispatch.stats()["located"] == 2
+    assert now - cutoffs[0] == pytest.approx(timedelta(seconds=dispatch.DISPATCH_LOCATION_MAX_AGE_SECONDS), abs=timedelta(seconds=5))
+
+
+def test_load_keeps_local_pings_when_the_locations_query_fails(index, monkeypatch):
+    monkeypatch.setattr(dispatch, "get_driver_locations", lambda since: None)
+    _locate(1, 2)
+
+    assert dispatch.load() == 5
+    assert dispatch._drivers[1].cell is not None
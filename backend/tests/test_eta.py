@@ -0,0 +1,97 @@
+# backend/tests/test_eta.py
+"""EtaModel: histogram quantiles, the fallback chain and incremental refreshes"""
+
+from datetime import datetime
+
+import pytest
+
+import eta
+
+MONDAY_NOON = eta.hour_of_week(datetime(2026, 1, 5, 12))
+MONDAY_EVENING = eta.hour_of_week(datetime(2026, 1, 5, 19))
+
+
+def _model(quantile=0.5, min_samples=3):
+    return eta.EtaModel(quantile, min_samples)
+
+
+def test_quantile_is_the_smallest_minute_covering_the_rank():
+    model = _model(quantile=0.5)
+    for minutes in (10, 20, 30, 40):
+        model.add(1, MONDAY_NOON, minutes)
+    model.build()
+    assert model.minutes(1, MONDAY_NOON) == 20
+
+    high = _model(quantile=0.9)
+    for minutes in (10, 20, 30, 40):
+        high.add(1, MONDAY_NOON, minutes)
+    high.build()
+    assert high.minutes(1, MONDAY_NOON) == 40
+
+
+def test_short_deliveries_are_ignored_and_long_ones_capped():
+    model = _model(min_samples=1)
+    assert model.add(1, MONDAY_NOON, eta.ETA_MIN_MINUTES - 1) is False
+    assert model.add(1, MONDAY_NOON, 1000) is True
+    model.build()
+
+    assert model.samples == 1
+    assert model.minutes(1, MONDAY_NOON) == eta.MAX_MINUTES
+
+
+def test_fallback_chain_takes_the_first_level_with_enough_samples():
+    model = _model(min_samples=3)
+    for _ in range(3):
+        model.add(1, MONDAY_NOON, 20)  # restaurant 1 at noon
+    model.add(1, MONDAY_EVENING, 50)  # too few for (1, evening)
+    for _ in range(2):
+        model.add(2, MONDAY_EVENING, 40)  # with restaurant 1's, (any, evening) has 3
+    model.build()
+
+    assert model.minutes(1, MONDAY_NOON) == 20  # (restaurant, hour)
+    assert model.minutes(1, MONDAY_EVENING) == 20  # (restaurant, any hour): 20, 20, 20, 50
+    assert model.minutes(3, MONDAY_EVENING) == 40  # (any restaurant, hour): 50, 40, 40
+    assert model.minutes(3, MONDAY_NOON + 1) == 20  # everything: 20, 20, 20, 50, 40, 40
+
+
+def test_too_little_history_uses_the_default():
+    model = _model(min_samples=3)
+    model.add(1, MONDAY_NOON, 20)
+    model.build()
+
+    assert model.minutes(1, MONDAY_NOON) == eta.DEFAULT_MINUTES
+
+
+@pytest.fixture
+def deliveries(monkeypatch):
+    """get_delivery_durations over an in-memory list of (id, restaurant, how, minutes, actual_time)"""
+    rows = []
+
+    def get_delivery_durations(after, since, limit):
+        newer = [r for r in rows if after is None or (r[4], r[0]) > after]
+        return newer[:limit]
+
+    monkeypatch.setattr(eta, "get_delivery_durations", get_delivery_durations)
+    # rebuild() makes EtaModel() with the module defaults
+    monkeypatch.setattr(eta.EtaModel.__init__, "__defaults__", (0.5, 2))
+    monkeypatch.setattr(eta, "_model", eta.EtaModel(0.5, 2))
+    monkeypatch.setattr(eta, "_cursor", None)
+    monkeypatch.setattr(eta, "_built_at", None)
+    monkeypatch.setattr(eta, "_stats", dict.fromkeys(eta._stats, 0))
+    return rows
+
+
+def test_refresh_folds_in_only_new_deliveries(deliveries):
+    deliveries += [(1, 1, MONDAY_NOON, 20, datetime(2026, 1, 5, 12, 30)),
+                   (2, 1, MONDAY_NOON, 20, datetime(2026, 1, 5, 12, 40))]
+    assert eta.refresh()  # first call rebuilds
+    assert eta._model.minutes(1, MONDAY_NOON) == 20
+
+    deliveries += [(3, 1, MONDAY_NOON, 60, datetime(2026, 1, 5, 13, 0)),
+                   (4, 1, MONDAY_NOON, 60, datetime(2026, 1, 5, 13, 5))]
+    assert eta.refresh()
+
+    assert eta._model.samples == 4
+    assert eta._model.minutes(1, MONDAY_NOON) == 20  # median of 20, 20, 60, 60
+    assert eta._stats["deliveries_read"] == 4  # the first two were not read again
+    assert eta._cursor == (datetime(2026, 1, 5, 13, 5), 4)
@@ -0,0 +1,69 @@
+# backend/tests/test_health.py
+"""health.probe: pooled pings only, an exhausted pool is not ready"""
+
+import pytest
+from mysql.connector import errors
+from mysql.connector.pooling import PoolError
+
+import health
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = {"size": 4, "idle": 0, "in_use": 4}
+    monkeypatch.setattr(health, "status", dict(health.status))
+    monkeypatch.setattr(health, "check_replicas", lambda: [])
+    monkeypatch.setattr(health, "replica_stats", lambda: [])
+    monkeypatch.setattr(health, "pool_stats", lambda: dict(pool))
+    return pool
+
+
+def _checkout(result):
+    def pooled_connection():
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return pooled_connection
+
+
+def test_exhausted_pool_is_not_ready(pool, monkeypatch):
+    monkeypatch.setattr(health, "pooled_connection", _checkout(PoolError("Failed getting connection; pool exhausted")))
+    monkeypatch.setattr(health, "get_db_connection", lambda: pytest.fail("fell back to a direct connection"))
+
+    status = health.probe()
+
+    assert status["status"] == "unhealthy"
+    assert status["reasons"] == ["pool exhausted (4/4 in use)"]
+    assert not health.is_db_ready()
+
+
+def test_unreachable_database(pool, monkeypatch):
+    monkeypatch.setattr(health, "pooled_connection", _checkout(errors.InterfaceError("Can't connect")))
+
+    status = health.probe()
+
+    assert (status["status"], status["database"]) == ("unhealthy", "disconnected")
+    assert not health.is_db_ready()
+
+
+def test_pooled_ping(pool, monkeypatch):
+    pool.update(idle=3, in_use=1)
+    conn = FakeConnection()
+    monkeypatch.setattr(health, "pooled_connection", _checkout(conn))
+
+    status = health.probe()
+
+    assert (status["status"], status["database"]) == ("healthy", "connected")
+    assert conn.closed
+    assert health.is_db_ready()
@@ -0,0 +1,163 @@
+# backend/tests/test_idempotency.py
+"""Idempotency-Key: replays, fingerprint checks and orders whose read-back failed"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import idempotency
+from routes import orders
+
+
+class FakeKeys:
+    """IDEMPOTENCY_KEYS rows, with the semantics of the queries.py functions"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def claim(self, key, fp):
+        if key in self.rows:
+            return False
+        self.rows[key] = {"REQUEST_FINGERPRINT": fp, "STATUS": "IN_PROGRESS", "ORDER_ID": None,
+                          "RESPONSE_BODY": None, "AGE_SECONDS": 0}
+        return True
+
+    def get(self, key):
+        row = self.rows.get(key)
+        return dict(row, IDEMPOTENCY_KEY=key) if row else None
+
+    def complete(self, key, order_id, body):
+        self.rows[key].update(STATUS="COMPLETED", ORDER_ID=order_id, RESPONSE_BODY=body)
+        return True
+
+    def take_over(self, key, fp, lease_seconds):
+        row = self.rows.get(key)
+        if row and row["REQUEST_FINGERPRINT"] == fp and row["STATUS"] == "IN_PROGRESS" \
+                and row["AGE_SECONDS"] >= lease_seconds:
+            row["AGE_SECONDS"] = 0
+            return True
+        return False
+
+    def release(self, key):
+        row = self.rows.get(key)
+        if row is None or row["STATUS"] != "IN_PROGRESS":
+            return None
+        if row["ORDER_ID"] is None:
+            del self.rows[key]
+            return None
+        return row["ORDER_ID"]
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    keys = FakeKeys()
+    monkeypatch.setattr(idempotency, "claim_idempotency_key", keys.claim)
+    monkeypatch.setattr(idempotency, "get_idempotency_key", keys.get)
+    monkeypatch.setattr(idempotency, "complete_idempotency_key", keys.complete)
+    monkeypatch.setattr(idempotency, "take_over_idempotency_key", keys.take_over)
+    monkeypatch.setattr(idempotency, "release_idempotency_key", keys.release)
+    monkeypatch.setattr(idempotency, "purge_idempotency_keys", lambda hours: 0)
+    monkeypatch.setattr(idempotency, "_completed", idempotency.OrderedDict())
+    monkeypatch.setattr(idempotency, "_in_flight", {})
+    monkeypatch.setattr(idempotency, "IN_PROGRESS_WAIT_SECONDS", 0.2)
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL_SECONDS", 0.01)
+    return keys
+
+
+def _no_replay(order_id):
+    raise AssertionError("nothing to replay")
+
+
+def test_completed_key_replays_the_stored_response(keys):
+    assert idempotency.begin("k1", "fp", _no_replay) is None
+    idempotency.complete("k1", "fp", 42, '{"ORDER_ID": 42}')
+
+    assert idempotency.begin("k1", "fp", _no_replay) == '{"ORDER_ID": 42}'
+    # Another worker (empty front cache) reads it from the table
+    idempotency._completed.clear()
+    assert idempotency.begin("k1", "fp", _no_replay) == '{"ORDER_ID": 42}'
+
+
+def test_different_body_with_the_same_key_is_rejected(keys):
+    idempotency.begin("k1", "fp", _no_replay)
+    idempotency.complete("k1", "fp", 42, '{"ORDER_ID": 42}')
+
+    with pytest.raises(idempotency.IdempotencyError) as cached:
+        idempotency.begin("k1", "other", _no_replay)
+    idempotency._completed.clear()
+    with pytest.raises(idempotency.IdempotencyError) as stored:
+        idempotency.begin("k1", "other", _no_replay)
+
+    assert cached.value.status_code == stored.value.status_code == 422
+
+
+def test_failed_attempt_without_an_order_frees_the_key(keys):
+    idempotency.begin("k1", "fp", _no_replay)
+    assert idempotency.abandon("k1", "fp", _no_replay) is None
+    assert "k1" not in keys.rows
+    assert idempotency.begin("k1", "fp", _no_replay) is None
+
+
+def test_duplicate_waits_then_gives_up_with_409(keys):
+    keys.claim("k1", "fp")  # held by another worker
+
+    with pytest.raises(idempotency.IdempotencyError) as error:
+        idempotency.begin("k1", "fp", _no_replay)
+    assert error.value.status_code == 409
+
+
+def test_stale_key_with_an_order_is_completed_with_it(keys):
+    keys.claim("k1", "fp")
+    keys.rows["k1"].update(ORDER_ID=42, AGE_SECONDS=idempotency.IDEMPOTENCY_LEASE_SECONDS)
+
+    body = idempotency.begin("k1", "fp", lambda order_id: json.dumps({"ORDER_ID": order_id}))
+
+    assert json.loads(body) == {"ORDER_ID": 42}
+    assert keys.rows["k1"]["STATUS"] == "COMPLETED"
+
+
+ORDER = orders.OrderCreate(
+    user_id=1, RESTAURANT_ID=2, items=[{"MENU_ITEM_ID": 3, "QUANTITY": 1}],
+    delivery_address="1 Main St", PAYMENT_METHOD="card",
+)
+
+
+def _placed_but_unreadable(keys):
+    def place(order_data, idempotency_key=None):
+        # create_order recorded the ORDER_ID on the key, then the read-back failed
+        keys.rows[idempotency_key]["ORDER_ID"] = 42
+        return None
+    return place
+
+
+def test_order_read_back_failure_never_stores_null(keys, monkeypatch):
+    monkeypatch.setattr(orders, "_place_order", _placed_but_unreadable(keys))
+    monkeypatch.setattr(orders, "_order_response", lambda order_id: None)
+
+    with pytest.raises(HTTPException) as error:
+        orders.place_order(ORDER, idempotency_key="k1")
+
+    assert error.value.status_code == 503
+    row = keys.rows["k1"]
+    assert (row["STATUS"], row["ORDER_ID"], row["RESPONSE_BODY"]) == ("IN_PROGRESS", 42, None)
+
+    # Once the lease runs out a retry replays the order instead of placing another
+    row["AGE_SECONDS"] = idempotency.IDEMPOTENCY_LEASE_SECONDS
+    monkeypatch.setattr(orders, "_place_order", lambda *args: pytest.fail("placed a second order"))
+    monkeypatch.setattr(orders, "_order_response", lambda order_id: json.dumps({"ORDER_ID": order_id}))
+    response = orders.place_order(ORDER, idempotency_key="k1")
+
+    assert json.loads(response.body) == {"ORDER_ID": 42}
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert keys.rows["k1"]["STATUS"] == "COMPLETED"
+
+
+def test_order_read_back_retried_once_before_answering(keys, monkeypatch):
+    monkeypatch.setattr(orders, "_place_order", _placed_but_unreadable(keys))
+    monkeypatch.setattr(orders, "_order_response", lambda order_id: json.dumps({"ORDER_ID": order_id}))
+
+    response = orders.place_order(ORDER, idempotency_key="k1")
+
+    assert json.loads(response.body) == {"ORDER_ID": 42}
+    assert keys.rows["k1"]["RESPONSE_BODY"] == '{"ORDER_ID": 42}'
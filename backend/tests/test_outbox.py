@@ -0,0 +1,125 @@
+# backend/tests/test_outbox.py
+"""outbox: gap handling in _ready and the REVENUE_DAILY deltas of a batch"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import outbox
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """outbox's monotonic clock, moved by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(outbox.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(outbox, "_gaps", defaultdict(dict))
+    monkeypatch.setattr(outbox, "_stats", dict.fromkeys(outbox._stats, 0))
+    return now
+
+
+def _ids(events):
+    return [e["OUTBOX_ID"] for e in events]
+
+
+def _batch(*ids):
+    return [{"OUTBOX_ID": i} for i in ids]
+
+
+def test_contiguous_events_are_all_ready(clock):
+    ready, skipped = outbox._ready("relay", 10, _batch(11, 12, 13))
+
+    assert (_ids(ready), skipped) == ([11, 12, 13], [])
+
+
+def test_a_gap_holds_back_later_events_until_it_expires(clock):
+    # 12 not committed yet (a transaction still open, or rolled back)
+    ready, skipped = outbox._ready("relay", 10, _batch(11, 13, 14))
+    assert (_ids(ready), skipped) == ([11], [])
+
+    clock[0] += outbox.OUTBOX_GAP_SECONDS / 2
+    ready, skipped = outbox._ready("relay", 11, _batch(13, 14))
+    assert (_ids(ready), skipped) == ([], [])
+
+    clock[0] += outbox.OUTBOX_GAP_SECONDS
+    ready, skipped = outbox._ready("relay", 11, _batch(13, 14))
+    assert (_ids(ready), skipped) == ([13, 14], [12])
+    assert outbox._stats["gaps_skipped"] == 1
+    assert outbox._gaps["relay"] == {}
+
+
+def test_a_gap_that_fills_in_time_is_forgotten(clock):
+    outbox._ready("relay", 10, _batch(12))
+    ready, skipped = outbox._ready("relay", 10, _batch(11, 12))
+
+    assert (_ids(ready), skipped) == ([11, 12], [])
+    assert outbox._gaps["relay"] == {}
+
+
+def test_positions_are_tracked_per_owner(clock):
+    outbox._ready("relay", 10, _batch(12))
+    clock[0] += outbox.OUTBOX_GAP_SECONDS + 1
+
+    # The consumer's first look at the same gap starts its own timer
+    assert _ids(outbox._ready("revenue_daily", 10, _batch(12))[0]) == []
+    assert _ids(outbox._ready("relay", 10, _batch(12))[0]) == [12]
+
+
+MONDAY = datetime(2026, 1, 5, 18, 30)
+
+
+def _event(aggregate, event_type, created_at=MONDAY, **payload):
+    return {"AGGREGATE": aggregate, "EVENT_TYPE": event_type, "CREATED_AT": created_at,
+            "PAYLOAD": {"RESTAURANT_ID": 7, **payload}}
+
+
+AMOUNTS = {"TOTAL_AMOUNT": 30.5, "PLATFORM_COMMISSION": "3.15", "SERVICE_FEE": "2.99"}
+
+
+def _rows(events):
+    return {(day, restaurant): tuple(rest) for day, restaurant, *rest in outbox._revenue_deltas(events)}
+
+
+def test_orders_count_on_the_day_they_are_delivered():
+    rows = _rows([
+        _event("ORDER", "created", STATUS="CONFIRMED", **AMOUNTS),
+        _event("ORDER", "status_changed", FROM="CONFIRMED", TO="OUT_FOR_DELIVERY", **AMOUNTS),
+        _event("ORDER", "status_changed", FROM="OUT_FOR_DELIVERY", TO="DELIVERED", **AMOUNTS),
+        _event("DELIVERY", "status_changed", FROM="IN_TRANSIT", TO="DELIVERED", DELIVERY_PLATFORM_CUT="0.60"),
+    ])
+
+    assert rows == {(date(2026, 1, 5), 7): (1, Decimal("30.5"), Decimal("3.15"), Decimal("2.99"), Decimal("0.60"))}
+
+
+def test_leaving_delivered_takes_the_order_back_out():
+    rows = _rows([
+        _event("ORDER", "created", STATUS="DELIVERED", **AMOUNTS),
+        _event("ORDER", "status_changed", datetime(2026, 1, 6, 9), FROM="DELIVERED", TO="CANCELLED", **AMOUNTS),
+    ])
+
+    assert rows[(date(2026, 1, 5), 7)][:2] == (1, Decimal("30.5"))
+    assert rows[(date(2026, 1, 6), 7)][:2] == (-1, Decimal("-30.5"))
+
+
+def test_repriced_events_correct_the_day_they_name():
+    rows = _rows([
+        # Recomputed on the 20th for an order delivered on the 5th
+        _event("ORDER", "repriced", datetime(2026, 1, 20, 3), DAY="2026-01-05",
+               PLATFORM_COMMISSION_CHANGE="0.45", SERVICE_FEE_CHANGE="-0.50"),
+        _event("DELIVERY", "repriced", datetime(2026, 1, 20, 3), DAY="2026-01-05",
+               DELIVERY_PLATFORM_CUT_CHANGE="0.15"),
+    ])
+
+    assert rows == {(date(2026, 1, 5), 7): (0, Decimal("0"), Decimal("0.45"), Decimal("-0.50"), Decimal("0.15"))}
+
+
+def test_events_that_do_not_move_revenue_are_ignored():
+    assert _rows([
+        _event("ORDER", "created", STATUS="PENDING", **AMOUNTS),
+        _event("ORDER", "item_added", MENU_ITEM_ID=3),
+        _event("DELIVERY", "reassigned", FROM="FAILED", TO="ASSIGNED"),
+        {"AGGREGATE": "ORDER", "EVENT_TYPE": "created", "CREATED_AT": MONDAY,
+         "PAYLOAD": {"STATUS": "DELIVERED", **AMOUNTS}},  # no RESTAURANT_ID
+    ]) == {}
@@ -0,0 +1,61 @@
+# backend/tests/test_payments.py
+"""payments: settling errors are retried a bounded number of times; sweeps claim what they queue"""
+
+import pytest
+
+import payments
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(payments, "_tracked", set())
+    monkeypatch.setattr(payments, "_stats", dict.fromkeys(payments._stats, 0))
+    monkeypatch.setattr(payments, "_schedule", lambda job, delay: scheduled.append(delay))
+    return scheduled
+
+
+def _job(payment_id=1):
+    payments._tracked.add(payment_id)
+    return {"PAYMENT_ID": payment_id, "ORDER_ID": 10, "RESTAURANT_ID": 7, "AMOUNT": 20.0,
+            "METHOD": "CREDIT_CARD", "attempt": 0}
+
+
+def test_a_job_that_always_raises_is_given_up(queue):
+    job = _job()
+    for _ in range(payments.PAYMENT_MAX_ATTEMPTS):
+        payments._retry_or_abandon(job, RuntimeError("boom"))
+
+    assert len(queue) == payments.PAYMENT_MAX_ATTEMPTS - 1
+    assert queue == sorted(queue) and queue[1] == 2 * queue[0]
+    assert 1 not in payments._tracked
+    assert payments._stats["abandoned"] == 1
+
+
+def test_settling_without_a_database_is_bounded(queue, monkeypatch):
+    monkeypatch.setattr(payments, "settle_payment", lambda *args, **kwargs: None)
+    monkeypatch.setattr(payments.dispatch, "assign", lambda restaurant_id: None)
+    monkeypatch.setattr(payments.dispatch, "release", lambda driver_id: None)
+    monkeypatch.setattr(payments.eta, "estimate", lambda restaurant_id: None)
+    job = _job()
+
+    for _ in range(payments.PAYMENT_MAX_ATTEMPTS):
+        payments._settle(job, "ref")
+
+    assert len(queue) == payments.PAYMENT_MAX_ATTEMPTS - 1
+    assert payments._stats["abandoned"] == 1
+
+
+def test_sweeps_queue_only_what_they_claimed(queue, monkeypatch):
+    claims = []
+    pending = [{"PAYMENT_ID": i, "ORDER_ID": i, "AMOUNT": 5, "METHOD": "CASH", "RESTAURANT_ID": 7} for i in (1, 2)]
+
+    def claim(claimed_by, older_than_seconds, lease_seconds):
+        claims.append(claimed_by)
+        return pending if len(claims) == 1 else []  # the second sweep finds them claimed
+
+    monkeypatch.setattr(payments, "claim_pending_payments", claim)
+
+    assert payments.sweep() == 2
+    assert payments.sweep() == 0
+    assert len(set(claims)) == 2  # every sweep claims under its own token
@@ -0,0 +1,88 @@
+# backend/tests/test_reconcile.py
+"""reconcile.find_discrepancies: one check per kind of mismatch, on window-shaped DataFrames"""
+
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+import pricing
+import reconcile
+
+SUBTOTAL = Decimal("24.50")
+
+
+def _order(order_id, **overrides):
+    """A consistent order row as read_window returns it (MySQL DECIMALs), then the overrides"""
+    quote = pricing.quote([(SUBTOTAL, 1)])
+    row = {
+        "ORDER_ID": order_id,
+        "STATUS": "DELIVERED",
+        "TOTAL_AMOUNT": quote.total,
+        "PLATFORM_COMMISSION": pricing.platform_commission(SUBTOTAL),
+        "SERVICE_FEE": pricing.SERVICE_FEE,
+        "PLATFORM_PROFIT_ORDER": pricing.order_platform_profit(SUBTOTAL),
+        "SUBTOTAL": SUBTOTAL,
+        "PAYMENTS": 1,
+        "COMPLETED_PAYMENTS": Decimal(1),  # SUM() comes back as DECIMAL
+        "PAID_AMOUNT": quote.total,
+        "DELIVERIES": 1,
+        "DELIVERY_FEE_TOTAL": pricing.DELIVERY_FEE,
+        "DELIVERY_PLATFORM_CUT": pricing.DELIVERY_PLATFORM_CUT,
+    }
+    row.update(overrides)
+    return row
+
+
+def _issues(*rows):
+    df = pd.DataFrame.from_records([tuple(r[c] for c in reconcile.COLUMNS) for r in rows],
+                                   columns=reconcile.COLUMNS)
+    report = reconcile.find_discrepancies(df)
+    return list(zip(report["ORDER_ID"], report["ISSUE"]))
+
+
+def test_consistent_orders_have_no_issues():
+    assert _issues(_order(1), _order(2, STATUS="CONFIRMED", DELIVERIES=0,
+                                     DELIVERY_FEE_TOTAL=None, DELIVERY_PLATFORM_CUT=None)) == []
+
+
+def test_empty_window():
+    report = reconcile.find_discrepancies(pd.DataFrame(columns=reconcile.COLUMNS))
+    assert report.empty and list(report.columns) == reconcile.REPORT_COLUMNS
+
+
+@pytest.mark.parametrize("overrides, issue", [
+    ({"PAYMENTS": 0, "COMPLETED_PAYMENTS": Decimal(0), "PAID_AMOUNT": Decimal(0)}, "missing_payment"),
+    ({"DELIVERIES": 0, "DELIVERY_FEE_TOTAL": None, "DELIVERY_PLATFORM_CUT": None}, "missing_delivery"),
+    ({"PAID_AMOUNT": Decimal("1.00")}, "payment_amount"),
+    ({"DELIVERY_FEE_TOTAL": Decimal("4.99")}, "delivery_fee"),
+    ({"PLATFORM_PROFIT_ORDER": Decimal("0.00")}, "platform_profit"),
+])
+def test_each_check(overrides, issue):
+    assert _issues(_order(1, **overrides)) == [(1, issue)]
+
+
+def test_amounts_within_tolerance_pass():
+    total = pricing.quote([(SUBTOTAL, 1)]).total
+    assert _issues(_order(1, PAID_AMOUNT=total + Decimal("0.01"))) == []
+
+
+def test_wrong_total_and_commission():
+    assert _issues(_order(1, TOTAL_AMOUNT=Decimal("10.00"), PAID_AMOUNT=Decimal("10.00"),
+                          PLATFORM_COMMISSION=Decimal("9.99"), PLATFORM_PROFIT_ORDER=Decimal("12.98"))) == [
+        (1, "order_total"), (1, "platform_commission"),
+    ]
+
+
+def test_orders_without_items_skip_the_price_checks():
+    assert _issues(_order(1, SUBTOTAL=None, TOTAL_AMOUNT=Decimal("99.00"), PAID_AMOUNT=Decimal("99.00"))) == []
+
+
+def test_payment_status_checks():
+    total = pricing.quote([(SUBTOTAL, 1)]).total
+    paid_twice = _order(1, PAYMENTS=2, COMPLETED_PAYMENTS=Decimal(2), PAID_AMOUNT=2 * total)
+    cancelled = _order(2, STATUS="CANCELLED", DELIVERIES=0, DELIVERY_FEE_TOTAL=None, DELIVERY_PLATFORM_CUT=None)
+
+    assert _issues(cancelled, paid_twice) == [
+        (1, "duplicate_payment"), (1, "payment_amount"), (2, "cancelled_but_paid"),
+    ]
@@ -0,0 +1,133 @@
+# backend/tests/test_singleflight.py
+"""coalesce: identical concurrent reads share a flight, pinned reads never do"""
+
+import threading
+import time
+
+import pytest
+
+from database import singleflight
+from database.connection import primary
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    flights = singleflight.SingleFlight()
+    monkeypatch.setattr(singleflight, "flights", flights)
+    return flights
+
+
+def _slow_query(started, release, read_only=False):
+    """A coalesced query that blocks until released and returns its call number"""
+    calls = []
+
+    @singleflight.coalesce(read_only=read_only)
+    def get_thing(thing_id):
+        calls.append(thing_id)
+        number = len(calls)
+        started.set()
+        release.wait(5)
+        return {"call": number}
+
+    return get_thing, calls
+
+
+def _in_thread(fn, results, pin=False):
+    def run():
+        if pin:
+            with primary():
+                results.append(fn(1))
+        else:
+            results.append(fn(1))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_identical_calls_share_one_flight(flights):
+    started, release, results = threading.Event(), threading.Event(), []
+    get_thing, calls = _slow_query(started, release)
+
+    leader = _in_thread(get_thing, results)
+    started.wait(5)
+    follower = _in_thread(get_thing, results)
+    _wait_for(lambda: flights.stats()["get_thing"]["coalesced"])
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert calls == [1]
+    assert results[0] is results[1]
+    assert flights.stats()["get_thing"] == {"calls": 2, "executed": 1, "coalesced": 1, "pinned": 0}
+
+
+def test_pinned_call_never_joins_an_earlier_flight(flights):
+    started, release, results = threading.Event(), threading.Event(), []
+    get_thing, calls = _slow_query(started, release, read_only=True)
+
+    leader = _in_thread(get_thing, results)
+    started.wait(5)
+    # Runs its own query while the unpinned flight is still waiting
+    pinned = _in_thread(get_thing, results, pin=True)
+    _wait_for(lambda: len(calls) == 2)
+    release.set()
+    leader.join(5)
+    pinned.join(5)
+
+    assert calls == [1, 1]
+    assert sorted(r["call"] for r in results) == [1, 2]
+    assert flights.stats()["get_thing"] == {"calls": 2, "executed": 2, "coalesced": 0, "pinned": 1}
+
+
+def test_unpinned_call_does_not_join_a_pinned_one(flights):
+    started, release, results = threading.Event(), threading.Event(), []
+    get_thing, calls = _slow_query(started, release)
+
+    pinned = _in_thread(get_thing, results, pin=True)
+    started.wait(5)
+    unpinned = _in_thread(get_thing, results)
+    _wait_for(lambda: len(calls) == 2)
+    release.set()
+    pinned.join(5)
+    unpinned.join(5)
+
+    assert calls == [1, 1]
+    assert flights.stats()["get_thing"]["coalesced"] == 0
+
+
+def test_errors_reach_every_waiter(flights):
+    started, release = threading.Event(), threading.Event()
+
+    @singleflight.coalesce
+    def get_broken(thing_id):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("database gone")
+
+    errors = []
+
+    def run():
+        try:
+            get_broken(1)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=run))
+    threads[1].start()
+    _wait_for(lambda: flights.stats()["get_broken"]["coalesced"])
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
@@ -0,0 +1,88 @@
+# backend/tests/test_tracking.py
+"""tracking._fan_out: published and relayed copies of a change reach subscribers once, in order"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import tracking
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = asyncio.Queue(maxsize=tracking.SUBSCRIBER_QUEUE_SIZE)
+    monkeypatch.setattr(tracking, "_subscribers", {7: {queue}})
+    monkeypatch.setattr(tracking, "_last_sent", {})
+    monkeypatch.setattr(tracking, "_stats", dict.fromkeys(tracking._stats, 0))
+    return queue
+
+
+def _published(status, from_status):
+    return tracking._event(7, 3, status, from_status)
+
+
+def _relayed(status, from_status, outbox_id):
+    return tracking._event(7, 3, status, from_status, datetime(2026, 1, 1), outbox_id)
+
+
+def _sent(queue):
+    statuses = []
+    while not queue.empty():
+        statuses.append(queue.get_nowait()["DELIVERY_STATUS"])
+    return statuses
+
+
+def test_relay_replay_after_two_quick_changes_is_skipped(queue):
+    tracking.seed(7, {"DELIVERY_ID": 3, "DELIVERY_STATUS": "ASSIGNED"})
+    for event in [
+        _published("PICKED_UP", "ASSIGNED"),
+        _published("IN_TRANSIT", "PICKED_UP"),
+        _relayed("PICKED_UP", "ASSIGNED", 10),
+        _relayed("IN_TRANSIT", "PICKED_UP", 11),
+    ]:
+        tracking._fan_out(event)
+
+    assert _sent(queue) == ["PICKED_UP", "IN_TRANSIT"]
+    assert tracking._stats["duplicates"] == 2
+
+
+def test_relay_fills_a_change_the_bridge_lost(queue):
+    tracking.seed(7, {"DELIVERY_ID": 3, "DELIVERY_STATUS": "ASSIGNED"})
+    tracking._fan_out(_relayed("PICKED_UP", "ASSIGNED", 10))
+    tracking._fan_out(_published("IN_TRANSIT", "PICKED_UP"))
+    # Relayed copy of the published change, then a late repeat of an older event
+    tracking._fan_out(_relayed("IN_TRANSIT", "PICKED_UP", 11))
+    tracking._fan_out(_relayed("PICKED_UP", "ASSIGNED", 9))
+
+    assert _sent(queue) == ["PICKED_UP", "IN_TRANSIT"]
+
+
+def test_events_older_than_the_snapshot_are_skipped(queue):
+    tracking.seed(7, {"DELIVERY_ID": 3, "DELIVERY_STATUS": "IN_TRANSIT"})
+    tracking._fan_out(_relayed("PICKED_UP", "ASSIGNED", 10))
+    tracking._fan_out(_published("DELIVERED", "IN_TRANSIT"))
+
+    assert _sent(queue) == ["DELIVERED"]
+
+
+def test_reassignment_follows_a_failure(queue):
+    tracking.seed(7, {"DELIVERY_ID": 3, "DELIVERY_STATUS": "PICKED_UP"})
+    for event in [
+        _published("FAILED", "PICKED_UP"),
+        _published("ASSIGNED", "FAILED"),
+        _relayed("FAILED", "PICKED_UP", 20),
+        _relayed("ASSIGNED", "FAILED", 21),
+        _published("PICKED_UP", "ASSIGNED"),
+    ]:
+        tracking._fan_out(event)
+
+    assert _sent(queue) == ["FAILED", "ASSIGNED", "PICKED_UP"]
+
+
+def test_events_without_a_from_status_only_move_forward(queue):
+    tracking._fan_out(_published("IN_TRANSIT", None))
+    tracking._fan_out(_published("PICKED_UP", None))
+    tracking._fan_out(_published("DELIVERED", None))
+
+    assert _sent(queue) == ["IN_TRANSIT", "DELIVERED"]
@@ -0,0 +1,238 @@
+# backend/tracking.py
+"""
+Delivery tracking push (SSE / WebSocket subscribers)
+update_delivery_status() calls publish() after it commits. Each worker keeps
+a per-order set of subscriber queues on its event loop, so an idle
+subscriber costs one small asyncio.Queue. Workers forward events to each
+other over Unix datagram sockets in TRACKING_BRIDGE_DIR (a stand-in for a
+real broker): one socket per worker, stale ones are removed on first failure.
+The outbox relay (outbox.py) calls deliver() for every delivery change any
+process commits, which covers datagrams the bridge lost. So every change
+arrives at least twice, possibly out of order: an event is only fanned out
+when it continues from the status subscribers were last sent (its FROM
+status, e.g. PICKED_UP -> IN_TRANSIT after PICKED_UP) and, for relayed
+events, has a higher OUTBOX_ID than the last one sent; anything else is a
+repeat or older than what they already have, and is skipped.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+TRACKING_BRIDGE_DIR = os.getenv("TRACKING_BRIDGE_DIR", "/tmp/restaurant-tracking")
+SUBSCRIBER_QUEUE_SIZE = 16
+PEER_REFRESH_SECONDS = 2.0
+# FAILED is not final: dispatch hands the delivery to another driver (FAILED -> ASSIGNED)
+FINAL_STATUSES = ("DELIVERED",)
+# Order of the delivery state machine, for events that don't say where they came from
+STATUS_RANK = {"ASSIGNED": 0, "PICKED_UP": 1, "IN_TRANSIT": 2, "FAILED": 3, "DELIVERED": 3}
+
+_loop = None
+_subscribers = {}  # order_id -> set of asyncio.Queue
+_last_sent = {}  # order_id -> (DELIVERY_ID, status, OUTBOX_ID) last fanned out, while it has subscribers
+_sock = None
+_sock_path = None
+_peers = []
+_peers_at = 0.0
+_peers_lock = threading.Lock()
+_stats = {"published": 0, "delivered": 0, "dropped": 0, "duplicates": 0, "bridged_in": 0, "bridged_out": 0}
+
+
+# ==================== LOCAL FAN-OUT ====================
+
+def subscribe(order_id):
+    """New subscriber queue for an order (call on the event loop)"""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers.setdefault(order_id, set()).add(queue)
+    return queue
+
+
+def seed(order_id, delivery):
+    """Start an order's de-duplication from a snapshot read after subscribe() (on the event loop)"""
+    if order_id in _subscribers:
+        _last_sent.setdefault(order_id, (delivery["DELIVERY_ID"], delivery["DELIVERY_STATUS"], None))
+
+
+def unsubscribe(order_id, queue):
+    queues = _subscribers.get(order_id)
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            del _subscribers[order_id]
+            _last_sent.pop(order_id, None)
+
+
+def _is_newer(event, last):
+    """Does `event` move an order's subscribers on from `last` (see module docstring)?"""
+    if last is None:
+        return True
+    delivery_id, status, outbox_id = last
+    if event["DELIVERY_ID"] != delivery_id:
+        return True
+    if event.get("OUTBOX_ID") is not None and outbox_id is not None and event["OUTBOX_ID"] <= outbox_id:
+        return False
+    if event.get("FROM_STATUS") is not None:
+        return event["FROM_STATUS"] == status
+    return STATUS_RANK.get(event["DELIVERY_STATUS"], -1) > STATUS_RANK.get(status, -1)
+
+
+def _fan_out(event):
+    queues = tuple(_subscribers.get(event["ORDER_ID"], ()))
+    if not queues:
+        return
+    last = _last_sent.get(event["ORDER_ID"])
+    if not _is_newer(event, last):
+        _stats["duplicates"] += 1
+        return
+    outbox_id = event.get("OUTBOX_ID")
+    if outbox_id is None and last is not None and last[0] == event["DELIVERY_ID"]:
+        outbox_id = last[2]
+    _last_sent[event["ORDER_ID"]] = (event["DELIVERY_ID"], event["DELIVERY_STATUS"], outbox_id)
+    for queue in queues:
+        try:
+            queue.put_nowait(event)
+            _stats["delivered"] += 1
+        except asyncio.QueueFull:
+            # A stuck client only ever needs the newest status
+            queue.get_nowait()
+            queue.put_nowait(event)
+            _stats["dropped"] += 1
+
+
+def _deliver_local(event):
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _loop:
+        _fan_out(event)
+    else:
+        _loop.call_soon_threadsafe(_fan_out, event)
+
+
+# ==================== CROSS-WORKER BRIDGE ====================
+
+def _refresh_peers():
+    global _peers, _peers_at
+    with _peers_lock:
+        if time.monotonic() - _peers_at > PEER_REFRESH_SECONDS:
+            _peers = [p for p in glob.glob(os.path.join(TRACKING_BRIDGE_DIR, "tracking-*.sock")) if p != _sock_path]
+            _peers_at = time.monotonic()
+        return list(_peers)
+
+
+def _bridge_out(data):
+    for path in _refresh_peers():
+        try:
+            _sock.sendto(data, path)
+            _stats["bridged_out"] += 1
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Worker is gone: forget its socket
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            with _peers_lock:
+                if path in _peers:
+                    _peers.remove(path)
+        except OSError as e:
+            print(f"⚠️  Tracking bridge send to {path} failed: {e}")
+
+
+def _bridge_in():
+    while True:
+        try:
+            data = _sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            continue
+        _stats["bridged_in"] += 1
+        _fan_out(event)
+
+
+# ==================== PUBLIC API ====================
+
+def _event(order_id, delivery_id, status, from_status, updated_at=None, outbox_id=None):
+    return {
+        "ORDER_ID": order_id,
+        "DELIVERY_ID": delivery_id,
+        "FROM_STATUS": from_status,
+        "DELIVERY_STATUS": status,
+        "UPDATED_AT": (updated_at or datetime.now()).isoformat(timespec="seconds"),
+        "OUTBOX_ID": outbox_id,
+    }
+
+
+def publish(order_id, delivery_id, status, from_status):
+    """Announce a committed delivery status change (safe from any thread)"""
+    event = _event(order_id, delivery_id, status, from_status)
+    _stats["published"] += 1
+    _deliver_local(event)
+    if _sock is not None:
+        _bridge_out(json.dumps(event).encode("utf-8"))
+
+
+def deliver(order_id, delivery_id, status, from_status, updated_at=None, outbox_id=None):
+    """Send a change to this worker's subscribers only (the outbox relay runs in every worker)"""
+    _deliver_local(_event(order_id, delivery_id, status, from_status, updated_at, outbox_id))
+
+
+def start():
+    """Bind this worker to the running loop and open its bridge socket"""
+    global _loop, _sock, _sock_path
+    _loop = asyncio.get_running_loop()
+    if _sock is not None or not hasattr(socket, "AF_UNIX"):
+        return
+
+    try:
+        os.makedirs(TRACKING_BRIDGE_DIR, exist_ok=True)
+        path = os.path.join(TRACKING_BRIDGE_DIR, f"tracking-{os.getpid()}.sock")
+        if os.path.exists(path):
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sock.setblocking(False)
+    except OSError as e:
+        # Push still works for subscribers on this worker
+        print(f"⚠️  Tracking bridge disabled: {e}")
+        return
+
+    _sock, _sock_path = sock, path
+    _loop.add_reader(sock.fileno(), _bridge_in)
+
+
+def stop():
+    global _sock, _sock_path
+    if _sock is None:
+        return
+    if _loop is not None and not _loop.is_closed():
+        _loop.remove_reader(_sock.fileno())
+    _sock.close()
+    try:
+        os.unlink(_sock_path)
+    except OSError:
+        pass
+    _sock, _sock_path = None, None
+
+
+def stats():
+    return {
+        "orders": len(_subscribers),
+        "subscribers": sum(len(q) for q in _subscribers.values()),
+        "bridge": _sock_path,
+        **_stats,
+    }
@@ -9,10 +9,10 @@ BEGIN
     DECLARE serviceFee DECIMAL(10,2) DEFAULT 2.99;
     DECLARE totalProfit DECIMAL(10,2) DEFAULT 0.00;
 
-    -- Get subtotal from ORDERITEMS table
+    -- Get subtotal from ORDER_ITEMS table
     SELECT SUM(price * quantity)
     INTO subtotal
-    FROM ORDERITEMS
+    FROM ORDER_ITEMS
     WHERE ORDER_ID = input_order_id;
 
     -- Handle NULL subtotal (in case of empty order)
@@ -21,7 +21,7 @@ BEGIN
     END IF;
 
     -- Calculate
-    SET commission = subtotal * 0.15;
+    SET commission = ROUND(subtotal * 0.15, 2);
     SET totalProfit = commission + serviceFee;
 
     -- Update ORDERS table with results
@@ -0,0 +1,17 @@
+USE restaurant_ordering;
+
+-- Append-only history of delivery status changes (backend/events.py)
+-- Rows are buffered per worker and written in multi-row INSERTs; RESTAURANT_ID
+-- is copied from ORDERS so stage reports only need the second index
+CREATE TABLE IF NOT EXISTS DELIVERY_EVENTS (
+    EVENT_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    DELIVERY_ID INT NOT NULL,
+    ORDER_ID INT NOT NULL,
+    RESTAURANT_ID INT NULL,
+    DRIVER_ID INT NOT NULL,
+    FROM_STATUS ENUM('ASSIGNED','PICKED_UP','IN_TRANSIT','DELIVERED','FAILED') NULL,
+    TO_STATUS ENUM('ASSIGNED','PICKED_UP','IN_TRANSIT','DELIVERED','FAILED') NOT NULL,
+    CREATED_AT DATETIME(3) NOT NULL,
+    INDEX IDX_EVENTS_DELIVERY (DELIVERY_ID, CREATED_AT),
+    INDEX IDX_EVENTS_RESTAURANT (RESTAURANT_ID, CREATED_AT)
+);
@@ -0,0 +1,6 @@
+USE restaurant_ordering;
+
+-- Driver work queue (GET /api/deliveries/driver/{driver_id}): a driver's
+-- active deliveries without scanning every delivery they ever made.
+-- InnoDB appends DELIVERY_ID, which the keyset pagination orders by
+CREATE INDEX IDX_DELIVERIES_DRIVER_STATUS ON DELIVERIES (DRIVER_ID, DELIVERY_STATUS);
@@ -0,0 +1,22 @@
+USE restaurant_ordering;
+
+-- Driver positions written by backend/locations.py
+-- Pings are coalesced in memory: one row per driver holds the latest point,
+-- and each active delivery keeps a downsampled trail
+CREATE TABLE IF NOT EXISTS DRIVER_LOCATIONS (
+    DRIVER_ID INT PRIMARY KEY,
+    LATITUDE DECIMAL(9,6) NOT NULL,
+    LONGITUDE DECIMAL(9,6) NOT NULL,
+    RECORDED_AT TIMESTAMP NOT NULL,
+    FOREIGN KEY (DRIVER_ID) REFERENCES USERS(USER_ID)
+);
+
+CREATE TABLE IF NOT EXISTS DELIVERY_TRAIL (
+    TRAIL_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    DELIVERY_ID INT NOT NULL,
+    LATITUDE DECIMAL(9,6) NOT NULL,
+    LONGITUDE DECIMAL(9,6) NOT NULL,
+    RECORDED_AT TIMESTAMP NOT NULL,
+    INDEX IDX_TRAIL_DELIVERY (DELIVERY_ID, RECORDED_AT),
+    FOREIGN KEY (DELIVERY_ID) REFERENCES DELIVERIES(DELIVERY_ID)
+);
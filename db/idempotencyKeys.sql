@@ -0,0 +1,15 @@
+USE restaurant_ordering;
+
+-- One row per Idempotency-Key sent to POST /api/orders
+-- The PRIMARY KEY is what stops two concurrent retries from both placing the order
+CREATE TABLE IF NOT EXISTS IDEMPOTENCY_KEYS (
+    IDEMPOTENCY_KEY VARCHAR(100) PRIMARY KEY,
+    REQUEST_FINGERPRINT CHAR(64) NOT NULL,
+    STATUS ENUM('IN_PROGRESS','COMPLETED') NOT NULL DEFAULT 'IN_PROGRESS',
+    ORDER_ID INT NULL,
+    RESPONSE_BODY MEDIUMTEXT NULL,
+    CREATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    COMPLETED_AT TIMESTAMP NULL,
+    INDEX IDX_IDEMPOTENCY_CREATED (CREATED_AT),
+    FOREIGN KEY (ORDER_ID) REFERENCES ORDERS(ORDER_ID)
+);
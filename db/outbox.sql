@@ -0,0 +1,120 @@
+USE restaurant_ordering;
+
+-- Transactional outbox (backend/outbox.py)
+-- queries.py inserts one row per change to ORDERS / PAYMENTS / DELIVERIES in
+-- the same transaction as the change; the triggers below do the same for
+-- RESTAURANT and MENU, which are edited outside the app. Every worker tails
+-- OUTBOX by OUTBOX_ID for its caches; shared consumers (REVENUE_DAILY) keep
+-- their position in OUTBOX_CHECKPOINTS, updated in the transaction that
+-- applies the events.
+CREATE TABLE IF NOT EXISTS OUTBOX (
+    OUTBOX_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    AGGREGATE ENUM('ORDER','DELIVERY','RESTAURANT','MENU') NOT NULL,
+    AGGREGATE_ID INT NOT NULL,
+    EVENT_TYPE VARCHAR(30) NOT NULL,
+    PAYLOAD JSON NOT NULL,
+    CREATED_AT DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    INDEX IDX_OUTBOX_CREATED (CREATED_AT)
+);
+
+CREATE TABLE IF NOT EXISTS OUTBOX_CHECKPOINTS (
+    CONSUMER VARCHAR(64) PRIMARY KEY,
+    LAST_OUTBOX_ID BIGINT NOT NULL DEFAULT 0,
+    UPDATED_AT DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+);
+
+-- OUTBOX_IDs a shared consumer moved past while they were missing (still in
+-- flight, or rolled back); re-checked on every step until they commit or
+-- OUTBOX_LATE_SECONDS pass
+CREATE TABLE IF NOT EXISTS OUTBOX_SKIPPED (
+    CONSUMER VARCHAR(64) NOT NULL,
+    OUTBOX_ID BIGINT NOT NULL,
+    SKIPPED_AT DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (CONSUMER, OUTBOX_ID)
+);
+
+-- Revenue of DELIVERED orders per day and restaurant (the day an order
+-- became DELIVERED; a delivery's platform cut on the day the delivery was
+-- DELIVERED), kept current by the "revenue_daily" outbox consumer
+CREATE TABLE IF NOT EXISTS REVENUE_DAILY (
+    DAY DATE NOT NULL,
+    RESTAURANT_ID INT NOT NULL,
+    TOTAL_ORDERS INT NOT NULL DEFAULT 0,
+    TOTAL_REVENUE DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PLATFORM_COMMISSION DECIMAL(14,2) NOT NULL DEFAULT 0,
+    SERVICE_FEES DECIMAL(14,2) NOT NULL DEFAULT 0,
+    DELIVERY_PROFIT DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (DAY, RESTAURANT_ID)
+);
+
+-- Seed the aggregate from existing orders (run with the app stopped);
+-- the consumer starts after the outbox rows that exist now (none).
+-- Same day rule as the consumer: an order is delivered when its delivery
+-- is (DELIVERIES.ACTUAL_TIME); orders without one fall back to ORDER_DATE
+INSERT INTO REVENUE_DAILY
+    (DAY, RESTAURANT_ID, TOTAL_ORDERS, TOTAL_REVENUE, PLATFORM_COMMISSION, SERVICE_FEES, DELIVERY_PROFIT)
+SELECT DAY, RESTAURANT_ID, SUM(ORDERS), SUM(REVENUE), SUM(COMMISSION), SUM(FEES), SUM(CUT)
+FROM (
+    SELECT DATE(COALESCE(d.ACTUAL_TIME, o.ORDER_DATE)) AS DAY, o.RESTAURANT_ID,
+           1 AS ORDERS, o.TOTAL_AMOUNT AS REVENUE, COALESCE(o.PLATFORM_COMMISSION, 0) AS COMMISSION,
+           COALESCE(o.SERVICE_FEE, 0) AS FEES, 0 AS CUT
+    FROM ORDERS o
+    LEFT JOIN DELIVERIES d ON o.ORDER_ID = d.ORDER_ID AND d.DELIVERY_STATUS = 'DELIVERED'
+    WHERE o.STATUS = 'DELIVERED'
+    UNION ALL
+    SELECT DATE(COALESCE(d.ACTUAL_TIME, o.ORDER_DATE)), o.RESTAURANT_ID,
+           0, 0, 0, 0, COALESCE(d.DELIVERY_PLATFORM_CUT, 0)
+    FROM DELIVERIES d
+    JOIN ORDERS o ON o.ORDER_ID = d.ORDER_ID
+    WHERE d.DELIVERY_STATUS = 'DELIVERED'
+) delivered
+GROUP BY DAY, RESTAURANT_ID;
+
+INSERT INTO OUTBOX_CHECKPOINTS (CONSUMER, LAST_OUTBOX_ID)
+SELECT 'revenue_daily', COALESCE(MAX(OUTBOX_ID), 0) FROM OUTBOX;
+
+DELIMITER //
+
+CREATE TRIGGER TRIGGER_RESTAURANT_OUTBOX_INSERT AFTER INSERT ON RESTAURANT
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('RESTAURANT', NEW.RESTAURANT_ID, 'created', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_RESTAURANT_OUTBOX_UPDATE AFTER UPDATE ON RESTAURANT
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('RESTAURANT', NEW.RESTAURANT_ID, 'updated', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_RESTAURANT_OUTBOX_DELETE AFTER DELETE ON RESTAURANT
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('RESTAURANT', OLD.RESTAURANT_ID, 'deleted', JSON_OBJECT('RESTAURANT_ID', OLD.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_MENU_OUTBOX_INSERT AFTER INSERT ON MENU
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('MENU', NEW.MENU_ITEM_ID, 'created', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_MENU_OUTBOX_UPDATE AFTER UPDATE ON MENU
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('MENU', NEW.MENU_ITEM_ID, 'updated', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_MENU_OUTBOX_DELETE AFTER DELETE ON MENU
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('MENU', OLD.MENU_ITEM_ID, 'deleted', JSON_OBJECT('RESTAURANT_ID', OLD.RESTAURANT_ID));
+END //
+
+DELIMITER ;
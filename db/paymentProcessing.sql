@@ -0,0 +1,17 @@
+USE restaurant_ordering;
+
+-- Asynchronous card authorization (backend/payments.py, PAYMENT_MODE=async)
+-- Payments start PENDING; the processor's reference or the failure reason
+-- is stored when they settle. The index lets each worker find PENDING
+-- payments left behind by a worker that died
+ALTER TABLE PAYMENTS
+    ADD COLUMN PROCESSOR_REF VARCHAR(64) NULL,
+    ADD COLUMN FAILURE_REASON VARCHAR(255) NULL,
+    ADD INDEX IDX_PAYMENTS_STATUS (STATUS, PAYMENT_DATE);
+
+-- Sweeps claim the PENDING payments they pick up (CLAIMED_BY, a lease until
+-- CLAIMED_UNTIL), so two workers sweeping at once never queue the same ones
+ALTER TABLE PAYMENTS
+    ADD COLUMN CLAIMED_BY VARCHAR(64) NULL,
+    ADD COLUMN CLAIMED_UNTIL DATETIME NULL,
+    ADD INDEX IDX_PAYMENTS_CLAIM (CLAIMED_BY);
@@ -0,0 +1,123 @@
+USE restaurant_ordering;
+
+-- Set-based profit recomputation (backend/recalculate_profit.py)
+-- Recalculates PLATFORM_COMMISSION, SERVICE_FEE and PLATFORM_PROFIT_ORDER of
+-- every order with from_order_id <= ORDER_ID <= to_order_id (and, when the
+-- dates are not NULL, from_date <= ORDER_DATE < to_date) plus the
+-- DELIVERY_PLATFORM_CUT of their deliveries: two UPDATE ... JOINs instead of
+-- one CALCULATE_ORDER_PROFIT / CALCULATE_DELIVERY_PROFIT call per row.
+-- The rates are parameters so the caller passes pricing.py's values.
+-- For DELIVERED orders / deliveries whose amounts change it also writes a
+-- 'repriced' OUTBOX event with the difference and the day REVENUE_DAILY
+-- counted them on (needs db/outbox.sql), in the caller's transaction.
+-- Returns one row: ORDERS_CHANGED, DELIVERIES_CHANGED
+
+DROP PROCEDURE IF EXISTS RECALCULATE_PROFIT;
+
+DELIMITER //
+
+CREATE PROCEDURE RECALCULATE_PROFIT(
+    IN from_order_id INT,
+    IN to_order_id INT,
+    IN from_date DATETIME,
+    IN to_date DATETIME,
+    IN commission_rate DECIMAL(6,4),
+    IN service_fee DECIMAL(10,2),
+    IN delivery_platform_cut DECIMAL(10,2)
+)
+BEGIN
+    DECLARE orders_changed INT DEFAULT 0;
+
+    -- REVENUE_DAILY follows the change through the outbox (backend/outbox.py);
+    -- read before the UPDATEs below overwrite the old amounts
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    SELECT 'ORDER', o.ORDER_ID, 'repriced', JSON_OBJECT(
+        'ORDER_ID', o.ORDER_ID,
+        'RESTAURANT_ID', o.RESTAURANT_ID,
+        'DAY', DATE(COALESCE(d.ACTUAL_TIME, o.ORDER_DATE)),
+        'PLATFORM_COMMISSION_CHANGE', ROUND(COALESCE(i.SUBTOTAL, 0) * commission_rate, 2) - COALESCE(o.PLATFORM_COMMISSION, 0),
+        'SERVICE_FEE_CHANGE', service_fee - COALESCE(o.SERVICE_FEE, 0)
+    )
+    FROM ORDERS o
+    LEFT JOIN (
+        SELECT ORDER_ID, SUM(PRICE * QUANTITY) AS SUBTOTAL
+        FROM ORDER_ITEMS
+        WHERE ORDER_ID BETWEEN from_order_id AND to_order_id
+        GROUP BY ORDER_ID
+    ) i ON i.ORDER_ID = o.ORDER_ID
+    LEFT JOIN DELIVERIES d ON d.ORDER_ID = o.ORDER_ID AND d.DELIVERY_STATUS = 'DELIVERED'
+    WHERE o.ORDER_ID BETWEEN from_order_id AND to_order_id
+      AND o.STATUS = 'DELIVERED'
+      AND (from_date IS NULL OR o.ORDER_DATE >= from_date)
+      AND (to_date IS NULL OR o.ORDER_DATE < to_date)
+      AND (ROUND(COALESCE(i.SUBTOTAL, 0) * commission_rate, 2) <> COALESCE(o.PLATFORM_COMMISSION, 0)
+           OR service_fee <> COALESCE(o.SERVICE_FEE, 0));
+
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    SELECT 'DELIVERY', d.DELIVERY_ID, 'repriced', JSON_OBJECT(
+        'DELIVERY_ID', d.DELIVERY_ID,
+        'ORDER_ID', d.ORDER_ID,
+        'RESTAURANT_ID', o.RESTAURANT_ID,
+        'DAY', DATE(COALESCE(d.ACTUAL_TIME, o.ORDER_DATE)),
+        'DELIVERY_PLATFORM_CUT_CHANGE', delivery_platform_cut - COALESCE(d.DELIVERY_PLATFORM_CUT, 0)
+    )
+    FROM DELIVERIES d
+    JOIN ORDERS o ON o.ORDER_ID = d.ORDER_ID
+    WHERE d.ORDER_ID BETWEEN from_order_id AND to_order_id
+      AND d.DELIVERY_STATUS = 'DELIVERED'
+      AND (from_date IS NULL OR o.ORDER_DATE >= from_date)
+      AND (to_date IS NULL OR o.ORDER_DATE < to_date)
+      AND delivery_platform_cut <> COALESCE(d.DELIVERY_PLATFORM_CUT, 0);
+
+    -- Subtotals are aggregated over the same ORDER_ID range first, so the
+    -- join is one row per order and ORDER_ITEMS is read by its ORDER_ID index
+    UPDATE ORDERS o
+    LEFT JOIN (
+        SELECT ORDER_ID, SUM(PRICE * QUANTITY) AS SUBTOTAL
+        FROM ORDER_ITEMS
+        WHERE ORDER_ID BETWEEN from_order_id AND to_order_id
+        GROUP BY ORDER_ID
+    ) i ON i.ORDER_ID = o.ORDER_ID
+    SET o.PLATFORM_COMMISSION = ROUND(COALESCE(i.SUBTOTAL, 0) * commission_rate, 2),
+        o.SERVICE_FEE = service_fee,
+        o.PLATFORM_PROFIT_ORDER = ROUND(COALESCE(i.SUBTOTAL, 0) * commission_rate, 2) + service_fee
+    WHERE o.ORDER_ID BETWEEN from_order_id AND to_order_id
+      AND (from_date IS NULL OR o.ORDER_DATE >= from_date)
+      AND (to_date IS NULL OR o.ORDER_DATE < to_date);
+    SET orders_changed = ROW_COUNT();
+
+    UPDATE DELIVERIES d
+    JOIN ORDERS o ON o.ORDER_ID = d.ORDER_ID
+    SET d.DELIVERY_PLATFORM_CUT = delivery_platform_cut
+    WHERE d.ORDER_ID BETWEEN from_order_id AND to_order_id
+      AND (from_date IS NULL OR o.ORDER_DATE >= from_date)
+      AND (to_date IS NULL OR o.ORDER_DATE < to_date);
+
+    SELECT orders_changed AS ORDERS_CHANGED, ROW_COUNT() AS DELIVERIES_CHANGED;
+END //
+
+DELIMITER ;
+
+-- The app computes these columns when it writes the rows; the per-row
+-- trigger only ever matched a 'Completed' status nothing sets
+DROP TRIGGER IF EXISTS TRIGGER_ORDER_COMPLETE;
+
+-- Deployed copies of TRIGGER_NEW_DELIVERY still force a 2.00 cut
+DROP TRIGGER IF EXISTS TRIGGER_NEW_DELIVERY;
+
+DELIMITER //
+
+CREATE TRIGGER TRIGGER_NEW_DELIVERY
+BEFORE INSERT ON DELIVERIES
+FOR EACH ROW
+BEGIN
+    -- Fixed platform cut (pricing.DELIVERY_PLATFORM_CUT)
+    SET NEW.DELIVERY_PLATFORM_CUT = 0.60;
+
+    -- Optional safety
+    IF NEW.DELIVERY_FEE_TOTAL IS NULL THEN
+        SET NEW.DELIVERY_FEE_TOTAL = 0.00;
+    END IF;
+END //
+
+DELIMITER ;
@@ -0,0 +1,7 @@
+USE restaurant_ordering;
+
+-- Restaurant coordinates used by driver dispatch (backend/dispatch.py)
+-- Restaurants without coordinates are dispatched to the least busy driver
+ALTER TABLE RESTAURANT
+    ADD COLUMN LATITUDE DECIMAL(9,6) NULL,
+    ADD COLUMN LONGITUDE DECIMAL(9,6) NULL;
@@ -26,6 +26,8 @@ CREATE TABLE RESTAURANT (
 	STATE VARCHAR(50),
 	ZIPCODE INT,
 	PHONE VARCHAR(50),
+	LATITUDE DECIMAL(9,6),
+	LONGITUDE DECIMAL(9,6),
 	FOREIGN KEY (OWNER_ID) REFERENCES USERS(USER_ID)
 );
 
@@ -77,6 +79,12 @@ CREATE TABLE PAYMENTS (
     METHOD ENUM('CREDIT_CARD','DEBIT_CARD','PAYPAL','CASH') NOT NULL,
     STATUS ENUM('PENDING','COMPLETED','FAILED','REFUNDED') DEFAULT 'PENDING',
     PAYMENT_DATE TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PROCESSOR_REF VARCHAR(64) NULL,
+    FAILURE_REASON VARCHAR(255) NULL,
+    CLAIMED_BY VARCHAR(64) NULL,
+    CLAIMED_UNTIL DATETIME NULL,
+    INDEX IDX_PAYMENTS_STATUS (STATUS, PAYMENT_DATE),
+    INDEX IDX_PAYMENTS_CLAIM (CLAIMED_BY),
     FOREIGN KEY (ORDER_ID) REFERENCES ORDERS(ORDER_ID)
 );
 
@@ -91,6 +99,150 @@ CREATE TABLE DELIVERIES (
     ACTUAL_TIME TIMESTAMP,
     DELIVERY_FEE_TOTAL DECIMAL(10,2),
 	DELIVERY_PLATFORM_CUT DECIMAL(10,2),
+    INDEX IDX_DELIVERIES_DRIVER_STATUS (DRIVER_ID, DELIVERY_STATUS),
     FOREIGN KEY (ORDER_ID) REFERENCES ORDERS(ORDER_ID),
     FOREIGN KEY (DRIVER_ID) REFERENCES USERS(USER_ID)
 );
+
+
+-- IDEMPOTENCY KEYS (POST /api/orders retries)
+CREATE TABLE IDEMPOTENCY_KEYS (
+    IDEMPOTENCY_KEY VARCHAR(100) PRIMARY KEY,
+    REQUEST_FINGERPRINT CHAR(64) NOT NULL,
+    STATUS ENUM('IN_PROGRESS','COMPLETED') NOT NULL DEFAULT 'IN_PROGRESS',
+    ORDER_ID INT NULL,
+    RESPONSE_BODY MEDIUMTEXT NULL,
+    CREATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    COMPLETED_AT TIMESTAMP NULL,
+    INDEX IDX_IDEMPOTENCY_CREATED (CREATED_AT),
+    FOREIGN KEY (ORDER_ID) REFERENCES ORDERS(ORDER_ID)
+);
+
+
+-- DRIVER LOCATIONS (latest point per driver, flushed by backend/locations.py)
+CREATE TABLE DRIVER_LOCATIONS (
+    DRIVER_ID INT PRIMARY KEY,
+    LATITUDE DECIMAL(9,6) NOT NULL,
+    LONGITUDE DECIMAL(9,6) NOT NULL,
+    RECORDED_AT TIMESTAMP NOT NULL,
+    FOREIGN KEY (DRIVER_ID) REFERENCES USERS(USER_ID)
+);
+
+
+-- DELIVERY TRAIL (downsampled driver positions per active delivery)
+CREATE TABLE DELIVERY_TRAIL (
+    TRAIL_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    DELIVERY_ID INT NOT NULL,
+    LATITUDE DECIMAL(9,6) NOT NULL,
+    LONGITUDE DECIMAL(9,6) NOT NULL,
+    RECORDED_AT TIMESTAMP NOT NULL,
+    INDEX IDX_TRAIL_DELIVERY (DELIVERY_ID, RECORDED_AT),
+    FOREIGN KEY (DELIVERY_ID) REFERENCES DELIVERIES(DELIVERY_ID)
+);
+
+
+-- DELIVERY EVENTS (append-only status history, written by backend/events.py)
+CREATE TABLE DELIVERY_EVENTS (
+    EVENT_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    DELIVERY_ID INT NOT NULL,
+    ORDER_ID INT NOT NULL,
+    RESTAURANT_ID INT NULL,
+    DRIVER_ID INT NOT NULL,
+    FROM_STATUS ENUM('ASSIGNED','PICKED_UP','IN_TRANSIT','DELIVERED','FAILED') NULL,
+    TO_STATUS ENUM('ASSIGNED','PICKED_UP','IN_TRANSIT','DELIVERED','FAILED') NOT NULL,
+    CREATED_AT DATETIME(3) NOT NULL,
+    INDEX IDX_EVENTS_DELIVERY (DELIVERY_ID, CREATED_AT),
+    INDEX IDX_EVENTS_RESTAURANT (RESTAURANT_ID, CREATED_AT)
+);
+
+
+-- OUTBOX (change events written with each transaction, tailed by backend/outbox.py)
+CREATE TABLE OUTBOX (
+    OUTBOX_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    AGGREGATE ENUM('ORDER','DELIVERY','RESTAURANT','MENU') NOT NULL,
+    AGGREGATE_ID INT NOT NULL,
+    EVENT_TYPE VARCHAR(30) NOT NULL,
+    PAYLOAD JSON NOT NULL,
+    CREATED_AT DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    INDEX IDX_OUTBOX_CREATED (CREATED_AT)
+);
+
+
+-- OUTBOX CHECKPOINTS (position of each shared outbox consumer)
+CREATE TABLE OUTBOX_CHECKPOINTS (
+    CONSUMER VARCHAR(64) PRIMARY KEY,
+    LAST_OUTBOX_ID BIGINT NOT NULL DEFAULT 0,
+    UPDATED_AT DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+);
+
+INSERT INTO OUTBOX_CHECKPOINTS (CONSUMER, LAST_OUTBOX_ID) VALUES ('revenue_daily', 0);
+
+
+-- OUTBOX SKIPPED (OUTBOX_IDs a shared consumer passed while they were uncommitted)
+CREATE TABLE OUTBOX_SKIPPED (
+    CONSUMER VARCHAR(64) NOT NULL,
+    OUTBOX_ID BIGINT NOT NULL,
+    SKIPPED_AT DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    PRIMARY KEY (CONSUMER, OUTBOX_ID)
+);
+
+
+-- REVENUE DAILY (DELIVERED order revenue per day and restaurant, from the outbox)
+CREATE TABLE REVENUE_DAILY (
+    DAY DATE NOT NULL,
+    RESTAURANT_ID INT NOT NULL,
+    TOTAL_ORDERS INT NOT NULL DEFAULT 0,
+    TOTAL_REVENUE DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PLATFORM_COMMISSION DECIMAL(14,2) NOT NULL DEFAULT 0,
+    SERVICE_FEES DECIMAL(14,2) NOT NULL DEFAULT 0,
+    DELIVERY_PROFIT DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (DAY, RESTAURANT_ID)
+);
+
+
+-- OUTBOX TRIGGERS (RESTAURANT and MENU are edited outside the app)
+DELIMITER //
+
+CREATE TRIGGER TRIGGER_RESTAURANT_OUTBOX_INSERT AFTER INSERT ON RESTAURANT
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('RESTAURANT', NEW.RESTAURANT_ID, 'created', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_RESTAURANT_OUTBOX_UPDATE AFTER UPDATE ON RESTAURANT
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('RESTAURANT', NEW.RESTAURANT_ID, 'updated', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_RESTAURANT_OUTBOX_DELETE AFTER DELETE ON RESTAURANT
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('RESTAURANT', OLD.RESTAURANT_ID, 'deleted', JSON_OBJECT('RESTAURANT_ID', OLD.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_MENU_OUTBOX_INSERT AFTER INSERT ON MENU
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('MENU', NEW.MENU_ITEM_ID, 'created', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_MENU_OUTBOX_UPDATE AFTER UPDATE ON MENU
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('MENU', NEW.MENU_ITEM_ID, 'updated', JSON_OBJECT('RESTAURANT_ID', NEW.RESTAURANT_ID));
+END //
+
+CREATE TRIGGER TRIGGER_MENU_OUTBOX_DELETE AFTER DELETE ON MENU
+FOR EACH ROW
+BEGIN
+    INSERT INTO OUTBOX (AGGREGATE, AGGREGATE_ID, EVENT_TYPE, PAYLOAD)
+    VALUES ('MENU', OLD.MENU_ITEM_ID, 'deleted', JSON_OBJECT('RESTAURANT_ID', OLD.RESTAURANT_ID));
+END //
+
+DELIMITER ;
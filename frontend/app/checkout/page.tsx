@@ -4,7 +4,7 @@ import React, { useMemo, useState, useEffect } from "react";
 import { useCart } from "@/context/CartContext";
 import { useRouter } from "next/navigation";
 import { MapPin, CreditCard } from "lucide-react";
-import { api } from "@/lib/api";
+import { api, type OrderQuote } from "@/lib/api";
 
 export default function CheckoutPage() {
   const { cartItems, getCartTotal, clearCart } = useCart();
@@ -55,13 +55,6 @@ export default function CheckoutPage() {
     if (cartItems.length === 0) router.push("/cart");
   }, [cartItems.length, router]);
 
-  // Pricing UI (frontend-only; not sent to backend)
-  const subtotal = getCartTotal();
-  const deliveryFee = 3.99;
-  const serviceFee = 2.99;
-  const tax = subtotal * 0.08;
-  const total = subtotal + deliveryFee + serviceFee + tax;
-
   // Backend-required fields derived from cart
   const restaurantId = useMemo(() => {
     return cartItems.length > 0 ? cartItems[0].RESTAURANT_ID : null;
@@ -75,6 +68,31 @@ export default function CheckoutPage() {
     }));
   }, [cartItems]);
 
+  // Server quote (same pricing engine as order placement, served from the catalog cache)
+  const [quote, setQuote] = useState<OrderQuote | null>(null);
+  useEffect(() => {
+    if (!restaurantId || itemsPayload.length === 0) return;
+    let cancelled = false;
+    api.orders
+      .quote({ RESTAURANT_ID: restaurantId, items: itemsPayload })
+      .then((q) => {
+        if (!cancelled) setQuote(q);
+      })
+      .catch(() => {
+        if (!cancelled) setQuote(null);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [restaurantId, itemsPayload]);
+
+  // Pricing UI: local estimate until the quote arrives
+  const subtotal = quote?.SUBTOTAL ?? getCartTotal();
+  const deliveryFee = quote?.DELIVERY_FEE ?? 3.99;
+  const serviceFee = quote?.SERVICE_FEE ?? 2.99;
+  const tax = quote?.TAX ?? subtotal * 0.08;
+  const total = quote?.TOTAL ?? subtotal + deliveryFee + serviceFee + tax;
+
   // Optional guard: backend supports ONE restaurant per order
   const hasMultipleRestaurants = useMemo(() => {
     if (cartItems.length === 0) return false;
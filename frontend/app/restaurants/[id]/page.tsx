@@ -30,8 +30,9 @@ export default function RestaurantDetailPage() {
       try {
         setLoading(true);
 
-        // Fetch restaurant details
-        const restaurantData = await api.restaurants.getById(restaurantId);
+        // Fetch restaurant details and menu in one round trip
+        const { restaurant: restaurantData, menu_items } =
+          await api.restaurants.getWithMenu(restaurantId);
         if (!restaurantData) throw new Error("No restaurant returned from API");
 
         console.log("Restaurant data from API:", restaurantData);
@@ -54,9 +55,7 @@ export default function RestaurantDetailPage() {
 
         setRestaurant(transformedRestaurant);
 
-        // Fetch menu items
-        const menuData = await api.restaurants.getMenu(restaurantId);
-        setMenuItems(menuData?.menu_items ?? []);
+        setMenuItems(menu_items);
 
         setError(null);
       } catch (err) {
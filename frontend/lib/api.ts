@@ -22,6 +22,24 @@ async function fetchAPI(endpoint: string, options?: RequestInit) {
   return response.json();
 }
 
+// ==================== BATCH ====================
+// Several GETs in one round trip: POST /api/batch
+export type BatchResult = {
+  id: string | null;
+  path: string;
+  status: number;
+  body: any;
+  etag?: string;
+};
+
+export async function batchGet(requests: Array<{ id?: string; path: string }>): Promise<BatchResult[]> {
+  const response = await fetchAPI('/api/batch', {
+    method: 'POST',
+    body: JSON.stringify({ requests }),
+  });
+  return response.responses;
+}
+
 // ==================== HEALTH CHECK ====================
 
 export async function checkHealth() {
@@ -86,6 +104,25 @@ export async function getRestaurantMenu(restaurantId: number) {
   }
 }
 
+export async function getRestaurantWithMenu(restaurantId: number) {
+  try {
+    const [restaurant, menu] = await batchGet([
+      { id: 'restaurant', path: `/api/restaurants/${restaurantId}` },
+      { id: 'menu', path: `/api/restaurants/${restaurantId}/menu` },
+    ]);
+    if (restaurant.status !== 200) {
+      throw new Error(restaurant.body?.detail || `HTTP ${restaurant.status}`);
+    }
+    return {
+      restaurant: restaurant.body.restaurant,
+      menu_items: menu.status === 200 ? menu.body.menu_items ?? [] : [],
+    };
+  } catch (error) {
+    console.error(`Error fetching restaurant ${restaurantId} with menu:`, error);
+    throw error;
+  }
+}
+
 // ==================== ORDER ENDPOINTS ====================
 // Matches backend OrderCreate in backend/routes/orders.py
 export type CreateOrderPayload = {
@@ -99,6 +136,35 @@ export type CreateOrderPayload = {
   }>;
 };
 
+// Matches backend POST /api/orders/quote (priced from the catalog cache)
+export type OrderQuote = {
+  RESTAURANT_ID: number;
+  items: Array<{
+    MENU_ITEM_ID: number;
+    ITEM_NAME: string;
+    QUANTITY: number;
+    PRICE: number;
+    LINE_TOTAL: number;
+  }>;
+  SUBTOTAL: number;
+  DELIVERY_FEE: number;
+  SERVICE_FEE: number;
+  TAX: number;
+  TOTAL: number;
+};
+
+export async function quoteOrder(data: Pick<CreateOrderPayload, "RESTAURANT_ID" | "items">): Promise<OrderQuote> {
+  try {
+    return await fetchAPI("/api/orders/quote", {
+      method: "POST",
+      body: JSON.stringify(data),
+    });
+  } catch (error) {
+    console.error("Error quoting order:", error);
+    throw error;
+  }
+}
+
 export async function createOrder(data: CreateOrderPayload) {
   try {
     // Defensive validation
@@ -186,6 +252,7 @@ export async function getRestaurantDashboard(restaurantId: number) {
 // ==================== EXPORT UTILITIES ====================
 
 export const api = {
+  batch: batchGet,
   health: {
     check: checkHealth,
     testDb: testDatabase,
@@ -198,9 +265,11 @@ export const api = {
     getAll: getAllRestaurants,
     getById: getRestaurantById,
     getMenu: getRestaurantMenu,
+    getWithMenu: getRestaurantWithMenu,
   },
   orders: {
     create: createOrder,
+    quote: quoteOrder,
     getById: getOrderById,
     getUserOrders: getUserOrders,
   },